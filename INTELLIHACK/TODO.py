@@ -1,36 +1,45 @@
 import os
 import sys
-import json
+import random
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
-from imapclient import IMAPClient
-import pyzmail
-from openai import OpenAI
-
-# ── FORCE UTF-8 OUTPUT ───────────────────────────────────────────────────────
-# On Windows consoles this ensures unicode (like “✔”) can be printed
-if hasattr(sys.stdout, "reconfigure"):
-    sys.stdout.reconfigure(encoding="utf-8")
+from email_parsing import parse_raw_email
+from pipeline import Pipeline, JsonArrayWriter
+from stream_json import iter_stream_json
+from profiling import Profile, cli_flag, profiled
+from perplexity_client import get_client
+from email_classifier import ActionableEmailClassifier, email_features, record_history, sender_text, task_senders
+from email_threads import ThreadIndex, iter_thread_groups
+from mail_archive import MailArchive
+from imap_search import report, search_candidates, task_terms
 
 # ── CONFIG ────────────────────────────────────────────────────────────────────
-load_dotenv()
-PERPLEXITY_KEY = os.getenv("PERPLEXITY_API_KEY")
-EMAIL_HOST    = os.getenv("EMAIL_HOST")
-EMAIL_USER    = os.getenv("EMAIL_USER")
-EMAIL_PASS    = os.getenv("EMAIL_PASS")
-
-if not all([PERPLEXITY_KEY, EMAIL_HOST, EMAIL_USER, EMAIL_PASS]):
-    raise RuntimeError("Set PERPLEXITY_API_KEY, EMAIL_HOST, EMAIL_USER, EMAIL_PASS in your .env")
-
-# Initialize the Perplexity client (OpenAI‐compatible interface)
-openai = OpenAI(api_key=PERPLEXITY_KEY, base_url="https://api.perplexity.ai")
+# Read when an agent or processor is built, not at import, so other modules
+# can import this one without side effects
+def load_config():
+    load_dotenv()
+    return {
+        "perplexity_key": os.getenv("PERPLEXITY_API_KEY"),
+        "email_host":     os.getenv("EMAIL_HOST"),
+        "email_user":     os.getenv("EMAIL_USER"),
+        "email_pass":     os.getenv("EMAIL_PASS"),
+        # Emails scoring below this are not sent to the LLM; a small audited sample
+        # of skipped mail is still extracted so recall can be measured in production
+        "actionable_threshold": float(os.getenv("ACTIONABLE_THRESHOLD", "0.2")),
+        "audit_rate":           float(os.getenv("ACTIONABLE_AUDIT_RATE", "0.05")),
+    }
 
 # ── AGENT ─────────────────────────────────────────────────────────────────────
 class PerplexityTaskAgent:
-    def extract_tasks(self, email_text: str):
+    def __init__(self, client=None):
+        # Shared Perplexity client (OpenAI‐compatible, pooled, with retries)
+        self.client = client or get_client(load_config()["perplexity_key"])
+
+    def iter_tasks(self, email_text: str):
         """
-        Ask Perplexity to identify any tasks in the email body.
-        Returns a list of {"title": ..., "due_date": ...} dicts.
+        Stream the completion and yield each task dict as soon as its JSON
+        object is complete; generation stops once the array closes.
         """
         system = (
             "You are a helpful assistant that extracts TODO tasks from an email. "
@@ -45,91 +54,152 @@ class PerplexityTaskAgent:
             {"role": "user",   "content": email_text}
         ]
 
-        resp = openai.chat.completions.create(
-            model="sonar-pro",
+        stream = self.client.complete(
+            task="extract_tasks",
             messages=messages,
-            temperature=0.0
+            temperature=0.0,
+            stream=True
         )
-        content = resp.choices[0].message.content.strip()
+        for task in iter_stream_json(stream, mode="array"):
+            if isinstance(task, dict):
+                yield task
 
-        # Extract the JSON array between [ ... ]
-        start = content.find('[')
-        end   = content.rfind(']') + 1
-        try:
-            return json.loads(content[start:end])
-        except Exception:
-            return []
+    @profiled("extract_tasks")
+    def extract_tasks(self, email_text: str):
+        """
+        Ask Perplexity to identify any tasks in the email body.
+        Returns a list of {"title": ..., "due_date": ...} dicts.
+        """
+        return list(self.iter_tasks(email_text))
 
 # ── EMAIL PROCESSOR ───────────────────────────────────────────────────────────
 class EmailInboxProcessor:
-    def __init__(self, host, user, password, limit=10):
+    def __init__(self, host, user, password, limit=10, pushdown=True):
         self.host   = host
         self.user   = user
         self.passw  = password
         self.limit  = limit
+        self.pushdown = pushdown
+        self.search_counts = None
+        config      = load_config()
         self.agent  = PerplexityTaskAgent()
+        self.classifier = ActionableEmailClassifier.load(threshold=config["actionable_threshold"])
+        self.audit_rate = config["audit_rate"]
+        self.threads = ThreadIndex("tasks")
+        self.archive = MailArchive()
+        self.stats  = {"messages": 0, "emails": 0, "skipped": 0, "sent": 0, "audited": 0, "audit_misses": 0}
+        self._stats_lock = threading.Lock()
+
+    def iter_raw_recent(self, batch_size=10):
+        """Yield (uid, raw RFC822 bytes) for the last `limit` messages, a batch
+        at a time; archived messages are read locally instead of fetched.
+
+        With pushdown only those of them mentioning a task keyword or sent by an
+        address that produced tasks before are candidates."""
+        from imapclient import IMAPClient
 
-    def fetch_recent(self):
         with IMAPClient(self.host) as server:
             server.login(self.user, self.passw)
-            server.select_folder("INBOX", readonly=True)
-            uids = server.search("ALL")[-self.limit:]
-            records = server.fetch(uids, ["RFC822"])
-
-        emails = []
-        for uid, data in records.items():
-            msg = pyzmail.PyzMessage.factory(data[b"RFC822"])
-            if msg.text_part:
-                body = msg.text_part.get_payload().decode(
-                    msg.text_part.charset or "utf-8",
-                    errors="ignore"
-                )
-            elif msg.html_part:
-                body = msg.html_part.get_payload().decode(
-                    msg.html_part.charset or "utf-8",
-                    errors="ignore"
-                )
+            info = server.select_folder("INBOX", readonly=True)
+            terms, senders = (task_terms(), task_senders()) if self.pushdown else ((), ())
+            uids, in_window = search_candidates(server, terms=terms, senders=senders, last=self.limit)
+            self.search_counts = report("task", uids, in_window, last=self.limit)
+            yield from self.archive.fetch(server, "INBOX", uids, info.get(b"UIDVALIDITY"),
+                                          account=self.user, batch_size=batch_size)
+
+    def fetch_recent(self):
+        return [parse_raw_email(uid, raw) for uid, raw in self.iter_raw_recent()]
+
+    def _extract_thread(self, group):
+        """Extraction stage: one classified LLM call over a thread's new,
+        non-quoted content; returns the thread's task records, where tasks
+        seen in earlier messages keep their task_id and are updated"""
+        e = group.latest
+        body = group.new_content
+        sender = sender_text(e["from"])
+        score = self.classifier.score(email_features(e["subject"], sender, body))
+        audit = False
+        with self._stats_lock:
+            self.stats["messages"] += len(group.emails)
+            self.stats["emails"] += 1
+            if score < self.classifier.threshold:
+                self.stats["skipped"] += 1
+                audit = random.random() < self.audit_rate
+                if not audit:
+                    self.threads.mark_done(group)
+                    return None
+                self.stats["audited"] += 1
             else:
-                body = ""
+                self.stats["sent"] += 1
 
-            emails.append({
-                "uid":     uid,
-                "subject": msg.get_subject() or "",
-                "from":    msg.get_addresses("from"),
-                "body":    body
-            })
-        return emails
+        try:
+            tasks = self.agent.extract_tasks(body)
+        except Exception:
+            self.threads.forget(group)
+            raise
+        record_history(e["subject"], sender, body, len(tasks))
+        if audit and tasks:
+            with self._stats_lock:
+                self.stats["audit_misses"] += 1
+        merged = self.threads.merge_tasks(group.thread_id, tasks)
+        self.threads.mark_done(group)
+        return [{
+            "email_uid": e["uid"],
+            "thread_id": group.thread_id,
+            "task_id":   t["task_id"],
+            "title":     t["title"],
+            "due_date":  t["due_date"],
+            "progress":  None
+        } for t in merged]
+
+    def iter_tasks(self, buffer_size=8, extract_workers=2):
+        """Stream extracted tasks through bounded fetch -> parse -> thread
+        grouping -> extract stages"""
+        parsed = Pipeline(self.iter_raw_recent(), buffer_size=buffer_size)
+        parsed.stage("parse", lambda item: parse_raw_email(*item))
+        stream = Pipeline(iter_thread_groups(parsed.run(), self.threads), buffer_size=buffer_size)
+        stream.stage("extract", self._extract_thread, workers=extract_workers)
+        try:
+            for tasks in stream.run():
+                yield from tasks
+        finally:
+            self.threads.save()
 
     def process(self):
-        emails = self.fetch_recent()
-        tasks_out = []
-        for e in emails:
-            tasks = self.agent.extract_tasks(e["body"])
-            for t in tasks:
-                tasks_out.append({
-                    "email_uid": e["uid"],
-                    "title":     t.get("title", "").strip(),
-                    "due_date":  t.get("due_date"),
-                    "progress":  None
-                })
-        return tasks_out
+        return list(self.iter_tasks())
 
 # ── RUN & SAVE ───────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    processor = EmailInboxProcessor(
-        EMAIL_HOST, EMAIL_USER, EMAIL_PASS, limit=10
-    )
-    all_tasks = processor.process()
-
-    # Prepare output path
-    out_dir = "task_data"
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_file = os.path.join(out_dir, f"extracted_tasks_{ts}.json")
-
-    # Write JSON file
-    with open(out_file, "w", encoding="utf-8") as f:
-        json.dump(all_tasks, f, ensure_ascii=False, indent=2)
-
-    # Final confirmation
-    print(f"✔ Wrote {len(all_tasks)} tasks → {out_file}")
+    import contextlib
+
+    # On Windows consoles this ensures unicode (like “✔”) can be printed
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    with Profile("todo") if cli_flag() else contextlib.nullcontext():
+        config = load_config()
+        if not all([config["perplexity_key"], config["email_host"], config["email_user"], config["email_pass"]]):
+            raise RuntimeError("Set PERPLEXITY_API_KEY, EMAIL_HOST, EMAIL_USER, EMAIL_PASS in your .env")
+
+        processor = EmailInboxProcessor(
+            config["email_host"], config["email_user"], config["email_pass"], limit=10
+        )
+
+        # Prepare output path
+        out_dir = "task_data"
+        os.makedirs(out_dir, exist_ok=True)
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_file = os.path.join(out_dir, f"extracted_tasks_{ts}.json")
+
+        # Write JSON file incrementally as tasks are extracted
+        with JsonArrayWriter(out_file) as writer:
+            for task in processor.iter_tasks():
+                writer.write(task)
+
+        # Final confirmation
+        print(f"✔ Wrote {writer.count} tasks → {out_file}")
+        stats = processor.stats
+        skip_rate = stats["skipped"] / stats["emails"] if stats["emails"] else 0
+        print(f"Threads: {stats['messages']} new messages in {stats['emails']} conversations")
+        print(f"Pre-classifier: skipped {stats['skipped']}/{stats['emails']} emails ({skip_rate:.0%}), "
+              f"{stats['audit_misses']}/{stats['audited']} audited skips had tasks")
@@ -0,0 +1,118 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+
+def normalize_question(text):
+    """Collapse case, whitespace and trailing punctuation so trivially
+    different phrasings of the same question share a cache entry"""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip(" ?!.")
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.answer = None
+        self.error = None
+
+
+class AnswerCache:
+    """Single-flight coalescing plus a bounded TTL cache for chat answers.
+
+    Concurrent identical questions wait on the first caller's upstream request
+    instead of issuing their own. Answers are kept for `ttl` seconds (short by
+    default, since web-search results go stale) in an LRU of `max_entries`.
+    """
+
+    def __init__(self, ttl=300, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, answer)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "upstream_calls": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+            "hit_latency_ms_total": 0.0,
+            "coalesced_wait_ms_total": 0.0,
+        }
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def _store(self, key, answer):
+        self._entries[key] = (time.monotonic() + self.ttl, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, bypass=False):
+        """Return the answer for `key`, calling `compute()` at most once for
+        concurrent callers. `bypass` skips the cache but still refreshes it."""
+        started = time.perf_counter()
+        with self._lock:
+            self.stats["requests"] += 1
+            if bypass:
+                self.stats["bypassed"] += 1
+            else:
+                answer = self._lookup(key, time.monotonic())
+                if answer is not None:
+                    self.stats["cache_hits"] += 1
+                    self.stats["hit_latency_ms_total"] += (time.perf_counter() - started) * 1000
+                    return answer
+
+            flight = self._in_flight.get(key)
+            leader = flight is None or bypass
+            if leader:
+                flight = _InFlight()
+                if not bypass:
+                    self._in_flight[key] = flight
+                self.stats["upstream_calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.stats["coalesced_wait_ms_total"] += (time.perf_counter() - started) * 1000
+            return flight.answer
+
+        try:
+            flight.answer = compute()
+            with self._lock:
+                self._store(key, flight.answer)
+            return flight.answer
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+            flight.done.set()
+
+    def snapshot(self):
+        """Counters plus derived upstream calls saved and mean latencies"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        hits, coalesced = stats["cache_hits"], stats["coalesced"]
+        stats["upstream_calls_saved"] = hits + coalesced
+        stats["avg_hit_latency_ms"] = round(stats["hit_latency_ms_total"] / hits, 3) if hits else None
+        stats["avg_coalesced_wait_ms"] = round(stats["coalesced_wait_ms_total"] / coalesced, 3) if coalesced else None
+        return stats
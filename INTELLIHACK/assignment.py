@@ -0,0 +1,270 @@
+import os
+import json
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+INFEASIBLE = 1e9
+
+# Same sample roster and backlog as the Express service in employee.py;
+# employees.json / assignment_tasks.json override them when present.
+DEFAULT_EMPLOYEES = [
+    {"id": 1, "name": "Alice Smith", "skills": ["javascript", "react", "node"], "availability": {d: [[9, 17]] for d in WEEKDAYS[:5]}, "currentTask": None},
+    {"id": 2, "name": "Bob Johnson", "skills": ["python", "data analysis", "machine learning"], "availability": {d: [[9, 17]] for d in WEEKDAYS[:5]}, "currentTask": "ML model training"},
+    {"id": 3, "name": "Charlie Williams", "skills": ["design", "ui", "photoshop"], "availability": {d: [[9, 17]] for d in WEEKDAYS[:5]}, "currentTask": None},
+    {"id": 4, "name": "Diana Lee", "skills": ["java", "spring", "database"], "availability": {**{d: [[9, 17]] for d in WEEKDAYS[:5]}, "thursday": [[13, 17]]}, "currentTask": "Database optimization"},
+    {"id": 5, "name": "Ethan Davis", "skills": ["devops", "aws", "docker"], "availability": {**{d: [[9, 17]] for d in WEEKDAYS[:5]}, "friday": [[9, 12]]}, "currentTask": None},
+]
+
+DEFAULT_TASKS = [
+    {"id": 1, "name": "Frontend bug fixes", "description": "Fix UI bugs in the dashboard", "skills": ["javascript", "react"], "deadline": "2025-05-01", "assigned": False, "assignedTo": None},
+    {"id": 2, "name": "Data pipeline setup", "description": "Set up ETL pipeline for new data source", "skills": ["python", "data analysis"], "deadline": "2025-05-10", "assigned": False, "assignedTo": None},
+    {"id": 3, "name": "Logo redesign", "description": "Create new logo variants for rebranding", "skills": ["design", "photoshop"], "deadline": "2025-04-30", "assigned": False, "assignedTo": None},
+]
+
+
+def _load_json(path, default):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(json.dumps(default))
+
+
+def _intervals(value):
+    """Accept [start, end] or [[start, end], ...] per day"""
+    if value and not isinstance(value[0], (list, tuple)):
+        return [list(value)]
+    return [list(v) for v in value or []]
+
+
+def hungarian(cost):
+    """Minimum-cost assignment for a rectangular cost matrix.
+
+    Returns (row_indices, col_indices) like scipy's linear_sum_assignment,
+    which is used instead when SciPy is installed.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)  # p[j]: row (1-based) matched to column j
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            masked = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(masked)) + 1
+            delta = masked[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    rows, cols = [], []
+    for j in range(1, m + 1):
+        if p[j]:
+            rows.append(p[j] - 1)
+            cols.append(j - 1)
+    rows, cols = np.array(rows, dtype=int), np.array(cols, dtype=int)
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+class AssignmentEngine:
+    """Skill- and availability-aware employee/task matching.
+
+    Each skill keeps a bitmask of the employees who hold it, used to prune
+    a batch to its candidate employees; skills are mirrored into a 0/1 NumPy
+    matrix so the candidates x tasks compatibility matrix is one matrix
+    product. Batch requests are solved optimally with the Hungarian algorithm.
+    """
+
+    def __init__(self, employees=None, tasks=None, client=None):
+        self.employees = employees if employees is not None else _load_json("employees.json", DEFAULT_EMPLOYEES)
+        self.tasks = tasks if tasks is not None else _load_json("assignment_tasks.json", DEFAULT_TASKS)
+        self.client = client
+        self._lock = threading.Lock()
+        self._insights = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="assignment-insight")
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the per-skill employee masks, skill matrix and availability arrays"""
+        skills = sorted({s.lower() for e in self.employees for s in e["skills"]} |
+                        {s.lower() for t in self.tasks for s in t["skills"]})
+        self.skill_bit = {skill: i for i, skill in enumerate(skills)}
+        self.employee_ids = [e["id"] for e in self.employees]
+        self.employee_pos = {e["id"]: i for i, e in enumerate(self.employees)}
+
+        self.skill_employee_mask = {skill: 0 for skill in skills}
+        self.skill_matrix = np.zeros((len(self.employees), len(skills)), dtype=np.float32)
+        for i, employee in enumerate(self.employees):
+            for skill in employee["skills"]:
+                self.skill_employee_mask[skill.lower()] |= 1 << i
+                self.skill_matrix[i, self.skill_bit[skill.lower()]] = 1
+
+        # Per day: padded (n_employees x max_intervals) start/end hour arrays
+        self.availability = {}
+        for day in WEEKDAYS:
+            per_employee = [_intervals(e["availability"].get(day)) for e in self.employees]
+            width = max([len(iv) for iv in per_employee] + [1])
+            starts = np.full((len(self.employees), width), np.inf)
+            ends = np.full((len(self.employees), width), -np.inf)
+            for i, intervals in enumerate(per_employee):
+                for k, (start, end) in enumerate(intervals):
+                    starts[i, k], ends[i, k] = start, end
+            self.availability[day] = (starts, ends)
+
+    def available_mask(self, day, hour):
+        """Boolean array: free (no current task) and inside an availability interval"""
+        starts, ends = self.availability.get(day.lower(), (None, None))
+        if starts is None:
+            return np.zeros(len(self.employees), dtype=bool)
+        in_hours = ((starts <= hour) & (hour < ends)).any(axis=1)
+        idle = np.array([e.get("currentTask") is None for e in self.employees], dtype=bool)
+        return in_hours & idle
+
+    def available_employees(self, day, hour):
+        mask = self.available_mask(day, hour)
+        return [e for e, ok in zip(self.employees, mask) if ok]
+
+    def candidate_mask(self, task):
+        """Bitmask of employees holding at least one of the task's skills"""
+        mask = 0
+        for skill in task["skills"]:
+            mask |= self.skill_employee_mask.get(skill.lower(), 0)
+        return mask
+
+    def candidate_rows(self, tasks, day, hour):
+        """Positions of available employees holding a skill of any task"""
+        mask = 0
+        for task in tasks:
+            mask |= self.candidate_mask(task)
+        skilled = np.array([(mask >> i) & 1 for i in range(len(self.employees))], dtype=bool)
+        return np.flatnonzero(skilled & self.available_mask(day, hour))
+
+    def _task_matrix(self, tasks):
+        matrix = np.zeros((len(tasks), len(self.skill_bit)), dtype=np.float32)
+        for j, task in enumerate(tasks):
+            for skill in task["skills"]:
+                if skill.lower() in self.skill_bit:
+                    matrix[j, self.skill_bit[skill.lower()]] = 1
+        return matrix
+
+    def score_matrix(self, tasks, day, hour, rows=None):
+        """Employees x tasks compatibility; -inf where the pair is infeasible.
+
+        Score is the share of the task's skills the employee covers, minus a
+        small penalty for unrelated skills so specialists win ties. `rows`
+        limits the matrix to those employee positions.
+        """
+        if rows is None:
+            rows = np.arange(len(self.employees))
+        skills = self.skill_matrix[rows]
+        task_matrix = self._task_matrix(tasks)
+        overlap = skills @ task_matrix.T
+        required = np.maximum(task_matrix.sum(axis=1), 1)
+        breadth = skills.sum(axis=1, keepdims=True)
+        score = overlap / required - 0.01 * (breadth - overlap)
+        feasible = (overlap > 0) & self.available_mask(day, hour)[rows][:, None]
+        return np.where(feasible, score, -np.inf)
+
+    def find_task(self, task_id):
+        return next((t for t in self.tasks if str(t["id"]) == str(task_id)), None)
+
+    def assign_batch(self, task_ids, day, hour):
+        """Optimally match many unassigned tasks to available employees at once.
+
+        Returns (assignments, unassigned_task_ids); each assignment is a dict
+        with the task, employee and score, already applied to the roster.
+        """
+        with self._lock:
+            tasks = [t for t in (self.find_task(tid) for tid in task_ids) if t and not t.get("assigned")]
+            if not tasks:
+                return [], list(task_ids)
+            # Only tasks someone has a skill for, and only the available
+            # employees with one of those skills, go into the solver
+            matchable = [t for t in tasks if self.candidate_mask(t)]
+            pool = self.candidate_rows(matchable, day, hour)
+            if not matchable or not len(pool):
+                return [], [t["id"] for t in tasks]
+            scores = self.score_matrix(matchable, day, hour, pool)
+            cost = np.where(np.isfinite(scores), -scores, INFEASIBLE)
+            solve = linear_sum_assignment or hungarian
+            rows, cols = solve(cost)
+
+            assignments = []
+            for i, j in zip(rows, cols):
+                if cost[i, j] >= INFEASIBLE:
+                    continue
+                employee, task = self.employees[pool[i]], matchable[j]
+                employee["currentTask"] = task["name"]
+                task["assigned"] = True
+                task["assignedTo"] = employee["id"]
+                assignments.append({"task": task, "employee": employee, "score": round(float(scores[i, j]), 3)})
+            assigned_ids = {a["task"]["id"] for a in assignments}
+            return assignments, [t["id"] for t in tasks if t["id"] not in assigned_ids]
+
+    def complete_task(self, employee_id, task_id):
+        with self._lock:
+            task = self.find_task(task_id)
+            pos = self.employee_pos.get(int(employee_id))
+            if task is None or pos is None or task.get("assignedTo") != int(employee_id):
+                return None
+            self.employees[pos]["currentTask"] = None
+            task["completed"] = True
+            return self.employees[pos], task
+
+    def request_insight(self, task):
+        """Fetch Perplexity assignment advice in the background; returns an id
+        to poll, so the assignment response never waits on the LLM."""
+        insight_id = uuid.uuid4().hex[:8]
+        self._insights[insight_id] = {"status": "pending", "task_id": task["id"]}
+        if self.client is None:
+            self._insights[insight_id] = {"status": "unavailable", "task_id": task["id"]}
+            return insight_id
+
+        def run():
+            try:
+                response = self.client.complete(
+                    task="assignment_insight",
+                    messages=[{"role": "user", "content": f'What are the best practices for assigning a task like "{task["description"]}" to team members?'}],
+                    max_tokens=1024,
+                )
+                self._insights[insight_id] = {"status": "done", "task_id": task["id"], "text": response.choices[0].message.content}
+            except Exception as e:
+                self._insights[insight_id] = {"status": "error", "task_id": task["id"], "error": str(e)}
+
+        self._executor.submit(run)
+        return insight_id
+
+    def get_insight(self, insight_id):
+        return self._insights.get(insight_id)
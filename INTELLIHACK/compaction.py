@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import glob
+import shutil
+import argparse
+from datetime import datetime
+
+# kind -> (folder, snapshot glob, consolidated store name)
+SNAPSHOT_KINDS = {
+    "tasks": ("task_data", "extracted_tasks_*.json", "extracted_tasks_store"),
+    "meetings": ("meeting_data", "extracted_meetings_*.json", "extracted_meetings_store"),
+}
+
+
+def iter_json_array(path, chunk_size=65536):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        eof = False
+        started = False
+        while True:
+            buf = buf.lstrip()
+            if not started:
+                if not buf and not eof:
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buf += chunk
+                    continue
+                if not buf.startswith("["):
+                    raise ValueError(f"{path} does not contain a JSON array")
+                buf = buf[1:]
+                started = True
+                continue
+
+            if buf.startswith(","):
+                buf = buf[1:]
+                continue
+            if buf.startswith("]"):
+                return
+
+            try:
+                item, end = decoder.raw_decode(buf)
+                # Only complete once a delimiter follows: a scalar cut at the
+                # chunk boundary ("2." of "2.5", "1e" of "1e5") decodes short
+                if buf[end:].lstrip()[:1] not in (",", "]"):
+                    raise json.JSONDecodeError("incomplete", buf, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"{path} ends inside a JSON array")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf += chunk
+                continue
+
+            yield item
+            buf = buf[end:]
+
+
+def iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def snapshot_files(folder, pattern):
+    """Snapshot paths, oldest first (timestamps sort lexically)"""
+    return sorted(glob.glob(os.path.join(folder, pattern)))
+
+
+def record_key(record):
+    """Merge key: the source thread if known, else the email UID, scoped by
+    account for multi-account runs. Thread-keyed records are re-emitted in
+    full whenever the thread changes, so the latest snapshot replaces them."""
+    uid = f"thread:{record['thread_id']}" if record.get("thread_id") else str(record.get("email_uid"))
+    return f"{record['account']}/{uid}" if record.get("account") else uid
+
+
+def merge_snapshots(paths, base=None):
+    """Merge snapshot records keyed by source email UID.
+
+    The most recent snapshot that mentions a UID replaces all earlier records
+    for that UID, so a re-extraction of the same email never duplicates its
+    tasks or meetings. Exact duplicates within one snapshot are dropped.
+    """
+    merged = dict(base or {})
+    for path in paths:
+        seen_in_file = {}
+        for record in iter_json_array(path):
+            if not isinstance(record, dict):
+                continue
+            uid = record_key(record)
+            bucket = seen_in_file.setdefault(uid, [])
+            if record not in bucket:
+                bucket.append(record)
+        merged.update(seen_in_file)
+    return merged
+
+
+class ConsolidatedStore:
+    """A JSON Lines dataset with a sidecar index of byte offsets by email UID"""
+
+    def __init__(self, folder, name):
+        self.data_path = os.path.join(folder, f"{name}.jsonl")
+        self.index_path = os.path.join(folder, f"{name}.idx")
+
+    def exists(self):
+        return os.path.exists(self.data_path) and os.path.exists(self.index_path)
+
+    def load_index(self):
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def records_by_uid(self):
+        merged = {}
+        if os.path.exists(self.data_path):
+            for record in iter_jsonl(self.data_path):
+                merged.setdefault(record_key(record), []).append(record)
+        return merged
+
+    def lookup(self, email_uid):
+        """Return the records for one UID ("account/uid" for multi-account
+        records) by seeking straight to them"""
+        offsets = self.load_index()["offsets"].get(str(email_uid), [])
+        records = []
+        with open(self.data_path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        return records
+
+    def write(self, merged, sources):
+        """Atomically replace the dataset and its index"""
+        offsets = {}
+        tmp_data = self.data_path + ".tmp"
+        with open(tmp_data, "wb") as f:
+            for uid in sorted(merged, key=lambda u: (len(u), u)):
+                for record in merged[uid]:
+                    offsets.setdefault(uid, []).append(f.tell())
+                    line = json.dumps(record, ensure_ascii=False) + "\n"
+                    f.write(line.encode("utf-8"))
+
+        index = {
+            "compacted_at": datetime.now().isoformat(),
+            "sources": [os.path.basename(p) for p in sources],
+            "record_count": sum(len(v) for v in merged.values()),
+            "offsets": offsets,
+        }
+        tmp_index = self.index_path + ".tmp"
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+
+        os.replace(tmp_data, self.data_path)
+        os.replace(tmp_index, self.index_path)
+        return index
+
+
+def retire_snapshots(paths, folder, delete=False):
+    """Move compacted snapshots into <folder>/retired, or delete them"""
+    retired_dir = os.path.join(folder, "retired")
+    for path in paths:
+        if delete:
+            os.remove(path)
+        else:
+            os.makedirs(retired_dir, exist_ok=True)
+            shutil.move(path, os.path.join(retired_dir, os.path.basename(path)))
+
+
+def compact(kind, root=".", delete=False, keep_snapshots=False):
+    """Fold all snapshots of one kind into its consolidated store"""
+    folder, pattern, name = SNAPSHOT_KINDS[kind]
+    folder = os.path.join(root, folder)
+    store = ConsolidatedStore(folder, name)
+
+    paths = snapshot_files(folder, pattern)
+    if not paths:
+        print(f"No {kind} snapshots to compact in {folder}")
+        return None
+
+    merged = merge_snapshots(paths, base=store.records_by_uid())
+    index = store.write(merged, paths)
+    print(f"✔ Compacted {len(paths)} {kind} snapshots → {store.data_path} "
+          f"({index['record_count']} records, {len(merged)} emails)")
+
+    if not keep_snapshots:
+        retire_snapshots(paths, folder, delete=delete)
+    return index
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Compact extraction snapshots into consolidated stores")
+    parser.add_argument("kind", nargs="?", default="all", choices=["all", *SNAPSHOT_KINDS])
+    parser.add_argument("--root", default=".", help="directory holding task_data/ and meeting_data/")
+    parser.add_argument("--delete", action="store_true", help="delete snapshots instead of moving them to retired/")
+    parser.add_argument("--keep", action="store_true", help="leave snapshots in place")
+    args = parser.parse_args()
+
+    kinds = list(SNAPSHOT_KINDS) if args.kind == "all" else [args.kind]
+    for kind in kinds:
+        compact(kind, root=args.root, delete=args.delete, keep_snapshots=args.keep)
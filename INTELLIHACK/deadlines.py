@@ -0,0 +1,153 @@
+import re
+import bisect
+import time
+from datetime import datetime, time as dtime
+from functools import lru_cache
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+NUMERIC_DATE = re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$")
+MONTH_FIRST = re.compile(r"^([a-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})")
+DAY_FIRST = re.compile(r"^(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]+)\.?,?\s+(\d{4})")
+TIME_OF_DAY = re.compile(r"(\d{1,2}):(\d{2})\s*(am|pm)?")
+DEADLINE_IN_TEXT = re.compile(
+    r"(?:deadline|due(?: date| by| on)?):?\s*("
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?"
+    r"|\d{1,2}[/.-]\d{1,2}[/.-]\d{4}"
+    r"|[a-z]+\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}"
+    r"|\d{1,2}(?:st|nd|rd|th)?\s+[a-z]+\.?,?\s+\d{4})",
+    re.IGNORECASE,
+)
+
+
+def _month(name):
+    return MONTHS.get(name[:4]) or MONTHS.get(name[:3])
+
+
+def _time_suffix(text):
+    match = TIME_OF_DAY.search(text)
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return dtime(hour, minute)
+
+
+@lru_cache(maxsize=4096)
+def parse_deadline(value):
+    """Parse a deadline string into a naive local datetime, or None.
+
+    Accepts ISO 8601 (with or without time/offset), MM/DD/YYYY (DD/MM/YYYY
+    when the first field cannot be a month) and written dates such as
+    "June 10th, 2025" or "10 June 2025", optionally followed by a time.
+    Date-only values mean the end of that day.
+    """
+    if not value or not isinstance(value, str):
+        return None
+    text = value.strip()
+
+    try:
+        parsed = datetime.fromisoformat(text)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        if len(text) == 10:
+            parsed = datetime.combine(parsed.date(), dtime.max)
+        return parsed
+    except ValueError:
+        pass
+
+    text = text.lower()
+    year = month = day = None
+    match = NUMERIC_DATE.match(text)
+    if match:
+        first, second, year = (int(g) for g in match.groups())
+        month, day = (second, first) if first > 12 else (first, second)
+    else:
+        match = MONTH_FIRST.match(text)
+        if match:
+            month, day, year = _month(match.group(1)), int(match.group(2)), int(match.group(3))
+        else:
+            match = DAY_FIRST.match(text)
+            if match:
+                day, month, year = int(match.group(1)), _month(match.group(2)), int(match.group(3))
+
+    if not match or not month:
+        return None
+    try:
+        date = datetime(year, month, day).date()
+    except ValueError:
+        return None
+    return datetime.combine(date, _time_suffix(text[match.end():]) or dtime.max)
+
+
+def find_deadline(text):
+    """Return the first parseable date following 'deadline'/'due' in text"""
+    for match in DEADLINE_IN_TEXT.finditer(text or ""):
+        if parse_deadline(match.group(1)):
+            return match.group(1)
+    return None
+
+
+def deadline_timestamp(value):
+    """Canonical deadline: integer Unix seconds, or None if unparseable"""
+    parsed = parse_deadline(value)
+    return int(parsed.timestamp()) if parsed else None
+
+
+class DeadlineIndex:
+    """Open tasks ordered by deadline timestamp.
+
+    Kept as a sorted list of (deadline_ts, task_id) so overdue, due-within
+    and next-due queries are a bisect plus a slice instead of a full scan.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._by_task = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, task_id, deadline_ts):
+        self.remove(task_id)
+        if deadline_ts is None:
+            return
+        bisect.insort(self._entries, (deadline_ts, task_id))
+        self._by_task[task_id] = deadline_ts
+
+    def remove(self, task_id):
+        old = self._by_task.pop(task_id, None)
+        if old is not None:
+            i = bisect.bisect_left(self._entries, (old, task_id))
+            if i < len(self._entries) and self._entries[i] == (old, task_id):
+                del self._entries[i]
+
+    def overdue(self, now=None):
+        """Task ids whose deadline has passed, most overdue first"""
+        now = time.time() if now is None else now
+        end = bisect.bisect_left(self._entries, (now,))
+        return [task_id for _, task_id in self._entries[:end]]
+
+    def count_overdue(self, now=None):
+        """Number of overdue tasks, without building the list"""
+        now = time.time() if now is None else now
+        return bisect.bisect_left(self._entries, (now,))
+
+    def due_within(self, days, now=None):
+        """Task ids due between now and now + days, soonest first"""
+        now = time.time() if now is None else now
+        start = bisect.bisect_left(self._entries, (now,))
+        end = bisect.bisect_left(self._entries, (now + days * 86400,))
+        return [task_id for _, task_id in self._entries[start:end]]
+
+    def next_due(self, count=1, now=None):
+        """The next `count` task ids that are not yet overdue"""
+        now = time.time() if now is None else now
+        start = bisect.bisect_left(self._entries, (now,))
+        return [task_id for _, task_id in self._entries[start:start + count]]
@@ -0,0 +1,238 @@
+import os
+import re
+import sys
+import json
+import math
+import zlib
+import random
+import argparse
+from datetime import datetime
+
+MODEL_DIR = "classifier_data"
+MODEL_PATH = os.path.join(MODEL_DIR, "actionable_model.json")
+HISTORY_PATH = os.path.join(MODEL_DIR, "email_history.jsonl")
+
+N_BUCKETS = 1 << 18
+BODY_CHARS = 2000
+TOKEN = re.compile(r"[a-z0-9]{2,20}")
+ADDRESS = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+DATE_HINT = re.compile(r"\b(deadline|due|by (?:mon|tue|wed|thu|fri|sat|sun)|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})\b")
+
+
+def _bucket(feature):
+    return zlib.crc32(feature.encode("utf-8")) % N_BUCKETS
+
+
+def email_features(subject="", sender="", body=""):
+    """Hashed bag of features: subject and body words, sender domain and a
+    few cheap flags. Only the first BODY_CHARS of the body are read."""
+    features = {}
+
+    def add(name):
+        b = _bucket(name)
+        features[b] = features.get(b, 0) + 1
+
+    for tok in TOKEN.findall((subject or "").lower()):
+        add("s:" + tok)
+    sender = (sender or "").lower()
+    if "@" in sender:
+        add("d:" + sender.rsplit("@", 1)[1].strip("> "))
+    if "noreply" in sender or "no-reply" in sender:
+        add("flag:noreply")
+    text = (body or "")[:BODY_CHARS].lower()
+    for tok in TOKEN.findall(text):
+        add("b:" + tok)
+    if "unsubscribe" in text:
+        add("flag:unsubscribe")
+    if DATE_HINT.search(text):
+        add("flag:date")
+    return features
+
+
+def sender_text(sender):
+    """Flatten pyzmail's [(name, address), ...] or a plain string"""
+    if isinstance(sender, (list, tuple)):
+        return " ".join(" ".join(pair) if isinstance(pair, (list, tuple)) else str(pair) for pair in sender)
+    return sender or ""
+
+
+class ActionableEmailClassifier:
+    """Multinomial naive Bayes over hashed features, stored as a linear model.
+
+    score() is a dictionary lookup per feature plus a sigmoid, so it runs in
+    microseconds and lets the caller skip the LLM for mail that is very likely
+    a newsletter or digest.
+    """
+
+    def __init__(self, weights=None, bias=0.0, threshold=0.2):
+        self.weights = weights or {}
+        self.bias = bias
+        self.threshold = threshold
+
+    @property
+    def trained(self):
+        return bool(self.weights)
+
+    def train(self, examples, alpha=1.0, balanced=True):
+        """Fit from (features, label) pairs; label True means actionable.
+
+        With `balanced`, the class prior is ignored: history is dominated by
+        newsletters, and a skewed prior would trade away recall on rare
+        actionable mail.
+        """
+        counts = {True: {}, False: {}}
+        totals = {True: 0, False: 0}
+        docs = {True: 0, False: 0}
+        for features, label in examples:
+            label = bool(label)
+            docs[label] += 1
+            for b, n in features.items():
+                counts[label][b] = counts[label].get(b, 0) + n
+                totals[label] += n
+        if not docs[True] or not docs[False]:
+            raise ValueError("Training needs both actionable and non-actionable examples")
+
+        vocab = len(set(counts[True]) | set(counts[False]))
+        denom_pos = totals[True] + alpha * vocab
+        denom_neg = totals[False] + alpha * vocab
+        self.weights = {
+            b: math.log((counts[True].get(b, 0) + alpha) / denom_pos)
+               - math.log((counts[False].get(b, 0) + alpha) / denom_neg)
+            for b in set(counts[True]) | set(counts[False])
+        }
+        self.bias = 0.0 if balanced else math.log(docs[True] / docs[False])
+        return self
+
+    def score(self, features):
+        """Probability that the email contains tasks (1.0 when untrained)"""
+        if not self.weights:
+            return 1.0
+        z = self.bias + sum(self.weights.get(b, 0.0) * n for b, n in features.items())
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def is_actionable(self, subject="", sender="", body=""):
+        return self.score(email_features(subject, sender, body)) >= self.threshold
+
+    def save(self, path=MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"bias": self.bias, "threshold": self.threshold,
+                       "weights": {str(b): w for b, w in self.weights.items()}}, f)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH, threshold=None):
+        """Load a saved model; a missing file gives a pass-through classifier"""
+        if not os.path.exists(path):
+            return cls(threshold=threshold if threshold is not None else 0.2)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            weights={int(b): w for b, w in data["weights"].items()},
+            bias=data["bias"],
+            threshold=threshold if threshold is not None else data.get("threshold", 0.2),
+        )
+
+
+def record_history(subject, sender, body, task_count, path=HISTORY_PATH):
+    """Append one LLM-labelled email so the next training run can learn from it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "subject": subject,
+            "from": sender,
+            "body": (body or "")[:BODY_CHARS],
+            "task_count": task_count,
+            "recorded_at": datetime.now().isoformat(),
+        }, ensure_ascii=False) + "\n")
+
+
+def task_senders(history_path=HISTORY_PATH, limit=20):
+    """Addresses whose past mail yielded tasks, most tasks first"""
+    counts = {}
+    if os.path.exists(history_path):
+        with open(history_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row["task_count"] > 0:
+                        for address in ADDRESS.findall(row["from"] or ""):
+                            address = address.lower()
+                            counts[address] = counts.get(address, 0) + row["task_count"]
+    return sorted(counts, key=lambda a: (-counts[a], a))[:limit]
+
+
+def load_examples(history_path=HISTORY_PATH):
+    """Labelled examples from the LLM history plus the repo's seed data.
+
+    History rows are labelled by whether extraction found any task. Seeds:
+    the newsletter/digest mails in recent_tasks.json and the junk items in
+    email_todos.json are negatives; task titles from email_tasks.json and
+    extraction snapshots are positives.
+    """
+    examples = []
+    if os.path.exists(history_path):
+        with open(history_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    examples.append((email_features(row["subject"], row["from"], row["body"]), row["task_count"] > 0))
+
+    def seed(path):
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+
+    for row in seed("recent_tasks.json"):
+        examples.append((email_features(row.get("subject"), "", row.get("full_body") or row.get("snippet")), False))
+    for row in seed("email_todos.json"):
+        examples.append((email_features(row.get("title"), "", row.get("text")), False))
+    positives = seed("email_tasks.json") + seed(os.path.join("..", "email_tasks.json"))
+    for folder in ("task_data", os.path.join("task_data", "retired")):
+        if os.path.isdir(folder):
+            for name in sorted(os.listdir(folder)):
+                if name.startswith("extracted_tasks_") and name.endswith(".json"):
+                    positives += seed(os.path.join(folder, name))
+    for row in positives:
+        if isinstance(row, dict) and row.get("title"):
+            examples.append((email_features(row["title"], "", row["title"]), True))
+    return examples
+
+
+def evaluate(classifier, examples):
+    """Skip rate (share routed away from the LLM) and recall on actionable mail"""
+    skipped = [classifier.score(f) < classifier.threshold for f, _ in examples]
+    positives = [s for s, (_, label) in zip(skipped, examples) if label]
+    return {
+        "examples": len(examples),
+        "threshold": classifier.threshold,
+        "skip_rate": round(sum(skipped) / len(examples), 4) if examples else None,
+        "recall": round(sum(not s for s in positives) / len(positives), 4) if positives else None,
+    }
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Train or evaluate the actionable-email pre-classifier")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of examples kept for evaluation")
+    args = parser.parse_args()
+
+    examples = load_examples()
+    if args.command == "train":
+        random.Random(0).shuffle(examples)
+        cut = int(len(examples) * (1 - args.holdout))
+        classifier = ActionableEmailClassifier(threshold=args.threshold if args.threshold is not None else 0.2)
+        classifier.train(examples[:cut])
+        print(json.dumps(evaluate(classifier, examples[cut:]), indent=2))
+        classifier.train(examples)
+        classifier.save()
+        print(f"✔ Trained on {len(examples)} examples → {MODEL_PATH}")
+    else:
+        classifier = ActionableEmailClassifier.load(threshold=args.threshold)
+        print(json.dumps(evaluate(classifier, examples), indent=2))
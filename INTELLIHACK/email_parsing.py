@@ -0,0 +1,36 @@
+import pyzmail
+from profiling import profiled
+
+
+@profiled("mime_decode")
+def parse_raw_email(uid, raw_message):
+    """Decode an RFC822 message into the dict shape used across the pipeline.
+
+    Body is text/plain, falling back to text/html, like fetch_emails and
+    fetch_recent. Threading headers are kept for callers that need them.
+    """
+    message = pyzmail.PyzMessage.factory(raw_message)
+    try:
+        subject = message.get_subject() or ""
+    except Exception as e:
+        print(f"Error getting subject: {e}")
+        subject = "Subject unavailable"
+
+    body = ""
+    part = message.text_part or message.html_part
+    if part is not None:
+        try:
+            body = part.get_payload().decode(part.charset or "utf-8", errors="ignore")
+        except Exception as e:
+            print(f"Body decode error {uid}: {e}")
+
+    return {
+        "uid": uid,
+        "subject": subject,
+        "from": message.get_addresses("from"),
+        "body": body,
+        "date": message.get_decoded_header("date", ""),
+        "message_id": message.get_decoded_header("message-id", "").strip(),
+        "in_reply_to": message.get_decoded_header("in-reply-to", "").strip(),
+        "references": message.get_decoded_header("references", "").split(),
+    }
@@ -0,0 +1,146 @@
+import re
+import time
+import threading
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.utils import parseaddr, parsedate_to_datetime
+from deadlines import parse_deadline
+
+# Only these headers are fetched for scoring; BODY.PEEK leaves \Seen untouched
+HEADER_FIELDS = "FROM SUBJECT DATE LIST-UNSUBSCRIBE PRECEDENCE"
+PRIORITY_CLASSES = ("urgent", "high", "normal", "low")
+
+HAPPENING_NOW = re.compile(r"happening now|starting now|is inviting you to a video call|join now", re.IGNORECASE)
+INVITATION = re.compile(r"\binvitation\b|\binvite\b|\bmeeting\b|\bcall\b|\bzoom\b|\bgoogle meet\b|\bwebinar\b", re.IGNORECASE)
+TIME_CRITICAL = re.compile(r"\burgent\b|\basap\b|\bimmediately\b|\baction required\b|\breminder\b", re.IGNORECASE)
+NEAR_TERM = re.compile(r"\btoday\b|\btonight\b|\btomorrow\b|\bin \d+ (?:min(?:ute)?s?|hours?)\b", re.IGNORECASE)
+DATE_IN_SUBJECT = re.compile(
+    r"\d{4}-\d{2}-\d{2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{4}|[a-z]+\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}",
+    re.IGNORECASE,
+)
+CALENDAR_SENDERS = ("meetings-noreply@google.com", "calendar-notification@google.com", "zoom.us", "calendly.com")
+BULK_SENDERS = re.compile(r"newsletter|digest|marketing|promo|no-?reply|notifications?@", re.IGNORECASE)
+
+
+def _decode(value):
+    try:
+        return str(make_header(decode_header(value or "")))
+    except Exception:
+        return value or ""
+
+
+def parse_headers(raw):
+    """Header-only fetch result -> {subject, sender, sent_at, bulk}"""
+    headers = BytesHeaderParser().parsebytes(raw or b"")
+    try:
+        sent_at = parsedate_to_datetime(headers.get("Date")).timestamp()
+    except Exception:
+        sent_at = None
+    return {
+        "subject": _decode(headers.get("Subject")),
+        "sender": parseaddr(_decode(headers.get("From")))[1].lower(),
+        "sent_at": sent_at,
+        "bulk": bool(headers.get("List-Unsubscribe"))
+                or (headers.get("Precedence") or "").lower() in ("bulk", "list", "junk"),
+    }
+
+
+def urgency(headers, now=None):
+    """Score an email from cheap header signals; returns (score, class).
+
+    A "happening now" invite is only worth jumping the queue while it is
+    fresh; once it is hours old it is scored like any other invite.
+    """
+    now = now or time.time()
+    subject, sender = headers["subject"], headers["sender"]
+    age_hours = (now - headers["sent_at"]) / 3600 if headers["sent_at"] else None
+    fresh = age_hours is not None and age_hours < 2
+
+    score = 0
+    if HAPPENING_NOW.search(subject):
+        score += 60 if fresh else 15
+    elif INVITATION.search(subject):
+        score += 15
+    if TIME_CRITICAL.search(subject):
+        score += 20
+    if NEAR_TERM.search(subject):
+        score += 20
+    else:
+        for match in DATE_IN_SUBJECT.finditer(subject):
+            when = parse_deadline(match.group(0))
+            if when and 0 <= when.timestamp() - now <= 2 * 86400:
+                score += 20
+                break
+    if any(s in sender for s in CALENDAR_SENDERS):
+        score += 10
+    elif headers["bulk"] or BULK_SENDERS.search(sender):
+        score -= 25
+    if fresh:
+        score += 5
+
+    if score >= 50:
+        return score, "urgent"
+    if score >= 20:
+        return score, "high"
+    if score >= 0:
+        return score, "normal"
+    return score, "low"
+
+
+class PriorityScheduler:
+    """Orders a mailbox's candidate UIDs by urgency and tracks queue waits.
+
+    order() fetches only a few headers per message, then returns the UIDs
+    most urgent first (newest first within equal scores), so the extraction
+    pipeline reaches time-critical invites before newsletters. started()
+    records how long each message waited between scheduling and extraction.
+    """
+
+    def __init__(self, batch_size=200):
+        self.batch_size = batch_size
+        self.classes = {}
+        self._queued_at = {}
+        self._waits = {name: [] for name in PRIORITY_CLASSES}
+        self._lock = threading.Lock()
+
+    def order(self, server, uids, now=None):
+        now = now or time.time()
+        scored = []
+        for i in range(0, len(uids), self.batch_size):
+            chunk = uids[i:i + self.batch_size]
+            records = server.fetch(chunk, [f"BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})]"])
+            for uid in chunk:
+                raw = next((v for k, v in records.get(uid, {}).items() if k.startswith(b"BODY[HEADER")), b"")
+                score, name = urgency(parse_headers(raw), now)
+                scored.append((-score, -uid, uid, name))
+        scored.sort()
+
+        queued_at = time.perf_counter()
+        with self._lock:
+            for _, _, uid, name in scored:
+                self.classes[uid] = name
+                self._queued_at[uid] = queued_at
+        return [uid for _, _, uid, _ in scored]
+
+    def started(self, uid):
+        """Call when extraction of `uid` begins"""
+        with self._lock:
+            queued_at = self._queued_at.pop(uid, None)
+            if queued_at is not None:
+                self._waits[self.classes[uid]].append(time.perf_counter() - queued_at)
+
+    def report(self):
+        """Queue-wait seconds per priority class"""
+        with self._lock:
+            report = {}
+            for name, waits in self._waits.items():
+                if not waits:
+                    continue
+                ordered = sorted(waits)
+                report[name] = {
+                    "count": len(ordered),
+                    "mean_wait": round(sum(ordered) / len(ordered), 3),
+                    "p50_wait": round(ordered[len(ordered) // 2], 3),
+                    "max_wait": round(ordered[-1], 3),
+                }
+            return report
@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import time
+import hashlib
+import difflib
+import threading
+from email.utils import parsedate_to_datetime
+
+THREAD_DIR = "thread_data"
+THREAD_RETENTION_DAYS = 90
+# Kinds whose messages only join a thread through reply headers: every
+# "Happening now" invite has the same subject and sender but its own link
+REPLY_ONLY_KINDS = {"meetings"}
+
+REPLY_PREFIX = re.compile(r"^\s*(?:(?:re|fw|fwd|aw|sv)\s*(?:\[\d+\])?\s*:\s*|\[[^\]]{1,40}\]\s*)", re.IGNORECASE)
+QUOTE_ATTRIBUTION = re.compile(r"^\s*(?:on\b.{0,200}\bwrote:|le\b.{0,200}\ba écrit\s*:|am\b.{0,200}\bschrieb\b.*:)\s*$",
+                               re.IGNORECASE)
+ORIGINAL_MESSAGE = re.compile(r"^\s*-{2,}\s*original message\s*-{2,}\s*$", re.IGNORECASE)
+OUTLOOK_HEADER = re.compile(r"^\s*from:\s.+", re.IGNORECASE)
+OUTLOOK_FOLLOWUP = re.compile(r"^\s*(?:sent|date|to|subject):\s", re.IGNORECASE)
+WORDS = re.compile(r"[a-z0-9]+")
+
+
+def normalize_subject(subject):
+    """Lowercased subject without Re:/Fwd:/[list] prefixes; also whether any
+    reply or forward prefix was present"""
+    text = subject or ""
+    was_reply = False
+    while True:
+        match = REPLY_PREFIX.match(text)
+        if not match or not match.group(0):
+            break
+        was_reply = was_reply or not match.group(0).lstrip().startswith("[")
+        text = text[match.end():]
+    return " ".join(text.lower().split()), was_reply
+
+
+def strip_quoted(body):
+    """Only the new text of a message: drops ">" quoted lines and everything
+    after a reply attribution ("On ... wrote:") or an Outlook-style header
+    block. Forwarded messages are kept, since they bring new content."""
+    lines = (body or "").splitlines()
+    kept = []
+    for i, line in enumerate(lines):
+        if QUOTE_ATTRIBUTION.match(line) or ORIGINAL_MESSAGE.match(line):
+            break
+        # Gmail wraps long attributions: "On Mon, ... <a@b.com>" / "wrote:"
+        if line.strip().lower().startswith("on ") and i + 1 < len(lines) \
+                and lines[i + 1].strip().lower().endswith("wrote:"):
+            break
+        if OUTLOOK_HEADER.match(line) and any(OUTLOOK_FOLLOWUP.match(l) for l in lines[i + 1:i + 4]):
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def _title_key(title):
+    return " ".join(WORDS.findall((title or "").lower()))
+
+
+def _timestamp(email):
+    try:
+        return parsedate_to_datetime(email.get("date")).timestamp()
+    except Exception:
+        return time.time()
+
+
+class ThreadGroup:
+    """New messages of one thread seen in a window, oldest first"""
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.emails = []
+        self.parts = []
+        self.digests = []
+
+    @property
+    def latest(self):
+        return self.emails[-1]
+
+    @property
+    def new_content(self):
+        return "\n\n".join(self.parts)
+
+
+class ThreadIndex:
+    """Maps messages to conversations and remembers what each one yielded.
+
+    A message joins the thread of any Message-ID it references; without
+    references, a reply or forward joins the latest thread with the same
+    normalized subject, and any other message the latest thread with the
+    same subject from the same sender (repeated notifications). Kinds in
+    REPLY_ONLY_KINDS skip the subject matching. Per thread
+    the index keeps hashes of content already extracted and the tasks it
+    produced, with stable ids, so a changed thread updates its tasks.
+    Grouped content stays pending until mark_done(); only done content is
+    saved, so groups of an aborted run are extracted again next time.
+    """
+
+    def __init__(self, kind, folder=THREAD_DIR, scope=None):
+        # One index per extraction kind: content already sent for tasks has
+        # not necessarily been sent for meetings
+        self.path = os.path.join(folder, f"{kind}_threads.json")
+        # Prefix of task ids, e.g. the account when several indexes feed one store
+        self.scope = scope
+        self.match_subjects = kind not in REPLY_ONLY_KINDS
+        path = self.path
+        self.messages = {}   # Message-ID -> thread id
+        self.subjects = {}   # subject key -> thread id
+        self.threads = {}    # thread id -> {"last_seen", "content", "tasks"}
+        self.pending = {}    # thread id -> digests grouped but not yet extracted
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.messages, self.subjects, self.threads = data["messages"], data["subjects"], data["threads"]
+
+    def resolve(self, email):
+        """Thread id for an email, registering it in the index"""
+        sender = (email["from"][0][1] if email.get("from") else "") or ""
+        subject, was_reply = normalize_subject(email.get("subject"))
+        refs = [r for r in [*email.get("references", []), email.get("in_reply_to")] if r]
+        message_id = email.get("message_id")
+
+        with self._lock:
+            thread_id = next((self.messages[r] for r in refs if r in self.messages), None)
+            subject_key = subject if was_reply else f"{sender.lower()}|{subject}"
+            if thread_id is None and refs:
+                thread_id = refs[0]
+            if thread_id is None and subject and self.match_subjects:
+                thread_id = self.subjects.get(subject) if was_reply else self.subjects.get(subject_key)
+            if thread_id is None:
+                thread_id = message_id or f"uid:{email['uid']}"
+
+            if message_id:
+                self.messages[message_id] = thread_id
+            if subject and self.match_subjects:
+                self.subjects[subject] = thread_id
+                self.subjects[f"{sender.lower()}|{subject}"] = thread_id
+            thread = self.threads.setdefault(thread_id, {"last_seen": 0, "content": [], "tasks": []})
+            thread["last_seen"] = time.time()
+            return thread_id
+
+    def group(self, emails):
+        """Group a window of emails into ThreadGroups of unseen new content.
+
+        Messages whose new text was already extracted or is pending for their
+        thread (pure quotes, repeated identical notifications) are left out;
+        threads with nothing new produce no group. Groups keep the order in which their
+        threads first appear in `emails` (e.g. priority order).
+        """
+        position = {id(email): i for i, email in enumerate(emails)}
+        first_seen = {}
+        groups = {}
+        for email in sorted(emails, key=_timestamp):
+            thread_id = self.resolve(email)
+            content = strip_quoted(email.get("body"))
+            digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+            with self._lock:
+                pending = self.pending.setdefault(thread_id, set())
+                if not content or digest in self.threads[thread_id]["content"] or digest in pending:
+                    continue
+                pending.add(digest)
+            group = groups.setdefault(thread_id, ThreadGroup(thread_id))
+            group.emails.append(email)
+            group.parts.append(content)
+            group.digests.append(digest)
+            first_seen[thread_id] = min(first_seen.get(thread_id, len(position)), position[id(email)])
+        return sorted(groups.values(), key=lambda g: first_seen[g.thread_id])
+
+    def mark_done(self, group):
+        """Record a group's content as extracted once its extraction succeeded"""
+        with self._lock:
+            pending = self.pending.get(group.thread_id, set())
+            seen = self.threads[group.thread_id]["content"]
+            for digest in group.digests:
+                pending.discard(digest)
+                if digest not in seen:
+                    seen.append(digest)
+
+    def forget(self, group):
+        """Drop a group's pending content after a failed extraction, so the
+        next window or run sends it again"""
+        with self._lock:
+            pending = self.pending.get(group.thread_id, set())
+            for digest in group.digests:
+                pending.discard(digest)
+
+    def merge_tasks(self, thread_id, extracted):
+        """Fold newly extracted tasks into the thread's task list.
+
+        A task whose title matches an earlier one (exactly or closely) keeps
+        that task's id and is updated in place; others are added. Returns
+        the thread's full task list.
+        """
+        with self._lock:
+            tasks = self.threads[thread_id]["tasks"]
+            for item in extracted:
+                title = (item.get("title") or "").strip()
+                if not title:
+                    continue
+                key = _title_key(title)
+                match = next((t for t in tasks if _title_key(t["title"]) == key), None)
+                if match is None:
+                    scored = [(difflib.SequenceMatcher(None, key, _title_key(t["title"])).ratio(), t) for t in tasks]
+                    best = max(scored, key=lambda s: s[0], default=(0, None))
+                    match = best[1] if best[0] >= 0.75 else None
+                if match is None:
+                    key = f"{self.scope}/{thread_id}:{title}" if self.scope else f"{thread_id}:{title}"
+                    task_id = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+                    tasks.append({"task_id": task_id, "title": title, "due_date": item.get("due_date")})
+                else:
+                    match["title"] = title
+                    match["due_date"] = item.get("due_date") or match["due_date"]
+            return [dict(t) for t in tasks]
+
+    def save(self):
+        cutoff = time.time() - THREAD_RETENTION_DAYS * 86400
+        with self._lock:
+            self.threads = {tid: t for tid, t in self.threads.items() if t["last_seen"] >= cutoff}
+            self.messages = {m: tid for m, tid in self.messages.items() if tid in self.threads}
+            self.subjects = {s: tid for s, tid in self.subjects.items() if tid in self.threads}
+            data = {"messages": self.messages, "subjects": self.subjects, "threads": self.threads}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def iter_windows(emails, window=25):
+    batch = []
+    for email in emails:
+        batch.append(email)
+        if len(batch) >= window:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_thread_groups(emails, index, window=25):
+    """Group a stream of parsed emails window by window.
+
+    Messages of one thread that fall in different windows become separate
+    groups, but both update the same thread record.
+    """
+    for batch in iter_windows(emails, window):
+        yield from index.group(batch)
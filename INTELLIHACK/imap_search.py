@@ -0,0 +1,79 @@
+import os
+from datetime import datetime, timedelta
+
+# Server-side candidate filters. IMAP BODY/TEXT matches are case-insensitive
+# substrings, so they never drop a message the local checks would keep.
+MEETING_TERMS = ("meet.google.com", "zoom.us")
+DEFAULT_TASK_TERMS = "task,deadline,due,todo,to do,action item,action required,asap,reminder,follow up"
+GMAIL_CAPABILITY = "X-GM-EXT-1"
+
+
+def task_terms():
+    return tuple(t.strip() for t in os.getenv("TASK_SEARCH_TERMS", DEFAULT_TASK_TERMS).split(",") if t.strip())
+
+
+def or_criteria(terms=(), senders=(), field="TEXT"):
+    """IMAP SEARCH keys matching any term in `field` or any sender.
+
+    IMAP's OR takes exactly two keys, so n alternatives become n-1 prefix
+    ORs: OR a OR b c.
+    """
+    keys = [[field, term] for term in terms] + [["FROM", sender] for sender in senders]
+    criteria = []
+    for i, key in enumerate(keys):
+        if i < len(keys) - 1:
+            criteria.append("OR")
+        criteria.extend(key)
+    return criteria
+
+
+def gmail_query(since_days=None, terms=(), senders=()):
+    """The same filter as a Gmail search (X-GM-RAW) query"""
+    alternatives = [f'"{term}"' for term in terms] + [f"from:{sender}" for sender in senders]
+    query = f"({' OR '.join(alternatives)})" if alternatives else ""
+    if since_days is not None:
+        query = f"newer_than:{since_days}d {query}".strip()
+    return query
+
+
+def search_candidates(server, days_back=None, terms=(), senders=(), field="TEXT", last=None):
+    """UIDs worth fetching from the selected folder; returns (candidates, total).
+
+    The window is the last `days_back` days or, with `last`, the `last`
+    most recent messages. `total` is what the window alone matches, so
+    callers can report how much the pushdown saved. Gmail gets a single
+    X-GM-RAW query for a date window; otherwise a SEARCH with OR'ed
+    BODY/TEXT/FROM keys runs within the window. Without terms or senders
+    every message in the window is a candidate.
+    """
+    base = ["ALL"]
+    if days_back is not None:
+        base = ["SINCE", (datetime.now() - timedelta(days=days_back)).strftime("%d-%b-%Y")]
+    total = server.search(base)
+    if last is not None:
+        total = total[-last:] if last > 0 else []
+        if not total:
+            return [], []
+        # A UID range keeps the server-side search inside those messages
+        base = ["UID", f"{min(total)}:{max(total)}"]
+    if not terms and not senders:
+        return total, total
+    if last is None and server.has_capability(GMAIL_CAPABILITY):
+        # newer_than counts back from now, SINCE from midnight: widen by a
+        # day and keep to the window
+        since_days = days_back + 1 if days_back is not None else None
+        candidates = server.gmail_search(gmail_query(since_days, terms, senders))
+    else:
+        candidates = server.search(base + or_criteria(terms, senders, field))
+    window = set(total)
+    return sorted(uid for uid in candidates if uid in window), total
+
+
+def report(kind, candidates, total, days_back=None, last=None):
+    """One line on how many messages the pushdown kept out of the fetch"""
+    window = f" from the last {days_back} days" if days_back is not None else ""
+    if last is not None:
+        window = f" among the last {last} messages"
+    share = f" ({len(candidates) / len(total):.0%})" if total else ""
+    print(f"Found {len(total)} emails{window}; {len(candidates)}{share} {kind} candidates after server-side search.")
+    return {"total": len(total), "candidates": len(candidates)}
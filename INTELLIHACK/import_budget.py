@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Entry point -> (import-time budget in ms, modules it must not load at import).
+# The budgets leave room for slow disks; the forbidden lists are the real
+# contract: each mode loads its client stack when it is used, not before.
+ENTRY_POINTS = {
+    "main": (150, ("flask", "flask_cors", "openai", "httpx", "imaplib", "numpy", "cProfile")),
+    "server": (400, ("openai", "httpx", "imaplib", "numpy")),
+    "TODO": (150, ("openai", "httpx", "imapclient", "cProfile")),
+    "mail": (150, ("openai", "httpx", "imapclient", "googleapiclient", "google_auth_oauthlib", "pytz")),
+    "offline_ingest": (150, ("openai", "httpx", "imapclient", "googleapiclient")),
+    "multi_account": (100, ("openai", "httpx", "imapclient")),
+}
+
+
+def measure(module, runs=3):
+    """Import `module` in fresh interpreters under -X importtime.
+
+    Returns the best cumulative import time in ms, the modules it loaded
+    and its heaviest imports as (name, ms), or raises RuntimeError with the
+    import error.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    env.setdefault("PERPLEXITY_API_KEY", "import-budget")
+    best, loaded, heaviest = None, set(), []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=here, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        rows = []
+        for line in result.stderr.splitlines():
+            # "import time: <self us> | <cumulative us> | <indented name>"
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                rows.append((name.strip(), len(name) - len(name.lstrip()), int(cumulative) / 1000))
+        at = next((i for i, row in enumerate(rows) if row[0] == module), None)
+        if at is None:
+            continue
+        _, depth, total = rows[at]
+        if best is None or total < best:
+            best = total
+            # A module is listed after everything it imported, one level deeper
+            start = at
+            while start > 0 and rows[start - 1][1] > depth:
+                start -= 1
+            loaded = {name for name, _, _ in rows[start:at + 1]}
+            children = [(name, ms) for name, d, ms in rows[start:at] if d == depth + 2]
+            heaviest = sorted(children, key=lambda row: -row[1])[:5]
+    return best, loaded, heaviest
+
+
+def check(modules, runs=3):
+    """One result dict per entry point; "ok" is False when over budget,
+    when a forbidden module was loaded, or when the import failed"""
+    results = []
+    for module in modules:
+        budget, forbidden = ENTRY_POINTS[module]
+        try:
+            ms, loaded, heaviest = measure(module, runs)
+        except RuntimeError as e:
+            results.append({"module": module, "ok": False, "error": str(e), "budget_ms": budget})
+            continue
+        # A package counts as loaded when any of its submodules is
+        leaked = sorted(f for f in forbidden if any(name == f or name.startswith(f + ".") for name in loaded))
+        results.append({
+            "module": module,
+            "ms": round(ms, 1),
+            "budget_ms": budget,
+            "forbidden_loaded": leaked,
+            "heaviest": [{"module": name, "ms": round(t, 1)} for name, t in heaviest],
+            "ok": ms <= budget and not leaked,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Check entry-point import times with -X importtime")
+    parser.add_argument("modules", nargs="*", help=f"entry points to check (default: {', '.join(ENTRY_POINTS)})")
+    parser.add_argument("--runs", type=int, default=3, help="imports per module; the fastest counts")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    unknown = [m for m in args.modules if m not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(unknown)}")
+    results = check(args.modules or list(ENTRY_POINTS), args.runs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            mark = "✔" if r["ok"] else "✘"
+            if "error" in r:
+                print(f"{mark} {r['module']:<16} import failed: {r['error']}")
+                continue
+            print(f"{mark} {r['module']:<16} {r['ms']:7.1f} ms (budget {r['budget_ms']} ms)")
+            if r["forbidden_loaded"]:
+                print(f"    loads at import: {', '.join(r['forbidden_loaded'])}")
+            print("    heaviest: " + ", ".join(f"{h['module']} {h['ms']:.1f} ms" for h in r["heaviest"]))
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
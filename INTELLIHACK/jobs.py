@@ -0,0 +1,99 @@
+import uuid
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def update(self, **progress):
+        """Progress callback handed to the job's function"""
+        with self._lock:
+            self.progress.update(progress)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """Runs long operations off the request path.
+
+    submit() returns immediately with a Job whose progress can be polled.
+    Jobs are deduplicated by key: while a job with the same key is queued
+    or running, submitting again returns that job instead of starting a
+    second one. The most recent `keep` finished jobs stay queryable.
+    """
+
+    def __init__(self, workers=2, keep=100):
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, key=None):
+        """Queue `func(job)`; returns (job, created)"""
+        key = key or kind
+        with self._lock:
+            running = self._active.get(key)
+            if running is not None:
+                return running, False
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._prune()
+        self._executor.submit(self._run, job, func)
+        return job, True
+
+    def _run(self, job, func):
+        with job._lock:
+            job.status = "running"
+            job.started_at = datetime.now().isoformat()
+        try:
+            result = func(job)
+            status, error = "succeeded", None
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            result, status, error = None, "failed", str(e)
+        with job._lock:
+            job.result, job.status, job.error = result, status, error
+            job.finished_at = datetime.now().isoformat()
+        with self._lock:
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+import httpx
+import openai
+
+LOADTEST_API_KEY = "loadtest-fake-key"
+QUESTIONS = [
+    "What tasks are due this week?",
+    "Summarize my pending tasks",
+    "What is the capital of France?",
+    "How should I prioritize the overdue tasks?",
+    "Give me tips for running a sprint review",
+]
+
+
+class FakeCompletions:
+    """Stands in for chat.completions: sleeps a configurable latency and
+    returns canned content, optionally failing a fraction of calls with a
+    transient error so retries and the circuit breaker are exercised."""
+
+    def __init__(self, latency=0.3, jitter=0.1, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    def create(self, model=None, messages=None, stream=False, timeout=None, **kwargs):
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if random.random() < self.error_rate:
+            raise openai.APIConnectionError(request=httpx.Request("POST", "https://fake.invalid/chat/completions"))
+        content = f"Load test answer for: {messages[-1]['content'][-80:]}" if not stream else "[]"
+        if stream:
+            chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+            return _FakeStream([chunk])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class _FakeStream(list):
+    def close(self):
+        pass
+
+
+def install_fake_perplexity(latency, jitter, error_rate):
+    """Register a real PerplexityClient (retries, breaker, stats) whose
+    upstream is FakeCompletions, under the key the harness exports"""
+    from perplexity_client import PerplexityClient, register_client
+
+    client = PerplexityClient(LOADTEST_API_KEY)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(latency, jitter, error_rate)))
+    register_client(LOADTEST_API_KEY, client)
+    os.environ["PERPLEXITY_API_KEY"] = LOADTEST_API_KEY
+    return client
+
+
+def seed_tasks(count, folder="task_data"):
+    """Write `count` synthetic single-task files; returns their ids"""
+    os.makedirs(folder, exist_ok=True)
+    now = datetime.now()
+    ids = []
+    for i in range(count):
+        task_id = f"lt{i:06d}"
+        created = (now - timedelta(days=random.randint(0, 30))).isoformat()
+        task = {
+            "id": task_id,
+            "description": f"Synthetic load-test task {i}",
+            "status": random.choice(["pending", "pending", "in_progress", "completed"]),
+            "progress": random.randint(0, 100),
+            "created_at": created,
+            "updated_at": created,
+            "deadline": (now + timedelta(days=random.randint(-5, 20))).strftime("%Y-%m-%d"),
+            "priority": random.choice(["high", "medium", "low"]),
+            "source": "loadtest",
+            "sender": f"user{i % 50}@example.com",
+            "notes": [{"text": "Seeded by loadtest.py", "timestamp": created}],
+        }
+        with open(os.path.join(folder, f"task_{task_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(task, f)
+        ids.append(task_id)
+    return ids
+
+
+def _list_tasks(ids):
+    return "GET /api/tasks", "GET", "/api/tasks", None
+
+
+def _list_pending(ids):
+    return "GET /api/tasks?status", "GET", "/api/tasks?status=pending", None
+
+
+def _get_task(ids):
+    return "GET /api/tasks/<id>", "GET", f"/api/tasks/{random.choice(ids)}", None
+
+
+def _put_task(ids):
+    body = random.choice([
+        {"progress": random.randint(0, 100)},
+        {"status": random.choice(["pending", "in_progress", "completed"])},
+        {"note": "Load test update"},
+    ])
+    return "PUT /api/tasks/<id>", "PUT", f"/api/tasks/{random.choice(ids)}", body
+
+
+def _chat(ids):
+    body = {"message": random.choice(QUESTIONS), "fresh": random.random() < 0.1}
+    return "POST /api/chat", "POST", "/api/chat", body
+
+
+def _fetch_email(ids):
+    return "POST /api/fetch-email-tasks", "POST", "/api/fetch-email-tasks", {}
+
+
+# Scenario -> [(weight, request builder)]
+SCENARIOS = {
+    "read-heavy": [(70, _list_tasks), (10, _list_pending), (20, _get_task)],
+    "mixed": [(35, _list_tasks), (30, _get_task), (30, _put_task), (5, _fetch_email)],
+    "chat-burst": [(85, _chat), (15, _list_tasks)],
+}
+
+
+def fetch_task_ids(base_url, timeout=60):
+    """Ids of the tasks a running server holds, from GET /api/tasks"""
+    with urllib.request.urlopen(base_url + "/api/tasks", timeout=timeout) as response:
+        return list(json.load(response))
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class LoadRunner:
+    """Closed-loop load: `concurrency` workers each send the next request as
+    soon as the previous one finishes, for `duration` seconds."""
+
+    def __init__(self, base_url, scenario, task_ids, concurrency=8, duration=30, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.builders = SCENARIOS[scenario]
+        self.task_ids = task_ids
+        self.concurrency = concurrency
+        self.duration = duration
+        self.timeout = timeout
+        self.results = []
+        self._lock = threading.Lock()
+
+    def _pick(self):
+        weights = [w for w, _ in self.builders]
+        return random.choices([b for _, b in self.builders], weights)[0](self.task_ids)
+
+    def _send(self, method, path, body):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def _worker(self, deadline):
+        results = []
+        while time.perf_counter() < deadline:
+            label, method, path, body = self._pick()
+            started = time.perf_counter()
+            try:
+                status = self._send(method, path, body)
+            except Exception:
+                status = None
+            results.append((label, status, time.perf_counter() - started))
+        with self._lock:
+            self.results.extend(results)
+
+    def run(self):
+        started = time.perf_counter()
+        deadline = started + self.duration
+        workers = [threading.Thread(target=self._worker, args=(deadline,)) for _ in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        by_label = {}
+        for label, status, latency in self.results:
+            by_label.setdefault(label, []).append((status, latency))
+        by_label["total"] = [(status, latency) for _, status, latency in self.results]
+
+        report = {}
+        for label, samples in by_label.items():
+            latencies = sorted(latency for _, latency in samples)
+            errors = sum(1 for status, _ in samples if status is None or status >= 400)
+            report[label] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                "p90_ms": round(_percentile(latencies, 90) * 1000, 1),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+                "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            }
+        return report
+
+
+def start_local_server(port=0):
+    """Serve create_app() from a background thread; returns the base URL"""
+    from werkzeug.serving import make_server
+    from main import create_app
+
+    server = make_server("127.0.0.1", port, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def print_report(scenario, report):
+    print(f"\nScenario {scenario}:")
+    print(f"  {'route':<30} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for label, row in sorted(report.items(), key=lambda item: item[0] == "total"):
+        print(f"  {label:<30} {row['requests']:>7} {row['throughput_rps']:>8} {row['error_rate'] * 100:>5.1f}% "
+              f"{row['p50_ms']:>7}ms {row['p90_ms']:>7}ms {row['p99_ms']:>7}ms {row['max_ms']:>7}ms")
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Load-test the task and chat API")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help=f"any of {', '.join(SCENARIOS)}")
+    parser.add_argument("--tasks", type=int, default=1000, help="synthetic tasks to seed")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="seconds per scenario")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Perplexity mean latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="fake Perplexity latency stddev (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake calls that fail")
+    parser.add_argument("--url", help="target a running server instead (no seeding or fake upstream)")
+    parser.add_argument("--task-ids", help="with --url: comma-separated task ids to use (default: all the server's)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    output = os.path.abspath(args.json) if args.json else None
+    if args.url:
+        base_url = args.url
+        if args.task_ids:
+            task_ids = [task_id for task_id in args.task_ids.split(",") if task_id]
+        else:
+            task_ids = fetch_task_ids(base_url)
+        if not task_ids:
+            parser.error("no task ids: pass --task-ids or target a server that has tasks")
+    else:
+        # Run in a scratch directory so seeded tasks never touch real task_data/.
+        # An empty EMAIL_USER (which .env cannot override) keeps
+        # /api/fetch-email-tasks off the real mailbox: it measures the route only.
+        os.environ["EMAIL_USER"] = ""
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        os.chdir(tempfile.mkdtemp(prefix="loadtest_"))
+        task_ids = seed_tasks(args.tasks)
+        install_fake_perplexity(args.latency, args.jitter, args.error_rate)
+        base_url = start_local_server()
+        print(f"Seeded {len(task_ids)} tasks in {os.getcwd()}, serving on {base_url}")
+
+    reports = {}
+    for scenario in args.scenarios:
+        runner = LoadRunner(base_url, scenario, task_ids, args.concurrency, args.duration)
+        reports[scenario] = runner.run()
+        print_report(scenario, reports[scenario])
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n✔ Report written to {output}")
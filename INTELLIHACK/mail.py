@@ -1,16 +1,20 @@
 import os
-import json
 from datetime import datetime, timedelta
 import re
-from openai import OpenAI
 from dotenv import load_dotenv
-from imapclient import IMAPClient
-import pyzmail
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-import pytz
+from meeting_index import MeetingIndex
+from email_parsing import parse_raw_email
+from pipeline import Pipeline, JsonArrayWriter
+from email_priority import PriorityScheduler
+from email_threads import ThreadIndex, iter_thread_groups
+from mail_archive import MailArchive
+from imap_search import MEETING_TERMS, report, search_candidates
+from perplexity_client import get_client
+from stream_json import iter_stream_json
+from profiling import Profile, cli_flag, profiled
+
+# The IMAP and Google Calendar client stacks are imported by the functions
+# that use them, so importing this module for extraction stays cheap.
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
@@ -22,8 +26,9 @@ class PerplexityEmailAgent:
         if not self.api_key:
             raise ValueError("PERPLEXITY_API_KEY environment variable not set")
 
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai")
+        self.client = get_client(self.api_key)
 
+    @profiled("extract_meeting_info")
     def extract_meeting_info(self, email_text):
         system_prompt = (
             "You are a highly skilled AI assistant, expert in identifying and extracting meeting information from email text. "
@@ -43,30 +48,30 @@ class PerplexityEmailAgent:
         ]
 
         try:
-            response = self.client.chat.completions.create(
-                model="sonar-pro",
+            stream = self.client.complete(
+                task="extract_meeting",
                 messages=messages,
-                temperature=0.1  # Reduced temperature for more consistent output
+                temperature=0.1,  # Reduced temperature for more consistent output
+                stream=True
             )
-            content = response.choices[0].message.content.strip()
-
-            # Extract JSON from response
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            json_str = content[start:end]
-            try:
-                meeting_info = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {e}, Content: {json_str}")
+            # Parse the first JSON object as it streams; generation stops once it closes
+            items = iter_stream_json(stream, mode="object")
+            meeting_info = next(items, None)
+            items.close()
+            if not isinstance(meeting_info, dict):
+                print("No JSON object found in meeting extraction response")
                 return {}
-
             return meeting_info
         except Exception as e:
             print(f"Error during extraction: {e}")
             return {"error": str(e)}
 
-def add_meeting_to_calendar(meeting_info):
-    """Adds meeting details to Google Calendar."""
+def get_calendar_credentials():
+    """Load, refresh or obtain Google Calendar credentials; None on failure."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -80,26 +85,61 @@ def add_meeting_to_calendar(meeting_info):
                 creds.refresh(Request())
             except Exception as e:
                 print(f"Error refreshing credentials: {e}")
-                return  # Stop if refresh fails
+                return None  # Stop if refresh fails
         else:
             try:
                 # Check if credentials.json exists
                 if not os.path.exists('credentials.json'):
                     print("Error: credentials.json file not found in the same directory as the script.")
-                    return
+                    return None
 
                 flow = InstalledAppFlow.from_client_secrets_file(
                     'credentials.json', SCOPES)
                 creds = flow.run_local_server(port=0)
             except FileNotFoundError:
                 print("Error: credentials.json file not found.  Make sure it is in the same directory")
-                return  # Stop if not found
+                return None  # Stop if not found
             except Exception as e:
                 print(f"Error during authentication flow: {e}")
-                return
+                return None
         # Save the credentials for the next run
         with open('token.json', 'w') as token:
             token.write(creds.to_json())
+    return creds
+
+def sync_calendar_events(index, days_ahead=14):
+    """Pull upcoming Google Calendar events into the local meeting index."""
+    import pytz
+    from googleapiclient.discovery import build
+
+    creds = get_calendar_credentials()
+    if creds is None:
+        return 0
+    try:
+        service = build('calendar', 'v3', credentials=creds)
+        now = datetime.now(pytz.UTC)
+        events = service.events().list(
+            calendarId='primary',
+            timeMin=now.isoformat(),
+            timeMax=(now + timedelta(days=days_ahead)).isoformat(),
+            singleEvents=True,
+            orderBy='startTime'
+        ).execute().get('items', [])
+        added = index.sync_events(events)
+        print(f"Synced {added} calendar events into the meeting index")
+        return added
+    except Exception as e:
+        print(f"Error syncing calendar events: {e}")
+        return 0
+
+def add_meeting_to_calendar(meeting_info):
+    """Adds meeting details to Google Calendar."""
+    import pytz
+    from googleapiclient.discovery import build
+
+    creds = get_calendar_credentials()
+    if creds is None:
+        return
 
     try:
         service = build('calendar', 'v3', credentials=creds)
@@ -181,114 +221,161 @@ def add_meeting_to_calendar(meeting_info):
         print(f"An error occurred: {e}")
 
 class EmailInboxProcessor:
-    def __init__(self):
+    def __init__(self, offline=False):
+        # Offline processors (mail exports) only extract and store, never fetch
         load_dotenv()
         self.host = os.getenv("EMAIL_HOST")
         self.user = os.getenv("EMAIL_USER")
         self.password = os.getenv("EMAIL_PASS")
-        if not all([self.host, self.user, self.password]):
+        if not offline and not all([self.host, self.user, self.password]):
             raise ValueError("Email credentials not fully set in environment variables")
         self.agent = PerplexityEmailAgent()
+        self.scheduler = None
+        self.threads = ThreadIndex("meetings")
+        self.archive = None if offline else MailArchive()
+        self.search_counts = None
+        self.failed_uids = []  # messages whose extraction failed, to retry later
+
+    def iter_raw_emails(self, folder="INBOX", limit=50, days_back=7, batch_size=10, scheduler=None,
+                        pushdown=True):
+        """Yield (uid, raw RFC822 bytes), fetching batch_size messages per round trip.
+
+        With `pushdown`, the server only returns messages whose body has a
+        meeting link, since extraction skips everything else anyway. With a
+        scheduler, messages come out most urgent first instead of in UID
+        order. Messages already in the local archive are not downloaded
+        again."""
+        from imapclient import IMAPClient
 
-    def fetch_emails(self, folder="INBOX", limit=50, days_back=7):
         with IMAPClient(self.host) as server:
             server.login(self.user, self.password)
-            server.select_folder(folder)
-            
-            # Search for all emails from the last N days
-            since_date = (datetime.now() - timedelta(days=days_back)).strftime("%d-%b-%Y")
-            messages = server.search(['SINCE', since_date])
+            info = server.select_folder(folder)
             
-            print(f"Found {len(messages)} emails from the last {days_back} days.")
+            # Search for (meeting candidate) emails from the last N days
+            terms = MEETING_TERMS if pushdown else ()
+            messages, in_window = search_candidates(server, days_back, terms, field="BODY")
+            self.search_counts = report("meeting", messages, in_window, days_back)
             
             # Get most recent emails up to the limit
             messages = messages[-limit:] if len(messages) > limit else messages
+            if scheduler is not None:
+                messages = scheduler.order(server, messages)
 
-            emails = []
-            for uid in messages:
-                raw_message = server.fetch([uid], ['RFC822'])[uid][b'RFC822']
-                message = pyzmail.PyzMessage.factory(raw_message)
-                subject = None  # Initialize subject
-                try:
-                    subject = message.get_subject()
-                except Exception as e:
-                    print(f"Error getting subject: {e}")
-                    subject = "Subject unavailable"
-
-                from_ = message.get_addresses('from')
-                # Extract text/plain or fallback to html
-                if message.text_part:
-                    try:
-                        body = message.text_part.get_payload().decode(message.text_part.charset or 'utf-8', errors='ignore')
-                    except Exception as e:
-                        print(f"Text part decode error {uid}: {e}")
-                        body = ""
-                elif message.html_part:
-                    try:
-                        body = message.html_part.get_payload().decode(message.html_part.charset or 'utf-8', errors='ignore')
-                    except Exception as e:
-                        print(f"HTML part decode error {uid}: {e}")
-                        body = ""
-                else:
-                    body = ""
-
-                emails.append({
-                    "uid": uid,
-                    "subject": subject,
-                    "from": from_,
-                    "body": body
-                })
-            return emails
-
-    def process_emails(self, days_back=7):
-        emails = self.fetch_emails(days_back=days_back)
-        results = []
-        for email in emails:
+            yield from self.archive.fetch(server, folder, messages, info.get(b'UIDVALIDITY'),
+                                          account=self.user, batch_size=batch_size)
+
+    def fetch_emails(self, folder="INBOX", limit=50, days_back=7, pushdown=True):
+        return [parse_raw_email(uid, raw) for uid, raw in
+                self.iter_raw_emails(folder, limit, days_back, pushdown=pushdown)]
+
+    def _extract_thread(self, group):
+        """Extraction stage: one call over a thread's new, non-quoted content;
+        returns (latest email, meeting_info, thread_id) or None to drop it"""
+        email = group.latest
+        if self.scheduler is not None:
+            for message in group.emails:
+                self.scheduler.started(message['uid'])
+        try:
+            print(f"Processing email UID {email['uid']} Subject: {email['subject']} "
+                  f"({len(group.emails)} new message(s) in thread)")
+        except UnicodeEncodeError as e:
+            print(f"Could not print email info due to encoding error: {e}")
+        content = group.new_content
+        if "meet.google.com" in content or "zoom.us" in content: #check emails for link and process
             try:
-                print(f"Processing email UID {email['uid']} Subject: {email['subject']}")
-            except UnicodeEncodeError as e:
-                print(f"Could not print email info due to encoding error: {e}")
-            if "meet.google.com" in email['body'] or "zoom.us" in email['body']: #check emails for link and process
-                meeting_info = self.agent.extract_meeting_info(email['body'])
-
-                if meeting_info and meeting_info != {}:  # Check for non-empty meeting information
-                    add_meeting_to_calendar(meeting_info)
-                    print(f"Added meeting to calendar for email {email['uid']}")
-                    results.append({
-                        "email_uid": email['uid'],
-                        "subject": email['subject'],
-                        "from": email['from'],
-                        "meeting_info": meeting_info
-                    })
-                else:
-                    print(f"No meeting information found in email {email['uid']}")
-            else:
-                print(f"Skipping email {email['uid']} as no gmeet/zoom link was found")
+                meeting_info = self.agent.extract_meeting_info(content)
+            except Exception:
+                self.threads.forget(group)
+                raise
+            if "error" in meeting_info:
+                self.threads.forget(group)
+                self.failed_uids.extend(message['uid'] for message in group.emails)
+                print(f"Extraction failed for email {email['uid']}: {meeting_info['error']}")
+                return None
+            self.threads.mark_done(group)
+            if meeting_info and meeting_info != {}:  # Check for non-empty meeting information
+                return email, meeting_info, group.thread_id
+            print(f"No meeting information found in email {email['uid']}")
+        else:
+            self.threads.mark_done(group)
+            print(f"Skipping email {email['uid']} as no gmeet/zoom link was found")
+        return None
 
-        return results
+    def store_meeting(self, index, email, meeting_info, add_to_calendar=True, thread_id=None):
+        """Record an extracted meeting in the index (and calendar); returns the
+        meeting_data record"""
+        sender = email['from'][0][1] if email['from'] else None
+        item, duplicates, conflicts = index.add_meeting(meeting_info, email['uid'], sender)
+        if duplicates:
+            print(f"Skipping email {email['uid']}: duplicates meeting from email {duplicates[0].get('email_uid')}")
+        elif add_to_calendar:
+            add_meeting_to_calendar(meeting_info)
+            print(f"Added meeting to calendar for email {email['uid']}")
+        if conflicts:
+            print(f"Warning: meeting from email {email['uid']} overlaps {len(conflicts)} existing meeting(s)")
+        return {
+            "email_uid": email['uid'],
+            "thread_id": thread_id,
+            "priority": self.scheduler.classes.get(email['uid']) if self.scheduler else None,
+            "subject": email['subject'],
+            "from": email['from'],
+            "meeting_info": meeting_info,
+            "duplicate_of": [d.get("email_uid") or d["id"] for d in duplicates],
+            "conflicts_with": [c.get("email_uid") or c["id"] for c in conflicts]
+        }
+
+    def iter_processed(self, days_back=7, limit=50, sync_calendar=False, buffer_size=8, extract_workers=2,
+                       prioritize=True):
+        """Stream meeting results: fetch -> parse -> extract run as bounded
+        pipeline stages, and each result is yielded as soon as it is stored, so
+        memory stays flat however many emails the backfill covers. With
+        `prioritize`, urgent mail (e.g. "Happening now" invites) is extracted
+        first and queue waits are reported per priority class."""
+        # Local interval index of occupied time, used to catch duplicates and conflicts
+        index = MeetingIndex()
+        if sync_calendar:
+            sync_calendar_events(index)
+
+        self.scheduler = PriorityScheduler() if prioritize else None
+        source = self.iter_raw_emails(limit=limit, days_back=days_back, scheduler=self.scheduler)
+        parsed = Pipeline(source, buffer_size=buffer_size)
+        parsed.stage("parse", lambda item: parse_raw_email(*item))
+        # Replies and repeated notifications are extracted once per thread
+        stream = Pipeline(iter_thread_groups(parsed.run(), self.threads), buffer_size=buffer_size)
+        stream.stage("extract", self._extract_thread, workers=extract_workers)
+
+        try:
+            for email, meeting_info, thread_id in stream.run():
+                yield self.store_meeting(index, email, meeting_info, thread_id=thread_id)
+        finally:
+            index.save()
+            self.threads.save()
+            if self.scheduler is not None:
+                for name, waits in self.scheduler.report().items():
+                    print(f"Queue wait [{name}]: {waits['count']} emails, mean {waits['mean_wait']}s, "
+                          f"p50 {waits['p50_wait']}s, max {waits['max_wait']}s")
+
+    def process_emails(self, days_back=7, sync_calendar=False):
+        return list(self.iter_processed(days_back=days_back, sync_calendar=sync_calendar))
 
 if __name__ == "__main__":
-    processor = EmailInboxProcessor()
-    extracted_meetings = processor.process_emails(days_back=7)  # Process emails from the last 7 days
-    
-    # Create output directory if it doesn't exist
-    output_dir = "meeting_data"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Create a timestamp for the filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_filename = os.path.join(output_dir, f"extracted_meetings_{timestamp}.json")
-    
-    # Save results to a JSON file
-    try:
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(extracted_meetings, f, indent=2, ensure_ascii=False)
-        print(f"Successfully saved extracted meetings to {output_filename}")
-    except Exception as e:
-        print(f"Error saving JSON file: {e}")
-    
-    # Also print to console (optional)
-    try:
-        print(json.dumps(extracted_meetings, indent=2, ensure_ascii=False))
-    except UnicodeEncodeError as e:
-        print(f"Error encoding JSON for console output: {e}")
\ No newline at end of file
+    import contextlib
+    with Profile("mail") if cli_flag() else contextlib.nullcontext():
+        processor = EmailInboxProcessor()
+        
+        # Create output directory if it doesn't exist
+        output_dir = "meeting_data"
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Create a timestamp for the filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_filename = os.path.join(output_dir, f"extracted_meetings_{timestamp}.json")
+        
+        # Results are flushed to the JSON file (and echoed) as each one is produced
+        try:
+            with JsonArrayWriter(output_filename, echo=True) as writer:
+                for meeting in processor.iter_processed(days_back=7):  # Process emails from the last 7 days
+                    writer.write(meeting)
+            print(f"Successfully saved {writer.count} extracted meetings to {output_filename}")
+        except Exception as e:
+            print(f"Error saving JSON file: {e}")
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import threading
+import contextlib
+from email.parser import BytesHeaderParser
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+ARCHIVE_DIR = "mail_archive"
+INDEX_NAME = "index.jsonl"
+LOCK_NAME = "index.lock"
+DEFAULT_MAX_MB = 1024
+
+
+def _header_info(raw):
+    """Message-ID and Unix send time from the header block only"""
+    end = raw.find(b"\r\n\r\n")
+    if end < 0:
+        end = raw.find(b"\n\n")
+    headers = BytesHeaderParser().parsebytes(raw[:end] if end >= 0 else raw)
+    try:
+        sent_at = int(parsedate_to_datetime(headers.get("Date")).timestamp())
+    except Exception:
+        sent_at = None
+    return (headers.get("Message-ID") or "").strip(), sent_at
+
+
+class MailArchive:
+    """Local content-addressed store of raw fetched messages.
+
+    Each message is kept once, zlib-compressed, under the SHA-1 of its raw
+    bytes; an append-only JSON Lines index maps (account, mailbox,
+    UIDVALIDITY, UID) locations and Message-IDs to those digests. fetch()
+    serves archived UIDs from disk and only asks the server for the rest.
+    When the compressed size passes `max_bytes`, the messages archived
+    longest ago are evicted and the index is rewritten. Appends and the
+    rewrite hold a lock file, and the rewrite starts from the index on disk,
+    so entries other processes added are never dropped.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, max_bytes=None):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self.lock_path = os.path.join(root, LOCK_NAME)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("MAIL_ARCHIVE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """(Re)build the in-memory maps from the index file"""
+        self.messages = {}    # digest -> {"digest", "message_id", "sent_at", "size", "stored", "archived_at"}
+        self.locations = {}   # (account, mailbox, uidvalidity, uid) -> digest
+        self.by_message_id = {}
+        self.stored_bytes = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """Exclusive lock on the index across processes"""
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _apply(self, entry):
+        digest = entry["digest"]
+        if digest not in self.messages:
+            self.messages[digest] = {key: entry[key] for key in
+                                     ("digest", "message_id", "sent_at", "size", "stored", "archived_at")}
+            self.stored_bytes += entry["stored"]
+            if entry["message_id"]:
+                self.by_message_id[entry["message_id"]] = digest
+        if entry.get("uid") is not None:
+            key = (entry.get("account"), entry.get("mailbox"), entry.get("uidvalidity"), entry["uid"])
+            self.locations[key] = digest
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest + ".z")
+
+    def get(self, digest):
+        """Raw message bytes for a digest, or None if not archived"""
+        try:
+            with open(self.object_path(digest), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+    def get_by_message_id(self, message_id):
+        digest = self.by_message_id.get(message_id)
+        return self.get(digest) if digest else None
+
+    def lookup(self, mailbox, uids, uidvalidity=None, account=None):
+        """{uid: digest} for the UIDs of a mailbox that are already archived"""
+        with self._lock:
+            found = {}
+            for uid in uids:
+                digest = self.locations.get((account, mailbox, uidvalidity, uid))
+                if digest is not None and digest in self.messages:
+                    found[uid] = digest
+            return found
+
+    def put(self, raw, mailbox=None, uid=None, uidvalidity=None, account=None):
+        """Archive a raw message (stored once per content) and record where
+        it was fetched from; returns its digest"""
+        digest = hashlib.sha1(raw).hexdigest()
+        path = self.object_path(digest)
+        with self._lock:
+            known = self.messages.get(digest)
+        if known and os.path.exists(path):
+            stored = known["stored"]
+        else:
+            data = zlib.compress(raw, 6)
+            stored = len(data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Several processes may archive the same message; the last rename wins
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        message_id, sent_at = _header_info(raw)
+        entry = {
+            "digest": digest,
+            "message_id": message_id,
+            "sent_at": sent_at,
+            "size": len(raw),
+            "stored": stored,
+            "archived_at": int(time.time()),
+            "account": account,
+            "mailbox": mailbox,
+            "uidvalidity": uidvalidity,
+            "uid": uid,
+        }
+        with self._lock:
+            if not known:
+                self.stats["stored"] += 1
+            self._apply(entry)
+            with self._index_lock(), open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return digest
+
+    def fetch(self, server, mailbox, uids, uidvalidity=None, account=None, batch_size=10):
+        """Yield (uid, raw RFC822 bytes) in `uids` order from an IMAPClient
+        session with `mailbox` selected. Archived UIDs are read from disk;
+        the rest are fetched batch_size per round trip and archived."""
+        hits = misses = 0
+        try:
+            for i in range(0, len(uids), batch_size):
+                chunk = uids[i:i + batch_size]
+                archived = self.lookup(mailbox, chunk, uidvalidity, account)
+                missing = [uid for uid in chunk if uid not in archived]
+                records = server.fetch(missing, ["RFC822"]) if missing else {}
+                for uid in chunk:
+                    raw = self.get(archived[uid]) if uid in archived else None
+                    if raw is not None:
+                        hits += 1
+                    else:
+                        if uid in archived:
+                            # Evicted since the lookup: fetch it on its own
+                            records.update(server.fetch([uid], ["RFC822"]))
+                        if uid not in records:
+                            continue
+                        raw = records[uid][b"RFC822"]
+                        misses += 1
+                        self.put(raw, mailbox, uid, uidvalidity, account)
+                    yield uid, raw
+        finally:
+            self.stats["hits"] += hits
+            self.stats["misses"] += misses
+            print(f"Mail archive: {hits} served locally, {misses} fetched")
+            if self.stored_bytes > self.max_bytes:
+                self.prune()
+
+    def iter_refs(self, mailbox=None, account=None):
+        """(object path, 0, None) for archived messages, oldest sent first;
+        the reference shape offline_ingest parses in parallel"""
+        with self._lock:
+            digests = set(self.messages)
+            if mailbox is not None or account is not None:
+                digests = {d for (acct, box, _, _), d in self.locations.items()
+                           if (mailbox is None or box == mailbox) and (account is None or acct == account)}
+            entries = sorted((self.messages[d] for d in digests), key=lambda m: (m["sent_at"] or 0, m["digest"]))
+        for entry in entries:
+            yield self.object_path(entry["digest"]), 0, None
+
+    def iter_messages(self, mailbox=None, account=None):
+        """Yield (digest, raw bytes) for archived messages, oldest sent first"""
+        for path, _, _ in self.iter_refs(mailbox, account):
+            with open(path, "rb") as f:
+                yield os.path.basename(path)[:-2], zlib.decompress(f.read())
+
+    def prune(self, max_bytes=None):
+        """Evict the longest-archived messages until the compressed size fits
+        `max_bytes`, then rewrite the index; returns the number evicted"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock, self._index_lock():
+            # Start from the index on disk: other processes may have appended
+            # to it, or pruned it, since this one loaded it
+            self._load()
+            evicted = []
+            for entry in sorted(self.messages.values(), key=lambda m: m["archived_at"]):
+                if self.stored_bytes <= max_bytes:
+                    break
+                evicted.append(entry["digest"])
+                self.stored_bytes -= entry["stored"]
+            for digest in evicted:
+                message = self.messages.pop(digest)
+                if self.by_message_id.get(message["message_id"]) == digest:
+                    del self.by_message_id[message["message_id"]]
+                try:
+                    os.remove(self.object_path(digest))
+                except FileNotFoundError:
+                    pass
+            self.locations = {key: d for key, d in self.locations.items() if d in self.messages}
+            self.stats["evicted"] += len(evicted)
+
+            located = set()
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for (account, mailbox, uidvalidity, uid), digest in self.locations.items():
+                    located.add(digest)
+                    f.write(json.dumps({**self.messages[digest], "account": account, "mailbox": mailbox,
+                                        "uidvalidity": uidvalidity, "uid": uid}) + "\n")
+                for digest in self.messages.keys() - located:
+                    f.write(json.dumps({**self.messages[digest], "uid": None}) + "\n")
+            os.replace(tmp_path, self.index_path)
+        if evicted:
+            print(f"Mail archive: evicted {len(evicted)} messages, {self.stored_bytes / 1e6:.1f} MB kept")
+        return len(evicted)
+
+    def summary(self):
+        with self._lock:
+            raw = sum(m["size"] for m in self.messages.values())
+            return {
+                "messages": len(self.messages),
+                "locations": len(self.locations),
+                "raw_bytes": raw,
+                "stored_bytes": self.stored_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(
+        description="Inspect or prune the local mail archive. To reprocess it, run "
+                    "offline_ingest.py on the archive folder.")
+    parser.add_argument("--folder", default=ARCHIVE_DIR)
+    parser.add_argument("--prune-mb", type=float, help="evict oldest messages down to this size")
+    args = parser.parse_args()
+
+    archive = MailArchive(args.folder)
+    if args.prune_mb is not None:
+        archive.prune(int(args.prune_mb * 1024 * 1024))
+    info = archive.summary()
+    ratio = info["stored_bytes"] / info["raw_bytes"] if info["raw_bytes"] else 0
+    print(f"{info['messages']} messages at {info['locations']} mailbox locations")
+    print(f"{info['raw_bytes'] / 1e6:.1f} MB raw, {info['stored_bytes'] / 1e6:.1f} MB stored ({ratio:.0%}), "
+          f"limit {info['max_bytes'] / 1e6:.0f} MB")
@@ -1,15 +1,29 @@
 import os
 import json
 from datetime import datetime
-from openai import OpenAI
 from dotenv import load_dotenv
 import uuid
 import time
 import glob
-import email
-import imaplib
+import math
+import hashlib
+import threading
 import re
-from email.header import decode_header
+from task_watcher import TaskFolderWatcher
+from compaction import iter_jsonl
+from perplexity_client import CircuitOpenError, get_client
+from answer_cache import AnswerCache, normalize_question
+from task_stats import TaskStats, load_rollups
+from task_journal import TaskJournal
+from task_record import TaskRecord, encode_notes, encode_time
+from profiling import Profile, cli_flag, profiled, span
+from deadlines import DeadlineIndex, deadline_timestamp, find_deadline
+
+TASK_STATUSES = ("pending", "in_progress", "completed")
+TASK_PRIORITIES = ("high", "medium", "low")
+
+# Single-task files, TODO.py extraction snapshots and their compacted store
+TASK_FILE_PATTERNS = ("*.json", "*.jsonl")
 
 class AITaskTrackerBot:
     def __init__(self):
@@ -18,9 +32,13 @@ class AITaskTrackerBot:
         if not self.api_key:
             raise ValueError("PERPLEXITY_API_KEY environment variable not set")
         
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai")
+        self.client = get_client(self.api_key)
         self.conversation_log = []
         self.tasks = {}
+        self._tasks_lock = threading.RLock()
+        self.answer_cache = AnswerCache(ttl=int(os.getenv("CHAT_CACHE_TTL", "300")))
+        self.meetings = None
+        self._meetings_lock = threading.Lock()
         
         # Create task_data directory if it doesn't exist
         os.makedirs("task_data", exist_ok=True)
@@ -50,43 +68,223 @@ class AITaskTrackerBot:
     def load_tasks_from_folder(self):
         """Load all task JSON files from the task_data folder"""
         self.tasks = {}
-        task_files = glob.glob("task_data/*.json")
+        self._task_sources = {}
+        self.deadline_index = DeadlineIndex()
+        self.stats = TaskStats()
+        # The initial load is the journal's baseline, not a stream of creates
+        self.journal = None
+        task_files = [path for pattern in TASK_FILE_PATTERNS for path in glob.glob(os.path.join("task_data", pattern))]
+        # Compacted store first, then snapshots oldest to newest, so a task
+        # re-emitted by a later thread extraction ends up with its latest state
+        task_files.sort(key=lambda path: (not path.endswith(".jsonl"), path))
         
         for file_path in task_files:
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    task_data = json.load(f)
-                    # Extract task ID from filename (task_123abc.json -> 123abc)
-                    filename = os.path.basename(file_path)
-                    task_id = filename.replace("task_", "").replace(".json", "")
-                    
-                    # If the task data has its own ID field, use that instead
-                    if "id" in task_data:
-                        task_id = task_data["id"]
-                        
-                    self.tasks[task_id] = task_data
-                    print(f"Loaded task {task_id} from {file_path}")
-            except Exception as e:
-                print(f"Error loading task from {file_path}: {e}")
+            for task_id in self._apply_task_file(file_path):
+                print(f"Loaded task {task_id} from {file_path}")
 
-    def save_task(self, task_id):
-        """Save a specific task to its JSON file"""
-        if task_id not in self.tasks:
-            return False
-            
-        task = self.tasks[task_id]
-        filename = f"task_data/task_{task_id}.json"
-        
+        self.journal = TaskJournal(max_entries=int(os.getenv("TASK_JOURNAL_SIZE", "10000")))
+        self.watcher = TaskFolderWatcher("task_data", TASK_FILE_PATTERNS)
+
+    def _read_task_file(self, file_path):
+        """Parse a task_data file into a {task_id: task} dict.
+
+        Single-task files hold one task dict. Extraction snapshots written by
+        TODO.py, and the JSON Lines store they are compacted into, hold
+        {email_uid, title, due_date} entries, which are mapped to tasks with a
+        stable id so re-reading them is idempotent. Thread-aware extraction
+        supplies that id itself (task_id), so a task keeps it across updates.
+        Tasks come back as TaskRecords; entries of one snapshot share their
+        load time and note.
+        """
+        if file_path.endswith(".jsonl"):
+            task_data = list(iter_jsonl(file_path))
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                task_data = json.load(f)
+
+        if isinstance(task_data, dict):
+            # Extract task ID from filename (task_123abc.json -> 123abc)
+            filename = os.path.basename(file_path)
+            task_id = filename.replace("task_", "").replace(".json", "")
+
+            # If the task data has its own ID field, use that instead
+            if "id" in task_data:
+                task_id = task_data["id"]
+            return {task_id: TaskRecord.from_dict(task_data)}
+
+        tasks = {}
+        loaded_at = datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
+        notes = encode_notes([{"text": f"Task extracted in {os.path.basename(file_path)}", "timestamp": loaded_at}])
+        loaded_at = encode_time(loaded_at)
+        for entry in task_data:
+            if not isinstance(entry, dict) or not entry.get("title"):
+                continue
+            key = f"{entry.get('email_uid')}:{entry['title']}"
+            if entry.get("account"):
+                key = f"{entry['account']}/{key}"
+            task_id = entry.get("task_id") or hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+            tasks[task_id] = TaskRecord.from_dict({
+                "id": task_id,
+                "description": entry["title"],
+                "status": "pending",
+                "progress": entry.get("progress") or 0,
+                "created_at": loaded_at,
+                "updated_at": loaded_at,
+                "deadline": entry.get("due_date"),
+                "priority": "medium",
+                "source": "email",
+                "email_id": str(entry.get("email_uid")),
+                "notes": notes
+            })
+        return tasks
+
+    def _apply_task_file(self, file_path):
+        """(Re)load one file into the store and return the task ids it holds"""
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(task, f, indent=2, ensure_ascii=False)
-            return True
+            file_tasks = self._read_task_file(file_path)
         except Exception as e:
-            print(f"Error saving task {task_id}: {e}")
-            return False
+            print(f"Error loading task from {file_path}: {e}")
+            return []
+
+        # Drop tasks that this file used to provide but no longer does
+        for task_id in [t for t, src in self._task_sources.items() if src == file_path]:
+            if task_id not in file_tasks:
+                self._drop_task(task_id)
+
+        for task_id, task in file_tasks.items():
+            # A task saved to its own file takes precedence over snapshot entries
+            source = self._task_sources.get(task_id)
+            if source and source != file_path and os.path.basename(source) == f"task_{task_id}.json":
+                continue
+            self._store_task(task_id, task, file_path)
+        return list(file_tasks)
+
+    def _store_task(self, task_id, task, source_path=None):
+        """Single entry point for putting a task into the in-memory store"""
+        if not isinstance(task, TaskRecord):
+            task = TaskRecord.from_dict(task)
+        # Normalize the deadline once at ingestion; queries use deadline_ts,
+        # which stays in memory and is never saved or served
+        task.deadline_ts = deadline_timestamp(task.get("deadline"))
+
+        previous = self.tasks.get(task_id)
+        self.tasks[task_id] = task
+        if source_path:
+            self._task_sources[task_id] = source_path
+
+        if task.get("status") == "completed":
+            self.deadline_index.remove(task_id)
+        else:
+            self.deadline_index.add(task_id, task.deadline_ts)
+        self.stats.add(task_id, task)
+
+        # In-place edits are always changes; a reloaded file only if it differs
+        if self.journal is not None and (previous is task or previous != task):
+            self.journal.record("create" if previous is None else "update", task_id, task.to_dict())
+
+    def _drop_task(self, task_id):
+        """Single entry point for removing a task from the in-memory store"""
+        removed = self.tasks.pop(task_id, None)
+        self._task_sources.pop(task_id, None)
+        self.deadline_index.remove(task_id)
+        self.stats.remove(task_id)
+        if self.journal is not None and removed is not None:
+            self.journal.record("delete", task_id)
+
+    @profiled("refresh_tasks")
+    def refresh_tasks(self, timeout=0):
+        """Apply task_data files added, changed or deleted by other processes"""
+        # Wait for changes without the store lock; take it only to apply them
+        added, modified, deleted = self.watcher.poll(timeout)
+        if not (added or modified or deleted):
+            return 0, 0, 0
+        with self._tasks_lock:
+            # Apply new content first so tasks that moved to another file (e.g.
+            # a snapshot folded into the compacted store) are not dropped
+            for file_path in added + modified:
+                self._apply_task_file(file_path)
+            for file_path in deleted:
+                for task_id in [t for t, src in self._task_sources.items() if src == file_path]:
+                    self._drop_task(task_id)
+            self.watcher.record_applied(added + modified + deleted)
+        return len(added), len(modified), len(deleted)
+
+    def start_task_watcher(self, interval=1.0):
+        """Keep the store in sync with task_data from a background thread"""
+        def run():
+            while True:
+                try:
+                    self.refresh_tasks(timeout=interval)
+                except Exception as e:
+                    print(f"Error refreshing tasks: {e}")
+                if self.watcher.metrics["mode"] == "scan":
+                    time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="task-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def get_stats(self):
+        """Aggregate task statistics from the incrementally maintained counters"""
+        return self.stats.snapshot(overdue=self.deadline_index.count_overdue())
+
+    def get_free_busy(self, start, end, min_free=0):
+        """Free/busy from one meeting index kept for the bot's lifetime;
+        meetings saved by mail.py since the last call are merged in first"""
+        from meeting_index import MeetingIndex
+
+        with self._meetings_lock:
+            if self.meetings is None:
+                self.meetings = MeetingIndex()
+            else:
+                self.meetings.refresh()
+            return self.meetings.free_busy(start, end, min_free)
+
+    def start_stats_rollups(self, interval=3600):
+        """Persist a daily rollup of the task statistics from a background thread"""
+        def run():
+            while True:
+                try:
+                    self.stats.record_rollup(overdue=self.deadline_index.count_overdue())
+                except Exception as e:
+                    print(f"Error recording stats rollup: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="stats-rollup", daemon=True)
+        thread.start()
+        return thread
+
+    @profiled("save_task")
+    def save_task(self, task_id):
+        """Save a specific task to its JSON file"""
+        with self._tasks_lock:
+            if task_id not in self.tasks:
+                return False
+
+            task = self.tasks[task_id]
+            filename = f"task_data/task_{task_id}.json"
 
-    def fetch_tasks_from_email(self):
-        """Fetch tasks from email and save them to task_data folder"""
+            try:
+                with open(filename, "w", encoding="utf-8") as f:
+                    json.dump(task.to_dict(), f, indent=2, ensure_ascii=False)
+                self._task_sources[task_id] = filename
+                self.watcher.note_written(filename)
+                return True
+            except Exception as e:
+                print(f"Error saving task {task_id}: {e}")
+                return False
+
+    def fetch_tasks_from_email(self, progress=None):
+        """Fetch tasks from email and save them to task_data folder.
+
+        `progress(**counts)` is called as messages are scanned, for callers
+        running the import as a background job.
+        """
+        import email
+        import imaplib
+        from email.header import decode_header
+
+        progress = progress or (lambda **counts: None)
         # Load email configuration from .env
         email_user = os.getenv("EMAIL_USER")
         email_password = os.getenv("EMAIL_PASS")
@@ -97,56 +295,61 @@ class AITaskTrackerBot:
             
         try:
             # Connect to the email server
-            mail = imaplib.IMAP4_SSL(email_server)
-            mail.login(email_user, email_password)
-            mail.select("inbox")
+            with span("imap_connect"):
+                mail = imaplib.IMAP4_SSL(email_server)
+                mail.login(email_user, email_password)
+                mail.select("inbox")
             
             # Search for emails with "task" in subject
-            status, messages = mail.search(None, 'SUBJECT "task"')
+            with span("imap_search"):
+                status, messages = mail.search(None, 'SUBJECT "task"')
             if status != "OK":
                 return "Failed to search for emails"
                 
             email_ids = messages[0].split()
+            progress(total=len(email_ids), scanned=0, tasks_created=0)
             if not email_ids:
                 return "No task emails found"
                 
             tasks_found = 0
             
             # Process each email
-            for e_id in email_ids:
-                status, msg_data = mail.fetch(e_id, "(RFC822)")
+            for scanned, e_id in enumerate(email_ids):
+                progress(scanned=scanned, tasks_created=tasks_found)
+                with span("imap_fetch"):
+                    status, msg_data = mail.fetch(e_id, "(RFC822)")
                 if status != "OK":
                     continue
                     
-                raw_email = msg_data[0][1]
-                email_message = email.message_from_bytes(raw_email)
-                
-                # Extract subject and sender
-                subject = decode_header(email_message["subject"])[0][0]
-                if isinstance(subject, bytes):
-                    subject = subject.decode()
+                with span("mime_decode"):
+                    raw_email = msg_data[0][1]
+                    email_message = email.message_from_bytes(raw_email)
                     
-                sender = decode_header(email_message["from"])[0][0]
-                if isinstance(sender, bytes):
-                    sender = sender.decode()
-                
-                # Extract email body
-                body = ""
-                if email_message.is_multipart():
-                    for part in email_message.walk():
-                        content_type = part.get_content_type()
-                        if content_type == "text/plain":
-                            body = part.get_payload(decode=True).decode()
-                            break
-                else:
-                    body = email_message.get_payload(decode=True).decode()
+                    # Extract subject and sender
+                    subject = decode_header(email_message["subject"])[0][0]
+                    if isinstance(subject, bytes):
+                        subject = subject.decode()
+                        
+                    sender = decode_header(email_message["from"])[0][0]
+                    if isinstance(sender, bytes):
+                        sender = sender.decode()
+                    
+                    # Extract email body
+                    body = ""
+                    if email_message.is_multipart():
+                        for part in email_message.walk():
+                            content_type = part.get_content_type()
+                            if content_type == "text/plain":
+                                body = part.get_payload(decode=True).decode()
+                                break
+                    else:
+                        body = email_message.get_payload(decode=True).decode()
                 
                 # Parse task details from email
                 task_description = subject.replace("task:", "").replace("Task:", "").strip()
                 
                 # Extract deadline if present in the email body
-                deadline_match = re.search(r"deadline:?\s*(\d{4}-\d{2}-\d{2})", body, re.IGNORECASE)
-                deadline = deadline_match.group(1) if deadline_match else None
+                deadline = find_deadline(body)
                 
                 # Extract priority if present
                 priority_match = re.search(r"priority:?\s*(high|medium|low)", body, re.IGNORECASE)
@@ -172,13 +375,15 @@ class AITaskTrackerBot:
                 }
                 
                 # Save task to file and memory
-                self.tasks[task_id] = task
-                self.save_task(task_id)
+                with self._tasks_lock:
+                    self._store_task(task_id, task)
+                    self.save_task(task_id)
                 tasks_found += 1
                 
                 # Mark email as read
                 mail.store(e_id, '+FLAGS', '\\Seen')
             
+            progress(scanned=len(email_ids), tasks_created=tasks_found)
             mail.close()
             mail.logout()
             
@@ -187,121 +392,228 @@ class AITaskTrackerBot:
         except Exception as e:
             return f"Error fetching tasks from email: {e}"
     
-    def update_task(self, task_id, status=None, progress=None, note=None):
-        """Update task status, progress, or add notes"""
-        if task_id not in self.tasks:
-            return f"Task {task_id} not found"
-            
-        task = self.tasks[task_id]
-        now = datetime.now().isoformat()
-        task["updated_at"] = now
-        
-        if status:
-            task["status"] = status
-        if progress is not None:
-            task["progress"] = progress
-        if note:
-            task["notes"].append({"text": note, "timestamp": now})
-            
-        self.save_task(task_id)
+    def update_task(self, task_id, status=None, progress=None, note=None, priority=None, persist=True):
+        """Update task status, progress, priority, or add notes"""
+        with self._tasks_lock:
+            if task_id not in self.tasks:
+                return f"Task {task_id} not found"
+
+            task = self.tasks[task_id]
+            now = datetime.now().isoformat()
+            task["updated_at"] = now
+
+            if status:
+                task["status"] = status
+            if progress is not None:
+                task["progress"] = progress
+            if priority:
+                task["priority"] = priority
+            if note:
+                task.add_note(note, now)
+
+            self._store_task(task_id, task)
+            if persist:
+                self.save_task(task_id)
         return f"Task {task_id} updated successfully"
+
+    def save_tasks(self, task_ids):
+        """Persist several tasks under one hold of the store lock; returns the
+        ids that failed. Each task keeps its own file, since that is the unit
+        other processes reload, so this is still one write per task."""
+        with self._tasks_lock:
+            return [task_id for task_id in task_ids if not self.save_task(task_id)]
+
+    def _validate_changes(self, changes):
+        """Return an error message for an invalid update, or None"""
+        unknown = set(changes) - {"status", "progress", "priority", "note"}
+        if unknown:
+            return f"Unknown fields: {', '.join(sorted(unknown))}"
+        if changes.get("status") not in (None, *TASK_STATUSES):
+            return f"Invalid status '{changes['status']}'"
+        if changes.get("priority") not in (None, *TASK_PRIORITIES):
+            return f"Invalid priority '{changes['priority']}'"
+        progress = changes.get("progress")
+        if progress is not None and (not isinstance(progress, int) or isinstance(progress, bool)
+                                     or not 0 <= progress <= 100):
+            return "Progress must be an integer from 0 to 100"
+        return None
+
+    def match_tasks(self, criteria):
+        """Task ids matching every criterion; sender is a case-insensitive substring"""
+        sender = (criteria.get("sender") or "").lower()
+        return [
+            task_id for task_id, task in self.tasks.items()
+            if all(task.get(field) == criteria[field] for field in ("status", "priority", "source") if field in criteria)
+            and sender in (task.get("sender") or "").lower()
+        ]
+
+    def bulk_update(self, updates=None, criteria=None, changes=None):
+        """Apply many updates under one lock hold, saving each touched task once.
+
+        `updates` is a list of {"id": ..., <fields>} items; `criteria` plus
+        `changes` applies the same fields to every matching task. Returns one
+        result dict per task touched or rejected.
+        """
+        results = []
+        dirty = []
+        with self._tasks_lock:
+            # Match under the lock, so the filter sees the tasks it updates
+            items = list(updates or [])
+            if criteria is not None:
+                items += [{"id": task_id, **(changes or {})} for task_id in self.match_tasks(criteria)]
+
+            for item in items:
+                if not isinstance(item, dict):
+                    results.append({"id": None, "ok": False, "error": "Each update must be an object"})
+                    continue
+                task_id = item.get("id")
+                fields = {k: v for k, v in item.items() if k != "id"}
+                error = None if isinstance(task_id, str) else "Missing or invalid task id"
+                error = error or self._validate_changes(fields)
+                if error is None and task_id not in self.tasks:
+                    error = "Task not found"
+                if error:
+                    results.append({"id": task_id, "ok": False, "error": error})
+                    continue
+                self.update_task(task_id, persist=False, **fields)
+                dirty.append(task_id)
+                results.append({"id": task_id, "ok": True})
+
+            failed = set(self.save_tasks(dict.fromkeys(dirty)))
+        for result in results:
+            if result["ok"] and result["id"] in failed:
+                result.update(ok=False, error="Failed to save task")
+        return results
         
     def get_task_progress(self, task_id):
         """Get detailed progress information about a task"""
-        if task_id not in self.tasks:
-            return f"Task {task_id} not found"
-            
-        task = self.tasks[task_id]
-        
-        # Format dates for display
-        created = datetime.fromisoformat(task["created_at"]).strftime("%Y-%m-%d %H:%M")
-        updated = datetime.fromisoformat(task["updated_at"]).strftime("%Y-%m-%d %H:%M")
-        
-        # Prepare deadline information
-        deadline_info = ""
-        if task.get("deadline"):
-            try:
-                deadline = datetime.fromisoformat(task["deadline"])
+        with self._tasks_lock:
+            if task_id not in self.tasks:
+                return f"Task {task_id} not found"
+
+            task = self.tasks[task_id]
+
+            # Format dates for display
+            created = datetime.fromisoformat(task["created_at"]).strftime("%Y-%m-%d %H:%M")
+            updated = datetime.fromisoformat(task["updated_at"]).strftime("%Y-%m-%d %H:%M")
+
+            # Prepare deadline information
+            deadline_info = ""
+            if task.deadline_ts:
+                deadline = datetime.fromtimestamp(task.deadline_ts)
                 now = datetime.now()
                 if deadline > now:
                     days_left = (deadline - now).days
                     deadline_info = f"\nDeadline: {deadline.strftime('%Y-%m-%d')} ({days_left} days remaining)"
                 else:
                     deadline_info = f"\nDeadline: {deadline.strftime('%Y-%m-%d')} (OVERDUE)"
-            except (ValueError, TypeError):
-                deadline_info = f"\nDeadline: {task['deadline']}"
-                
-        # Format notes
-        notes = ""
-        if task.get("notes"):
-            recent_notes = task["notes"][-3:]  # Show last 3 notes
-            notes = "\nRecent notes:\n" + "\n".join([f"- {n['text']}" for n in recent_notes])
-            
-        # Add source information if available
-        source_info = ""
-        if task.get("source") == "email":
-            source_info = f"\nSource: Email from {task.get('sender', 'unknown')}"
-            
-        # Format priorities with emoji
-        priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}
-        priority = task.get("priority", "medium")
-        priority_display = f"{priority_emoji.get(priority, '⚪')} {priority.title()}"
-            
-        return (
-            f"Task ID: {task_id}\n"
-            f"Description: {task['description']}\n"
-            f"Status: {task['status'].replace('_', ' ').title()}\n"
-            f"Progress: {task['progress']}%\n"
-            f"Priority: {priority_display}\n"
-            f"Created: {created}\n"
-            f"Last updated: {updated}"
-            f"{deadline_info}"
-            f"{source_info}"
-            f"{notes}"
-        )
+            elif task.get("deadline"):
+                deadline_info = f"\nDeadline: {task['deadline']} (unrecognized date)"
+
+            # Format notes
+            notes = ""
+            if task.get("notes"):
+                recent_notes = task["notes"][-3:]  # Show last 3 notes
+                notes = "\nRecent notes:\n" + "\n".join([f"- {n['text']}" for n in recent_notes])
+
+            # Add source information if available
+            source_info = ""
+            if task.get("source") == "email":
+                source_info = f"\nSource: Email from {task.get('sender', 'unknown')}"
+
+            # Format priorities with emoji
+            priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}
+            priority = task.get("priority", "medium")
+            priority_display = f"{priority_emoji.get(priority, '⚪')} {priority.title()}"
+
+            return (
+                f"Task ID: {task_id}\n"
+                f"Description: {task['description']}\n"
+                f"Status: {task['status'].replace('_', ' ').title()}\n"
+                f"Progress: {task['progress']}%\n"
+                f"Priority: {priority_display}\n"
+                f"Created: {created}\n"
+                f"Last updated: {updated}"
+                f"{deadline_info}"
+                f"{source_info}"
+                f"{notes}"
+            )
     
     def list_tasks(self, status_filter=None, priority_filter=None):
         """List all tasks, optionally filtered by status or priority"""
-        if not self.tasks:
-            return "No tasks found"
-            
-        filtered_tasks = self.tasks.copy()
-        
-        # Apply filters
-        if status_filter:
-            filtered_tasks = {k: v for k, v in filtered_tasks.items() if v["status"] == status_filter}
-        if priority_filter:
-            filtered_tasks = {k: v for k, v in filtered_tasks.items() if v.get("priority") == priority_filter}
-            
-        if not filtered_tasks:
-            filters = []
+        with self._tasks_lock:
+            if not self.tasks:
+                return "No tasks found"
+
+            filtered_tasks = self.tasks.copy()
+
+            # Apply filters
             if status_filter:
-                filters.append(f"status '{status_filter}'")
+                filtered_tasks = {k: v for k, v in filtered_tasks.items() if v["status"] == status_filter}
             if priority_filter:
-                filters.append(f"priority '{priority_filter}'")
-            filter_desc = " and ".join(filters)
-            return f"No tasks with {filter_desc} found"
-            
-        # Priority emoji for display
-        priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}
-        
-        # Sort tasks by priority (high first) then by deadline
-        sorted_tasks = sorted(
-            filtered_tasks.items(),
-            key=lambda x: (
-                {"high": 0, "medium": 1, "low": 2}.get(x[1].get("priority", "medium"), 3),
-                x[1].get("deadline", "9999-12-31")  # Default to far future for sorting
+                filtered_tasks = {k: v for k, v in filtered_tasks.items() if v.get("priority") == priority_filter}
+
+            if not filtered_tasks:
+                filters = []
+                if status_filter:
+                    filters.append(f"status '{status_filter}'")
+                if priority_filter:
+                    filters.append(f"priority '{priority_filter}'")
+                filter_desc = " and ".join(filters)
+                return f"No tasks with {filter_desc} found"
+
+            # Priority emoji for display
+            priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}
+
+            # Sort tasks by priority (high first) then by deadline
+            sorted_tasks = sorted(
+                filtered_tasks.items(),
+                key=lambda x: (
+                    {"high": 0, "medium": 1, "low": 2}.get(x[1].get("priority", "medium"), 3),
+                    x[1].deadline_ts or float("inf")  # No deadline sorts last
+                )
             )
-        )
-        
-        result = "Tasks:\n"
-        for task_id, task in sorted_tasks:
-            priority = task.get("priority", "medium")
-            p_emoji = priority_emoji.get(priority, "⚪")
-            deadline = f" (Due: {task['deadline']})" if task.get("deadline") else ""
-            
-            result += f"- [{task_id}] {p_emoji} {task['status']} ({task['progress']}%): {task['description'][:50]}{deadline}\n"
-        
+
+            result = "Tasks:\n"
+            for task_id, task in sorted_tasks:
+                priority = task.get("priority", "medium")
+                p_emoji = priority_emoji.get(priority, "⚪")
+                deadline = f" (Due: {task['deadline']})" if task.get("deadline") else ""
+
+                result += f"- [{task_id}] {p_emoji} {task['status']} ({task['progress']}%): {task['description'][:50]}{deadline}\n"
+
+            return result
+
+    def deadline_tasks(self, overdue=False, days=None, count=None):
+        """Open tasks from the deadline index: overdue, due within N days, or
+        next due. Ids are resolved under the store lock; a task dropped since
+        the index answered is skipped."""
+        with self._tasks_lock:
+            if overdue:
+                task_ids = self.deadline_index.overdue()
+            elif days is not None:
+                task_ids = self.deadline_index.due_within(days)
+            else:
+                task_ids = self.deadline_index.next_due(count or 1)
+            return [(task_id, self.tasks[task_id]) for task_id in task_ids if task_id in self.tasks]
+
+    def list_deadline_tasks(self, overdue=False, days=None, count=None):
+        """List open tasks from the deadline index: overdue, due within N days, or next due"""
+        if overdue:
+            title = "Overdue tasks"
+        elif days is not None:
+            title = f"Tasks due in the next {days} days"
+        else:
+            title = "Next due"
+        tasks = self.deadline_tasks(overdue, days, count)
+
+        if not tasks:
+            return f"{title}: none"
+
+        result = f"{title}:\n"
+        for task_id, task in tasks:
+            due = datetime.fromtimestamp(task.deadline_ts).strftime("%Y-%m-%d %H:%M")
+            result += f"- [{task_id}] {task['status']} ({task['progress']}%): {task['description'][:50]} (Due: {due})\n"
         return result
 
     def parse_task_commands(self, user_input):
@@ -347,6 +659,16 @@ class AITaskTrackerBot:
             task_id = user_input.split(":", 1)[1].strip()
             return self.get_task_progress(task_id)
             
+        # Deadline queries
+        elif "overdue" in input_lower and "task" in input_lower:
+            return self.list_deadline_tasks(overdue=True)
+        elif re.search(r"\bdue (?:in|within)(?: the next)? (\d+) days?\b", input_lower):
+            days = int(re.search(r"\bdue (?:in|within)(?: the next)? (\d+) days?\b", input_lower).group(1))
+            return self.list_deadline_tasks(days=days)
+        elif input_lower.startswith("next due"):
+            count_match = re.search(r"\d+", input_lower)
+            return self.list_deadline_tasks(count=int(count_match.group()) if count_match else 1)
+            
         # List tasks command
         elif input_lower == "list tasks" or input_lower == "show tasks":
             return self.list_tasks()
@@ -373,7 +695,10 @@ class AITaskTrackerBot:
         # Not a task command
         return None
 
-    def ask(self, user_input):
+    def ask(self, user_input, fresh=False):
+        # Pick up tasks written by other processes since the last message
+        self.refresh_tasks()
+
         # First check if this is a task-related command
         task_response = self.parse_task_commands(user_input)
         if task_response:
@@ -381,7 +706,9 @@ class AITaskTrackerBot:
             return task_response
         
         # Check if asking about a specific task
-        for task_id in self.tasks:
+        with self._tasks_lock:
+            task_ids = list(self.tasks)
+        for task_id in task_ids:
             if task_id in user_input and ("task" in user_input.lower() or "progress" in user_input.lower()):
                 task_info = self.get_task_progress(task_id)
                 self.log_interaction(user_input, task_info)
@@ -398,16 +725,25 @@ class AITaskTrackerBot:
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": context + user_input}
         ]
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="sonar-pro",
+
+        def call_upstream():
+            # Questions about the local task list do not need the web-search tier
+            response = self.client.complete(
+                task="task_chat" if context else "chat",
                 messages=messages,
                 temperature=0.7
             )
-            answer = response.choices[0].message.content
+            return response.choices[0].message.content
+        
+        try:
+            # Identical questions (with identical task context) share one upstream call
+            cache_key = (hashlib.sha1(context.encode("utf-8")).hexdigest(), normalize_question(user_input))
+            answer = self.answer_cache.get_or_compute(cache_key, call_upstream, bypass=fresh)
             self.log_interaction(user_input, answer)
             return answer
+        except CircuitOpenError as e:
+            self.log_interaction(user_input, str(e))
+            return str(e)
         except Exception as e:
             error_msg = f"Error communicating with Perplexity API: {e}"
             self.log_interaction(user_input, error_msg)
@@ -422,6 +758,7 @@ class AITaskTrackerBot:
         self.conversation_log.append(entry)
         self.save_log()
 
+    @profiled("save_log")
     def save_log(self):
         with open("perplexity_conversation_log.json", "w", encoding="utf-8") as f:
             json.dump(self.conversation_log, f, indent=2, ensure_ascii=False)
@@ -433,12 +770,15 @@ class AITaskTrackerBot:
             q = entry['query']
             summary += f"{i}. [{timestamp}] {q[:75]}{'...' if len(q) > 75 else ''}\n"
         
-        if self.tasks:
-            pending_tasks = sum(1 for t in self.tasks.values() if t['status'] == 'pending')
-            in_progress = sum(1 for t in self.tasks.values() if t['status'] == 'in_progress')
-            completed = sum(1 for t in self.tasks.values() if t['status'] == 'completed')
+        with self._tasks_lock:
+            total = len(self.tasks)
+        if total:
+            by_status = self.stats.counts["status"]
+            pending_tasks = by_status.get("pending", 0)
+            in_progress = by_status.get("in_progress", 0)
+            completed = by_status.get("completed", 0)
             
-            summary += f"\nTasks Summary: {len(self.tasks)} total ({pending_tasks} pending, {in_progress} in progress, {completed} completed)\n"
+            summary += f"\nTasks Summary: {total} total ({pending_tasks} pending, {in_progress} in progress, {completed} completed)\n"
         
         return summary
 
@@ -448,6 +788,7 @@ class AITaskTrackerBot:
         print("- 'update task: [task_id]: [update details]' to update a task")
         print("- 'task progress: [task_id]' to check task status")
         print("- 'list tasks' to see all tasks")
+        print("- 'overdue tasks', 'tasks due in [N] days' or 'next due [N]' for deadlines")
         print("- 'summary' to view conversation history")
         print("- 'exit' to quit")
         
@@ -464,14 +805,43 @@ class AITaskTrackerBot:
             print(f"\nAI: {response}")
 
 # Flask API implementation
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+def create_app(profile_all=False):
+    # The web stack is only loaded for --server; the CLI chat never needs it
+    from flask import Flask, Response, g, request, jsonify, stream_with_context
+    from flask_cors import CORS
+    from assignment import AssignmentEngine
+    from jobs import JobManager
 
-def create_app():
     app = Flask(__name__)
     CORS(app)  # Enable CORS for local development
 
+    # Opt-in profiling: send "X-Profile: 1" or ?profile=1 (or start with --profile)
+    @app.before_request
+    def start_profile():
+        if profile_all or request.headers.get("X-Profile") or request.args.get("profile"):
+            g.profile = Profile(f"{request.method} {request.path}").start()
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            path = profile.stop()
+            if path:
+                response.headers["X-Profile-Path"] = path
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile.stop()
+
     bot = AITaskTrackerBot()
+    bot.start_task_watcher()
+    jobs = JobManager()
+    assigner = AssignmentEngine(client=bot.client)
+    if os.getenv("STATS_ROLLUPS", "").lower() in ("1", "true", "yes"):
+        bot.start_stats_rollups()
 
     @app.route("/api/chat", methods=["POST"])
     def chat():
@@ -480,54 +850,263 @@ def create_app():
         if not user_message:
             return jsonify({"response": "No message provided"}), 400
 
-        response = bot.ask(user_message)
+        fresh = bool(data.get("fresh")) or "no-cache" in request.headers.get("Cache-Control", "")
+        response = bot.ask(user_message, fresh=fresh)
         return jsonify({"response": response})
+
+    @app.route("/api/health", methods=["GET"])
+    def health():
+        upstream = bot.client.health()
+        return jsonify({"status": "ok" if upstream["healthy"] else "degraded", "perplexity": upstream})
+
+    @app.route("/api/chat/cache-stats", methods=["GET"])
+    def chat_cache_stats():
+        return jsonify(bot.answer_cache.snapshot())
     
     @app.route("/api/tasks", methods=["GET"])
     def get_tasks():
         status = request.args.get("status")
         priority = request.args.get("priority")
         
-        tasks = bot.tasks
-        if status:
-            tasks = {k: v for k, v in tasks.items() if v["status"] == status}
-        if priority:
-            tasks = {k: v for k, v in tasks.items() if v.get("priority") == priority}
-            
-        return jsonify(tasks)
+        with bot._tasks_lock:
+            tasks = bot.tasks
+            if status:
+                tasks = {k: v for k, v in tasks.items() if v["status"] == status}
+            if priority:
+                tasks = {k: v for k, v in tasks.items() if v.get("priority") == priority}
+            body = {k: v.to_dict() for k, v in tasks.items()}
+        return jsonify(body)
     
     @app.route("/api/tasks/<task_id>", methods=["GET"])
     def get_task(task_id):
-        if task_id not in bot.tasks:
-            return jsonify({"error": "Task not found"}), 404
-        return jsonify(bot.tasks[task_id])
+        with bot._tasks_lock:
+            task = bot.tasks.get(task_id)
+            if task is None:
+                return jsonify({"error": "Task not found"}), 404
+            return jsonify(task.to_dict())
     
     @app.route("/api/tasks/<task_id>", methods=["PUT"])
     def update_task(task_id):
-        if task_id not in bot.tasks:
-            return jsonify({"error": "Task not found"}), 404
-            
         data = request.get_json()
         status = data.get("status")
         progress = data.get("progress")
         note = data.get("note")
-        
-        bot.update_task(task_id, status, progress, note)
-        return jsonify({"task": bot.tasks[task_id]})
+        priority = data.get("priority")
+
+        with bot._tasks_lock:
+            if task_id not in bot.tasks:
+                return jsonify({"error": "Task not found"}), 404
+            bot.update_task(task_id, status, progress, note, priority)
+            return jsonify({"task": bot.tasks[task_id].to_dict()})
+
+    @app.route("/api/tasks", methods=["PATCH"])
+    def bulk_update_tasks():
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        updates = data.get("updates")
+        criteria = data.get("filter")
+        changes = data.get("set")
+        if (updates is not None and not isinstance(updates, list)) or \
+                (criteria is not None and not isinstance(criteria, dict)) or \
+                (changes is not None and not isinstance(changes, dict)):
+            return jsonify({"error": "'updates' must be a list, 'filter' and 'set' objects"}), 400
+        if updates is None and criteria is None:
+            return jsonify({"error": "Provide 'updates' and/or 'filter' with 'set'"}), 400
+        if criteria is not None and not changes:
+            return jsonify({"error": "'filter' requires a non-empty 'set'"}), 400
+
+        results = bot.bulk_update(updates, criteria, changes)
+        updated = sum(1 for r in results if r["ok"])
+        return jsonify({"updated": updated, "failed": len(results) - updated, "results": results})
+    
+    @app.route("/api/tasks/due", methods=["GET"])
+    def get_due_tasks():
+        try:
+            days = float(request.args["days"]) if request.args.get("days") else None
+            count = int(request.args.get("count", 1))
+        except ValueError:
+            return jsonify({"error": "'days' must be a number and 'count' an integer"}), 400
+        if count < 1 or (days is not None and not math.isfinite(days)):
+            return jsonify({"error": "'count' must be at least 1 and 'days' finite"}), 400
+        with bot._tasks_lock:
+            tasks = bot.deadline_tasks(bool(request.args.get("overdue")), days, count)
+            return jsonify([task.to_dict() for _, task in tasks])
+    
+    @app.route("/api/tasks/changes", methods=["GET"])
+    def get_task_changes():
+        since = request.args.get("since", type=int)
+        limit = request.args.get("limit", 500, type=int)
+        return jsonify(bot.journal.changes(since, limit))
+
+    @app.route("/api/tasks/changes/stream", methods=["GET"])
+    def stream_task_changes():
+        # Server-Sent Events; browsers resend the last id as Last-Event-ID
+        since = request.args.get("since", type=int)
+        if since is None:
+            since = request.headers.get("Last-Event-ID", type=int)
+        if since is None:
+            since = bot.journal.cursor
+
+        def events(cursor):
+            while True:
+                page = bot.journal.changes(cursor)
+                if page["reset"]:
+                    yield f"event: reset\ndata: {json.dumps({'cursor': page['cursor']})}\n\n"
+                for change in page["changes"]:
+                    yield f"id: {change['cursor']}\nevent: {change['op']}\ndata: {json.dumps(change)}\n\n"
+                cursor = page["cursor"]
+                if not page["has_more"] and not bot.journal.wait(cursor, timeout=15):
+                    yield ": keepalive\n\n"
+
+        return Response(stream_with_context(events(since)), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.route("/api/stats", methods=["GET"])
+    def get_stats():
+        return jsonify(bot.get_stats())
+
+    @app.route("/api/stats/daily", methods=["GET"])
+    def get_daily_stats():
+        return jsonify(load_rollups())
+    
+    @app.route("/api/tasks/reload-status", methods=["GET"])
+    def reload_status():
+        return jsonify(bot.watcher.metrics)
+    
+    @app.route("/api/employees", methods=["GET"])
+    def get_employees():
+        return jsonify(assigner.employees)
+
+    @app.route("/api/assignment-tasks", methods=["GET"])
+    def get_assignment_tasks():
+        return jsonify(assigner.tasks)
+
+    def parse_slot(day, hour):
+        """(day, hour) from request input, or None when either is malformed"""
+        try:
+            return day.lower(), int(hour)
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    @app.route("/api/available-employees", methods=["GET"])
+    def get_available_employees():
+        day = request.args.get("day")
+        hour = request.args.get("hour")
+        if not day or not hour:
+            return jsonify({"error": "Day and hour are required"}), 400
+        slot = parse_slot(day, hour)
+        if slot is None:
+            return jsonify({"error": "Hour must be an integer"}), 400
+        return jsonify(assigner.available_employees(*slot))
+
+    @app.route("/api/assign-task", methods=["POST"])
+    def assign_task():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        task_id, day, hour = data.get("taskId"), data.get("day"), data.get("hour")
+        if not task_id or not day or not hour:
+            return jsonify({"error": "Task ID, day, and hour are required"}), 400
+        slot = parse_slot(day, hour)
+        if slot is None:
+            return jsonify({"error": "Day must be a string and hour an integer"}), 400
+        task = assigner.find_task(task_id)
+        if task is None:
+            return jsonify({"error": "Task not found"}), 404
+
+        assignments, _ = assigner.assign_batch([task["id"]], *slot)
+        if not assignments:
+            return jsonify({"error": "No suitable employees available"}), 404
+
+        result = {"success": True, **assignments[0]}
+        # Best-practice advice is optional and fetched off the request path
+        if data.get("insights", True):
+            result["insightId"] = assigner.request_insight(task)
+        return jsonify(result)
+
+    @app.route("/api/assign-tasks", methods=["POST"])
+    def assign_tasks():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        day, hour = data.get("day"), data.get("hour")
+        if not day or not hour:
+            return jsonify({"error": "Day and hour are required"}), 400
+        slot = parse_slot(day, hour)
+        if slot is None:
+            return jsonify({"error": "Day must be a string and hour an integer"}), 400
+        task_ids = data.get("taskIds") or [t["id"] for t in assigner.tasks if not t.get("assigned")]
+        if not isinstance(task_ids, list):
+            return jsonify({"error": "taskIds must be a list"}), 400
+        assignments, unassigned = assigner.assign_batch(task_ids, *slot)
+        return jsonify({"success": True, "assignments": assignments, "unassigned": unassigned})
+
+    @app.route("/api/assignment-insights/<insight_id>", methods=["GET"])
+    def get_assignment_insight(insight_id):
+        insight = assigner.get_insight(insight_id)
+        if insight is None:
+            return jsonify({"error": "Insight not found"}), 404
+        return jsonify(insight)
+
+    @app.route("/api/complete-task", methods=["POST"])
+    def complete_assigned_task():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        if not data.get("employeeId") or not data.get("taskId"):
+            return jsonify({"error": "Employee ID and Task ID are required"}), 400
+        try:
+            employee_id = int(data["employeeId"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "Employee ID must be an integer"}), 400
+        result = assigner.complete_task(employee_id, data["taskId"])
+        if result is None:
+            return jsonify({"error": "Task not found or not assigned to this employee"}), 404
+        employee, task = result
+        return jsonify({"success": True, "employee": employee, "task": task})
+    
+    @app.route("/api/calendar/freebusy", methods=["GET"])
+    def get_free_busy():
+        # start/end are Unix seconds; defaults to the next 24 hours
+        start = int(request.args.get("start", time.time()))
+        end = int(request.args.get("end", start + 86400))
+        min_free = int(request.args.get("min_free", 0))
+        return jsonify(bot.get_free_busy(start, end, min_free))
     
     @app.route("/api/fetch-email-tasks", methods=["POST"])
     def fetch_email_tasks():
-        result = bot.fetch_tasks_from_email()
-        return jsonify({"message": result})
+        def run_import(job):
+            result = bot.fetch_tasks_from_email(progress=job.update)
+            if result.startswith(("Error", "Failed", "Email configuration not set")):
+                raise RuntimeError(result)
+            return result
+
+        # Runs as a background job; concurrent requests join the running import
+        job, created = jobs.submit("email_import", run_import)
+        message = "Email import started" if created else "Email import already in progress"
+        return jsonify({"message": message, "job_id": job.id, "status": job.status}), 202, \
+            {"Location": f"/api/jobs/{job.id}"}
+
+    @app.route("/api/jobs/<job_id>", methods=["GET"])
+    def get_job(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.snapshot())
         
     return app
 
 if __name__ == "__main__":
     # Choose whether to run in CLI mode or as web server
     import sys
+    import contextlib
+    profile = cli_flag()
     if len(sys.argv) > 1 and sys.argv[1] == "--server":
-        app = create_app()
+        # With --profile every request is profiled, not just flagged ones
+        app = create_app(profile_all=profile)
         app.run(port=5000, debug=True)
     else:
-        bot = AITaskTrackerBot()
-        bot.chat_interface()
\ No newline at end of file
+        with Profile("main-cli") if profile else contextlib.nullcontext():
+            bot = AITaskTrackerBot()
+            bot.chat_interface()
\ No newline at end of file
@@ -0,0 +1,265 @@
+import os
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+INDEX_PATH = os.path.join("meeting_data", "calendar_index.json")
+IST = timezone(timedelta(hours=5, minutes=30))
+DEFAULT_DURATION = timedelta(hours=1)
+
+
+class _Node:
+    __slots__ = ("key", "start", "end", "item", "prio", "left", "right", "max_end")
+
+    def __init__(self, key, start, end, item):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.item = item
+        self.prio = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node):
+    left = node.left
+    node.left, left.right = left.right, node
+    _update(node)
+    _update(left)
+    return left
+
+
+def _rotate_left(node):
+    right = node.right
+    node.right, right.left = right.left, node
+    _update(node)
+    _update(right)
+    return right
+
+
+class IntervalTree:
+    """Interval tree as a treap ordered by start and augmented with the
+    maximum end in each subtree, so overlap queries prune whole subtrees and
+    run in expected O(log n + k)."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, start, end, item_id, item):
+        self.root = self._insert(self.root, _Node((start, end, item_id), start, end, item))
+        self.size += 1
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if new.key < node.key:
+            node.left = self._insert(node.left, new)
+            if node.left.prio > node.prio:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.prio > node.prio:
+                node = _rotate_left(node)
+        _update(node)
+        return node
+
+    def remove(self, start, end, item_id):
+        size = self.size
+        self.root = self._remove(self.root, (start, end, item_id))
+        return self.size < size
+
+    def _remove(self, node, key):
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        elif key > node.key:
+            node.right = self._remove(node.right, key)
+        else:
+            if node.left is None or node.right is None:
+                self.size -= 1
+                return node.left or node.right
+            if node.left.prio > node.right.prio:
+                node = _rotate_right(node)
+                node.right = self._remove(node.right, key)
+            else:
+                node = _rotate_left(node)
+                node.left = self._remove(node.left, key)
+        _update(node)
+        return node
+
+    def overlapping(self, start, end, touching=False):
+        """Items whose interval overlaps [start, end); with `touching`,
+        intervals that merely meet at an endpoint count too."""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if node.max_end < start or (node.max_end == start and not touching):
+                continue
+            stack.append(node.left)
+            if node.start > end or (node.start == end and not touching):
+                continue
+            if node.end > start or (touching and node.end == start):
+                found.append(node.item)
+            stack.append(node.right)
+        return sorted(found, key=lambda item: item["start"])
+
+    def items(self):
+        out = []
+        stack, node = [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            out.append(node.item)
+            node = node.right
+        return out
+
+
+def meeting_interval(meeting_info, duration=DEFAULT_DURATION):
+    """(start, end) Unix timestamps for an extracted meeting in IST, or None"""
+    try:
+        start = datetime.strptime(f"{meeting_info['date']}T{meeting_info['time']}", "%Y-%m-%dT%H:%M")
+    except (KeyError, TypeError, ValueError):
+        return None
+    start = start.replace(tzinfo=IST)
+    return int(start.timestamp()), int((start + duration).timestamp())
+
+
+class MeetingIndex:
+    """Occupied time built from inserted meetings and synced calendar events"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.tree = IntervalTree()
+        self._ids = set()
+        self._stamp = None
+        self.load()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        self.refresh()
+
+    def refresh(self):
+        """Pick up meetings other processes saved since the last load.
+
+        Nothing is read while the file is unchanged; otherwise only items not
+        yet in the tree are inserted. Returns the number added.
+        """
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        self._stamp = stamp
+        added = 0
+        for item in items:
+            if item["id"] not in self._ids:
+                self.tree.insert(item["start"], item["end"], item["id"], item)
+                self._ids.add(item["id"])
+                added += 1
+        return added
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.tree.items(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._stamp = self._file_stamp()
+
+    def check(self, start, end, link=None):
+        """Classify a candidate slot against existing meetings.
+
+        Returns (duplicates, conflicts). A duplicate overlaps or is
+        back-to-back with a meeting sharing its link, e.g. repeated
+        "Happening now" invites; a conflict is any other overlap. The
+        envelope sender is not a key: every Google Meet invite comes from
+        the same no-reply address.
+        """
+        duplicates, conflicts = [], []
+        for item in self.tree.overlapping(start, end, touching=True):
+            if link and item.get("link") == link:
+                duplicates.append(item)
+            elif item["end"] > start and item["start"] < end:
+                conflicts.append(item)
+        return duplicates, conflicts
+
+    def add(self, start, end, **fields):
+        item = {"id": fields.pop("id", None) or uuid.uuid4().hex[:12], "start": start, "end": end, **fields}
+        self.tree.insert(start, end, item["id"], item)
+        self._ids.add(item["id"])
+        return item
+
+    def add_meeting(self, meeting_info, email_uid=None, sender=None):
+        """Insert an extracted meeting unless it duplicates one already indexed.
+
+        Returns (item_or_None, duplicates, conflicts).
+        """
+        interval = meeting_interval(meeting_info)
+        if interval is None:
+            return None, [], []
+        duplicates, conflicts = self.check(*interval, link=meeting_info.get("link"))
+        if duplicates:
+            return None, duplicates, conflicts
+        item = self.add(*interval, link=meeting_info.get("link"), sender=sender, email_uid=email_uid,
+                        description=meeting_info.get("description", ""), source="email")
+        return item, [], conflicts
+
+    def sync_events(self, events):
+        """Merge Google Calendar events (as returned by events().list) into the index"""
+        added = 0
+        for event in events:
+            event_id = f"gcal-{event['id']}"
+            start = event.get("start", {}).get("dateTime")
+            end = event.get("end", {}).get("dateTime")
+            if event_id in self._ids or not start or not end:
+                continue
+            self.add(int(datetime.fromisoformat(start.replace("Z", "+00:00")).timestamp()),
+                     int(datetime.fromisoformat(end.replace("Z", "+00:00")).timestamp()),
+                     id=event_id, description=event.get("summary", ""), source="calendar",
+                     link=event.get("hangoutLink") or event.get("location"))
+            added += 1
+        return added
+
+    def free_busy(self, start, end, min_free=0):
+        """Merged busy blocks and the free gaps (>= min_free seconds) in [start, end)"""
+        busy = []
+        for item in self.tree.overlapping(start, end):
+            s, e = max(item["start"], start), min(item["end"], end)
+            if busy and s <= busy[-1][1]:
+                busy[-1][1] = max(busy[-1][1], e)
+            else:
+                busy.append([s, e])
+        free, cursor = [], start
+        for s, e in busy:
+            if s > cursor and s - cursor >= min_free:
+                free.append([cursor, s])
+            cursor = max(cursor, e)
+        if end > cursor and end - cursor >= min_free:
+            free.append([cursor, end])
+        return {"busy": busy, "free": free}
@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Tiers from most to least capable; degrading moves one step down the list
+DEFAULT_TIERS = "premium=sonar-pro,fast=sonar"
+DEFAULT_BUDGETS = "premium=200000,fast=400000"
+
+# Task type -> (preferred tier, seconds a call may wait for token budget).
+# Interactive calls fail fast; background extraction can wait for the window.
+TASK_POLICIES = {
+    "chat": ("premium", 0),            # open questions answered with web search
+    "task_chat": ("fast", 0),          # questions about the local task list
+    "extract_tasks": ("fast", 30),
+    "extract_meeting": ("fast", 30),
+    "assignment_insight": ("premium", 30),
+}
+# Extraction inputs longer than this go to the preferred tier's next-better tier
+LONG_INPUT_TOKENS = 2000
+DEFAULT_COMPLETION_TOKENS = 500
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when no tier has token budget left within the allowed wait"""
+
+
+def _parse_pairs(text):
+    pairs = {}
+    for item in (text or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough prompt + completion size: ~4 characters per token"""
+    prompt = sum(len(m.get("content") or "") for m in messages or []) // 4
+    return prompt + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class ModelRouter:
+    """Chooses a model per call from task type, input size and current load,
+    and enforces per-minute token budgets per tier.
+
+    A call starts at its task's preferred tier (one tier up for long
+    extraction inputs), drops a tier while too many calls are in flight or
+    the tier's recent p90 latency is over target, and skips tiers whose
+    budget for the last 60 seconds cannot fit it. Every call's tier, model,
+    tokens and latency is recorded.
+    """
+
+    def __init__(self, tiers=None, budgets=None, max_in_flight=None, latency_target=None):
+        tiers = _parse_pairs(tiers or os.getenv("PERPLEXITY_TIERS", DEFAULT_TIERS))
+        budgets = _parse_pairs(budgets or os.getenv("PERPLEXITY_TOKEN_BUDGETS", DEFAULT_BUDGETS))
+        self.tier_names = list(tiers)
+        self.models = tiers
+        self.budgets = {name: int(budgets.get(name, 0)) or None for name in tiers}
+        self.max_in_flight = max_in_flight or int(os.getenv("PERPLEXITY_MAX_IN_FLIGHT", "8"))
+        self.latency_target = latency_target or float(os.getenv("PERPLEXITY_LATENCY_TARGET", "10"))
+        self.in_flight = 0
+        self._spent = {name: deque() for name in tiers}      # (timestamp, tokens)
+        self._latencies = {name: deque(maxlen=50) for name in tiers}
+        self.tier_stats = {name: {"calls": 0, "tokens": 0, "degraded": 0, "latency_sum": 0.0} for name in tiers}
+        self.recent = deque(maxlen=200)
+        self._cond = threading.Condition()
+
+    def _tier_index(self, name):
+        return self.tier_names.index(name) if name in self.tier_names else 0
+
+    def _used(self, tier, now):
+        window = self._spent[tier]
+        while window and window[0][0] < now - 60:
+            window.popleft()
+        return sum(tokens for _, tokens in window)
+
+    def _p90(self, tier):
+        latencies = sorted(self._latencies[tier])
+        return latencies[int(0.9 * (len(latencies) - 1))] if latencies else 0.0
+
+    def _fits(self, tier, tokens, now):
+        budget = self.budgets[tier]
+        return budget is None or self._used(tier, now) + tokens <= budget
+
+    def acquire(self, task, tokens):
+        """Pick a tier and reserve `tokens` of its budget; returns (tier, model)"""
+        preferred, max_wait = TASK_POLICIES.get(task, ("premium", 0))
+        start = self._tier_index(preferred)
+        if task.startswith("extract") and tokens > LONG_INPUT_TOKENS:
+            start = max(0, start - 1)
+        deadline = time.monotonic() + max_wait
+
+        with self._cond:
+            overloaded = self.in_flight >= self.max_in_flight or self._p90(self.tier_names[start]) > self.latency_target
+            first = min(start + 1, len(self.tier_names) - 1) if overloaded else start
+            while True:
+                now = time.time()
+                for tier in self.tier_names[first:] + self.tier_names[start:first]:
+                    if self._fits(tier, tokens, now):
+                        self._spent[tier].append((now, tokens))
+                        self.in_flight += 1
+                        if tier != self.tier_names[start]:
+                            self.tier_stats[tier]["degraded"] += 1
+                        return tier, self.models[tier]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BudgetExceededError("Perplexity token budget for this minute is used up; please try again shortly")
+                # Budgets free up as reservations age out of the 60s window
+                self._cond.wait(min(remaining, 1.0))
+
+    def release(self, task, tier, reserved, latency, used=None, error=None):
+        """Record a finished call; `used` replaces the reservation when known"""
+        with self._cond:
+            self.in_flight -= 1
+            if used is not None and used != reserved:
+                self._spent[tier].append((time.time(), used - reserved))
+            tokens = used if used is not None else reserved
+            stats = self.tier_stats[tier]
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+            stats["latency_sum"] += latency
+            self._latencies[tier].append(latency)
+            self.recent.append({
+                "task": task,
+                "tier": tier,
+                "model": self.models[tier],
+                "tokens": tokens,
+                "latency": round(latency, 3),
+                "error": error,
+                "at": time.time(),
+            })
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            now = time.time()
+            return {
+                "in_flight": self.in_flight,
+                "tiers": {
+                    name: {
+                        "model": self.models[name],
+                        "calls": stats["calls"],
+                        "degraded_to": stats["degraded"],
+                        "tokens": stats["tokens"],
+                        "tokens_last_minute": self._used(name, now),
+                        "budget_per_minute": self.budgets[name],
+                        "mean_latency": round(stats["latency_sum"] / stats["calls"], 3) if stats["calls"] else None,
+                        "p90_latency": round(self._p90(name), 3),
+                    }
+                    for name, stats in self.tier_stats.items()
+                },
+                "recent_calls": list(self.recent)[-20:],
+            }
@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+ACCOUNTS_PATH = "accounts.json"
+CHECKPOINT_DIR = "checkpoints"
+
+
+def load_accounts(path=ACCOUNTS_PATH):
+    """Read mailbox definitions.
+
+    Each entry: {"name", "host", "user", "password_env", "kinds": ["tasks",
+    "meetings"], "folder": "INBOX", "days_back": 7}. Passwords are never stored
+    in the file; each account names its own environment variable.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        accounts = json.load(f)
+    names = [a["name"] for a in accounts]
+    if len(names) != len(set(names)):
+        raise ValueError("Account names in accounts.json must be unique")
+    return accounts
+
+
+def _checkpoint_path(name):
+    return os.path.join(CHECKPOINT_DIR, f"{name}.json")
+
+
+def load_checkpoint(name):
+    path = _checkpoint_path(name)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"uidvalidity": None, "last_uid": 0}
+
+
+def save_checkpoint(name, checkpoint):
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    tmp_path = _checkpoint_path(name) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, _checkpoint_path(name))
+
+
+def _thread_index(kind, account_name):
+    """Per-account thread index, so parallel workers never share its file;
+    task ids are scoped by account, since fallback thread ids are UIDs"""
+    from email_threads import THREAD_DIR, ThreadIndex
+    return ThreadIndex(kind, folder=os.path.join(THREAD_DIR, account_name), scope=account_name)
+
+
+def ingest_slice(account, checkpoint, batch_size):
+    """Worker: fetch and extract at most `batch_size` new messages of one account.
+
+    Runs in a child process with only this account's credentials. Messages
+    go through the same classifier prefilter and thread grouping as TODO.py
+    and mail.py. Returns the task records, the extracted meetings as
+    (email, meeting_info, thread_id) for the coordinator to store, the
+    advanced checkpoint and whether more new messages remain, so the
+    coordinator can requeue the account fairly. The checkpoint stops before
+    the first message whose extraction failed, so the next run fetches it
+    again; later messages that did succeed are then skipped by the thread
+    index.
+    """
+    from dotenv import load_dotenv
+    from imapclient import IMAPClient
+    from email_parsing import parse_raw_email
+    from mail_archive import MailArchive
+
+    load_dotenv()
+    password = os.getenv(account["password_env"])
+    if not password:
+        raise ValueError(f"{account['password_env']} is not set for account {account['name']}")
+
+    kinds = account.get("kinds", ["tasks", "meetings"])
+    task_processor = meeting_processor = None
+    if "tasks" in kinds:
+        from TODO import EmailInboxProcessor as TaskProcessor
+        task_processor = TaskProcessor(None, None, None)
+        task_processor.threads = _thread_index("tasks", account["name"])
+    if "meetings" in kinds:
+        from mail import EmailInboxProcessor as MeetingProcessor
+        meeting_processor = MeetingProcessor(offline=True)
+        meeting_processor.threads = _thread_index("meetings", account["name"])
+    processors = [p for p in (task_processor, meeting_processor) if p is not None]
+
+    with IMAPClient(account["host"]) as server:
+        server.login(account["user"], password)
+        info = server.select_folder(account.get("folder", "INBOX"), readonly=True)
+        uidvalidity = info.get(b"UIDVALIDITY")
+        last_uid = checkpoint["last_uid"] if checkpoint.get("uidvalidity") == uidvalidity else 0
+
+        if last_uid:
+            uids = [u for u in server.search(["UID", f"{last_uid + 1}:*"]) if u > last_uid]
+        else:
+            since = (datetime.now() - timedelta(days=account.get("days_back", 7))).strftime("%d-%b-%Y")
+            uids = server.search(["SINCE", since])
+        uids = sorted(uids)
+        batch = uids[:batch_size]
+        archive = MailArchive()
+        records = dict(archive.fetch(server, account.get("folder", "INBOX"), batch, uidvalidity,
+                                     account=account["name"], batch_size=len(batch) or 1))
+
+    emails = [parse_raw_email(uid, records[uid]) for uid in batch if uid in records]
+    tasks, meetings, failed = [], [], []
+    try:
+        if task_processor is not None:
+            for group in task_processor.threads.group(emails):
+                try:
+                    extracted = task_processor._extract_thread(group) or []
+                except Exception as e:
+                    print(f"Task extraction failed for email {group.latest['uid']}: {e}")
+                    failed.extend(email["uid"] for email in group.emails)
+                    continue
+                tasks.extend({"account": account["name"], **task} for task in extracted)
+        if meeting_processor is not None:
+            for group in meeting_processor.threads.group(emails):
+                try:
+                    result = meeting_processor._extract_thread(group)
+                except Exception as e:
+                    print(f"Meeting extraction failed for email {group.latest['uid']}: {e}")
+                    failed.extend(email["uid"] for email in group.emails)
+                    continue
+                if result:
+                    meetings.append(result)
+            failed.extend(meeting_processor.failed_uids)
+    finally:
+        for processor in processors:
+            processor.threads.save()
+
+    done = batch[-1] if batch else last_uid
+    if failed:
+        done = max(last_uid, min(failed) - 1)
+    new_checkpoint = {"uidvalidity": uidvalidity, "last_uid": done}
+    return {
+        "account": account["name"],
+        "scanned": len(batch),
+        "failed": sorted(set(failed)),
+        "tasks": tasks,
+        "meetings": meetings,
+        "checkpoint": new_checkpoint,
+        # After a failure the account waits for the next run rather than
+        # retrying at once against an open circuit or spent budget
+        "has_more": len(uids) > len(batch) and not failed,
+    }
+
+
+def write_snapshot(folder, prefix, account_name, records):
+    """Merge results into the shared stores as a per-account snapshot file.
+
+    Only the coordinator writes, so workers never race on task_data/ or
+    meeting_data/; the snapshots are picked up by the task watcher and
+    folded by compaction.py like any other extraction run.
+    """
+    if not records:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = os.path.join(folder, f"{prefix}_{ts}_{account_name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def run_ingestion(accounts, workers=4, batch_size=25, calendar=False):
+    """Shard accounts across a process pool in round-robin slices.
+
+    Each submission handles at most `batch_size` messages for one account;
+    an account with more pending mail goes to the back of the queue, so a
+    huge mailbox only ever holds one worker at a time and cannot starve the
+    others. Checkpoints advance only after a slice's results are written.
+    Extracted meetings are stored here, in the one shared MeetingIndex, so
+    duplicates and conflicts are caught across accounts; with `calendar`
+    new meetings are also added to Google Calendar.
+    """
+    queue = deque(accounts)
+    summary = {a["name"]: {"scanned": 0, "failed": 0, "tasks": 0, "meetings": 0, "slices": 0,
+                            "error": None} for a in accounts}
+    started = time.perf_counter()
+
+    meeting_processor = index = None
+    if any("meetings" in a.get("kinds", ["tasks", "meetings"]) for a in accounts):
+        from mail import EmailInboxProcessor as MeetingProcessor
+        from meeting_index import MeetingIndex
+        meeting_processor = MeetingProcessor(offline=True)
+        index = MeetingIndex()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            while queue or in_flight:
+                while queue and len(in_flight) < workers:
+                    account = queue.popleft()
+                    future = pool.submit(ingest_slice, account, load_checkpoint(account["name"]), batch_size)
+                    in_flight[future] = account
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account = in_flight.pop(future)
+                    stats = summary[account["name"]]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Error ingesting account {account['name']}: {e}")
+                        stats["error"] = str(e)
+                        continue
+
+                    meetings = [{"account": account["name"],
+                                 **meeting_processor.store_meeting(index, email, meeting_info,
+                                                                   add_to_calendar=calendar, thread_id=thread_id)}
+                                for email, meeting_info, thread_id in result["meetings"]]
+                    write_snapshot("task_data", "extracted_tasks", account["name"], result["tasks"])
+                    write_snapshot("meeting_data", "extracted_meetings", account["name"], meetings)
+                    save_checkpoint(account["name"], result["checkpoint"])
+
+                    stats["scanned"] += result["scanned"]
+                    stats["failed"] += len(result["failed"])
+                    stats["tasks"] += len(result["tasks"])
+                    stats["meetings"] += len(result["meetings"])
+                    stats["slices"] += 1
+                    if result["has_more"]:
+                        queue.append(account)
+    finally:
+        if index is not None:
+            index.save()
+
+    elapsed = time.perf_counter() - started
+    return summary, elapsed
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Ingest tasks and meetings from many mailboxes in parallel")
+    parser.add_argument("--accounts", default=ACCOUNTS_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--batch-size", type=int, default=25, help="messages per account per turn")
+    parser.add_argument("--calendar", action="store_true", help="also add meetings to Google Calendar")
+    args = parser.parse_args()
+
+    summary, elapsed = run_ingestion(load_accounts(args.accounts), args.workers, args.batch_size, args.calendar)
+    for name, stats in summary.items():
+        status = f"error: {stats['error']}" if stats["error"] else \
+            f"{stats['failed']} to retry" if stats["failed"] else "ok"
+        print(f"{name}: {stats['scanned']} emails, {stats['tasks']} tasks, {stats['meetings']} meetings "
+              f"in {stats['slices']} slices ({status})")
+    print(f"✔ Ingested {len(summary)} accounts in {elapsed:.1f}s")
@@ -0,0 +1,248 @@
+import os
+import re
+import sys
+import mmap
+import time
+import zlib
+import hashlib
+import argparse
+import tempfile
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from email_parsing import parse_raw_email
+from email_threads import ThreadIndex, iter_windows
+from mail_archive import INDEX_NAME, MailArchive
+
+MBOXRD_ESCAPE = re.compile(rb"\n>(>*From )")
+
+
+def iter_mbox_spans(path):
+    """Yield (path, offset, length) for each message of an mbox file.
+
+    The file is memory-mapped and only scanned for "From " separator lines,
+    so even multi-gigabyte exports are never read into memory.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:5] != b"From ":
+                # Not an mbox: treat the whole file as one message
+                yield path, 0, len(mm)
+                return
+            pos = 0
+            while pos >= 0:
+                body_start = mm.find(b"\n", pos) + 1
+                if body_start == 0:
+                    return
+                nxt = mm.find(b"\nFrom ", body_start)
+                end = nxt if nxt >= 0 else len(mm)
+                if end > body_start:
+                    yield path, body_start, end - body_start
+                pos = nxt + 1 if nxt >= 0 else -1
+
+
+def iter_message_refs(source):
+    """Message references for an mbox file, a Maildir tree, a directory of
+    .eml files, a single .eml file or the local mail archive; length None
+    means the whole file."""
+    if os.path.isfile(os.path.join(source, INDEX_NAME)):
+        yield from MailArchive(source).iter_refs()
+        return
+    if os.path.isfile(source):
+        if source.lower().endswith(".eml"):
+            yield source, 0, None
+        else:
+            yield from iter_mbox_spans(source)
+        return
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        # Maildir keeps delivered mail in cur/ and new/; tmp/ is in-flight
+        in_maildir = os.path.basename(root) in ("cur", "new")
+        for name in sorted(files):
+            if in_maildir or name.lower().endswith(".eml"):
+                yield os.path.join(root, name), 0, None
+
+
+def message_uid(raw):
+    """Stable id for a message without an IMAP UID: a hash of its content"""
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def parse_batch(refs):
+    """Worker: read and parse a batch of messages, one mmap per mbox file"""
+    parsed = []
+    maps = {}
+    try:
+        for path, offset, length in refs:
+            if length is None:
+                with open(path, "rb") as f:
+                    raw = f.read()
+                if path.endswith(".z"):
+                    raw = zlib.decompress(raw)
+            else:
+                if path not in maps:
+                    f = open(path, "rb")
+                    maps[path] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                raw = MBOXRD_ESCAPE.sub(rb"\n\1", maps[path][1][offset:offset + length])
+            try:
+                email = parse_raw_email(message_uid(raw), raw)
+            except Exception as e:
+                print(f"Error parsing message at {path}:{offset}: {e}")
+                continue
+            email["size"] = len(raw)
+            parsed.append(email)
+    finally:
+        for f, mm in maps.values():
+            mm.close()
+            f.close()
+    return parsed
+
+
+def parse_parallel(refs, workers=None, batch_size=200):
+    """Parse messages across a process pool, yielding them in source order.
+
+    At most two batches per worker are in flight, so a slow consumer holds
+    back parsing instead of letting parsed mail pile up.
+    """
+    workers = workers or os.cpu_count() or 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        batch = []
+        for ref in refs:
+            batch.append(ref)
+            if len(batch) >= batch_size:
+                pending.append(pool.submit(parse_batch, batch))
+                batch = []
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+        if batch:
+            pending.append(pool.submit(parse_batch, batch))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def ingest(source, kinds=("tasks", "meetings"), label=None, workers=None, extract_workers=4,
+           calendar=False, parse_only=False, fresh=False):
+    """Feed a mail export through the same extraction and persistence paths
+    as TODO.py and mail.py, including per-thread grouping; returns
+    throughput counters.
+
+    With `fresh`, threads start from an empty throwaway index, so content
+    extracted before (e.g. when reprocessing the archive with a new prompt)
+    is sent again and thread_data is left untouched.
+
+    Records are tagged with `label` as their account, so content-hash UIDs
+    never collide with IMAP UIDs in the merged stores.
+    """
+    from pipeline import Pipeline, JsonArrayWriter
+
+    label = label or os.path.splitext(os.path.basename(os.path.normpath(source)))[0]
+    counters = {"messages": 0, "bytes": 0, "tasks": 0, "meetings": 0}
+    started = time.perf_counter()
+    emails = parse_parallel(iter_message_refs(source), workers)
+
+    if parse_only:
+        for email in emails:
+            counters["messages"] += 1
+            counters["bytes"] += email["size"]
+        counters["elapsed"] = time.perf_counter() - started
+        return counters
+
+    task_processor = meeting_processor = index = scratch = None
+    if "tasks" in kinds:
+        from TODO import EmailInboxProcessor as TaskProcessor
+        task_processor = TaskProcessor(None, None, None)
+    if "meetings" in kinds:
+        from mail import EmailInboxProcessor as MeetingProcessor
+        from meeting_index import MeetingIndex
+        meeting_processor = MeetingProcessor(offline=True)
+        index = MeetingIndex()
+    if fresh:
+        # Removed once the run ends; if it never gets there, when collected
+        scratch = tempfile.TemporaryDirectory(prefix="threads_")
+        for kind, processor in (("tasks", task_processor), ("meetings", meeting_processor)):
+            if processor is not None:
+                processor.threads = ThreadIndex(kind, folder=scratch.name)
+
+    def thread_jobs():
+        # Each kind keeps its own thread index, so group every window twice
+        for window in iter_windows(emails):
+            counters["messages"] += len(window)
+            counters["bytes"] += sum(email["size"] for email in window)
+            for kind, processor in (("tasks", task_processor), ("meetings", meeting_processor)):
+                if processor is not None:
+                    for group in processor.threads.group(window):
+                        yield kind, group
+
+    def extract(job):
+        kind, group = job
+        if kind == "tasks":
+            return kind, task_processor._extract_thread(group) or []
+        return kind, meeting_processor._extract_thread(group)
+
+    stream = Pipeline(thread_jobs(), buffer_size=32)
+    stream.stage("extract", extract, workers=extract_workers)
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs("task_data", exist_ok=True)
+    os.makedirs("meeting_data", exist_ok=True)
+    task_path = os.path.join("task_data", f"extracted_tasks_{ts}_{label}.json")
+    meeting_path = os.path.join("meeting_data", f"extracted_meetings_{ts}_{label}.json")
+    try:
+        with JsonArrayWriter(task_path, lazy=True) as task_writer, \
+                JsonArrayWriter(meeting_path, lazy=True) as meeting_writer:
+            for kind, result in stream.run():
+                if kind == "tasks":
+                    for task in result:
+                        task_writer.write({"account": label, **task})
+                elif result:
+                    email, meeting_info, thread_id = result
+                    record = meeting_processor.store_meeting(index, email, meeting_info,
+                                                             add_to_calendar=calendar, thread_id=thread_id)
+                    meeting_writer.write({"account": label, **record})
+        counters["tasks"], counters["meetings"] = task_writer.count, meeting_writer.count
+    finally:
+        if index is not None:
+            index.save()
+        for processor in (task_processor, meeting_processor):
+            if processor is not None:
+                processor.threads.save()
+        if scratch is not None:
+            scratch.cleanup()
+
+    counters["elapsed"] = time.perf_counter() - started
+    # No file is written for a kind that produced nothing
+    counters["task_file"] = task_path if counters.get("tasks") else None
+    counters["meeting_file"] = meeting_path if counters.get("meetings") else None
+    if task_processor is not None:
+        counters["classifier"] = task_processor.stats
+    return counters
+
+
+if __name__ == "__main__":
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Ingest tasks and meetings from mbox, Maildir or .eml exports")
+    parser.add_argument("source", help="mbox file, Maildir tree, .eml file, directory of .eml files "
+                                       "or the mail_archive folder")
+    parser.add_argument("--kinds", default="tasks,meetings", help="comma-separated: tasks, meetings")
+    parser.add_argument("--label", help="account name recorded on every record (default: source name)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="parser processes")
+    parser.add_argument("--extract-workers", type=int, default=4, help="concurrent LLM extraction calls")
+    parser.add_argument("--calendar", action="store_true", help="also add meetings to Google Calendar")
+    parser.add_argument("--parse-only", action="store_true", help="only parse, to measure raw throughput")
+    parser.add_argument("--fresh", action="store_true", help="ignore what earlier runs already extracted per thread")
+    args = parser.parse_args()
+
+    result = ingest(args.source, tuple(args.kinds.split(",")), args.label, args.workers,
+                    args.extract_workers, args.calendar, args.parse_only, args.fresh)
+    elapsed = result["elapsed"] or 1e-9
+    print(f"✔ {result['messages']} messages ({result['bytes'] / 1e6:.1f} MB) in {elapsed:.1f}s: "
+          f"{result['messages'] / elapsed:.1f} emails/s, {result['bytes'] / 1e6 / elapsed:.1f} MB/s")
+    if not args.parse_only:
+        print(f"Extracted {result['tasks']} tasks" + (f" → {result['task_file']}" if result["task_file"] else ""))
+        print(f"Extracted {result['meetings']} meetings"
+              + (f" → {result['meeting_file']}" if result["meeting_file"] else ""))
@@ -0,0 +1,280 @@
+import os
+import time
+import random
+import threading
+import functools
+
+from profiling import profiled
+from model_router import BudgetExceededError, ModelRouter, estimate_tokens
+
+PERPLEXITY_BASE_URL = "https://api.perplexity.ai"
+
+
+@functools.lru_cache(maxsize=None)
+def transient_errors():
+    """Errors worth retrying: the request may succeed if sent again shortly"""
+    import openai
+    return (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one half-open probe decides whether to close."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Perplexity API is temporarily unavailable; please try again shortly")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    raise CircuitOpenError("Perplexity API is recovering; please try again shortly")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class RoutedStream:
+    """A streamed completion that holds its router reservation until the
+    stream is exhausted, fails or is closed; only then is the call released
+    with its real latency and, when a chunk reports it, token usage."""
+
+    def __init__(self, stream, release):
+        self.stream = stream
+        self._release = release
+        self._chunks = iter(stream)
+        self.used = None
+        self._released = False
+
+    def _finish(self, error=None):
+        if not self._released:
+            self._released = True
+            self._release(self.used, error)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(type(e).__name__)
+            raise
+        usage = getattr(chunk, "usage", None)
+        if getattr(usage, "total_tokens", None) is not None:
+            self.used = usage.total_tokens
+        return chunk
+
+    def close(self):
+        try:
+            close = getattr(self.stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self._finish()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class PerplexityClient:
+    """Pooled OpenAI-compatible client with timeouts, jittered retries and a
+    circuit breaker. Use `get_client()` rather than constructing directly so
+    every caller in the process shares one connection pool. The SDK and its
+    HTTP pool are only imported and built on the first call."""
+
+    def __init__(self, api_key, timeout=30.0, connect_timeout=5.0, max_retries=2,
+                 backoff_base=0.5, backoff_cap=8.0, max_connections=20, max_keepalive=10):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("PERPLEXITY_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("PERPLEXITY_BREAKER_RESET", "30")),
+        )
+        self.http_client = None
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.router = ModelRouter()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "last_error": None}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The OpenAI SDK client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    from openai import OpenAI
+                    self.http_client = httpx.Client(
+                        timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=60.0,
+                        ),
+                    )
+                    # Retries are handled here (with jitter and breaker accounting), not by the SDK
+                    self._client = OpenAI(api_key=self.api_key, base_url=PERPLEXITY_BASE_URL,
+                                          http_client=self.http_client, max_retries=0)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def _count(self, key, error=None):
+        with self._stats_lock:
+            self.stats[key] += 1
+            if error is not None:
+                self.stats["last_error"] = f"{type(error).__name__}: {error}"
+
+    @profiled("perplexity")
+    def complete(self, timeout=None, task="chat", **kwargs):
+        """chat.completions.create with per-call timeout, retries and breaker.
+
+        Unless a model is given explicitly, the router picks one for `task`
+        (see model_router.TASK_POLICIES) and records the call's tier,
+        tokens and latency. A streamed call comes back as a RoutedStream,
+        which keeps the reservation until the stream ends or is closed.
+        """
+        if "model" in kwargs:
+            return self._complete(timeout, **kwargs)
+
+        reserved = estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens"))
+        try:
+            tier, kwargs["model"] = self.router.acquire(task, reserved)
+        except BudgetExceededError:
+            self._count("rejected")
+            raise
+        started = time.perf_counter()
+
+        def release(used=None, error=None):
+            self.router.release(task, tier, reserved, time.perf_counter() - started, used, error)
+
+        try:
+            response = self._complete(timeout, **kwargs)
+        except Exception as e:
+            # A call that was never sent refunds its reservation
+            release(0 if isinstance(e, CircuitOpenError) else None, type(e).__name__)
+            raise
+        if kwargs.get("stream"):
+            return RoutedStream(response, release)
+        usage = getattr(response, "usage", None)
+        release(getattr(usage, "total_tokens", None))
+        return response
+
+    def _complete(self, timeout, **kwargs):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("rejected")
+            raise
+
+        self._count("calls")
+        attempt = 0
+        while True:
+            try:
+                response = self.client.chat.completions.create(timeout=timeout or self.timeout, **kwargs)
+                self.breaker.record_success()
+                return response
+            except transient_errors() as e:
+                if attempt >= self.max_retries:
+                    self._count("failures", e)
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self._count("retries", e)
+                # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+                time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+            except Exception as e:
+                # Client errors (bad request, auth) are not upstream degradation
+                self._count("failures", e)
+                self.breaker.record_success()
+                raise
+
+    def health(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "healthy": self.breaker.state == "closed",
+            "routing": self.router.snapshot(),
+        })
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def register_client(api_key, client):
+    """Install a client (e.g. a fake for load tests) for get_client to return"""
+    with _clients_lock:
+        _clients[api_key] = client
+
+
+def get_client(api_key=None):
+    """Return the process-wide client for an API key (default from env)"""
+    api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
+    if not api_key:
+        raise ValueError("PERPLEXITY_API_KEY environment variable not set")
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = PerplexityClient(
+                api_key,
+                timeout=float(os.getenv("PERPLEXITY_TIMEOUT", "30")),
+                max_retries=int(os.getenv("PERPLEXITY_MAX_RETRIES", "2")),
+                max_connections=int(os.getenv("PERPLEXITY_POOL_SIZE", "20")),
+            )
+        return _clients[api_key]
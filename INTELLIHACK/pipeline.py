@@ -0,0 +1,164 @@
+import json
+import queue
+import threading
+import contextvars
+from profiling import profiled
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class Pipeline:
+    """Thread stages connected by bounded queues.
+
+    The source generator, each stage and the consumer run concurrently, and
+    every queue holds at most `buffer_size` items, so a slow stage (usually
+    the LLM call) blocks the ones before it instead of letting fetched mail
+    pile up in memory. Iterate over `run()` to consume the final items.
+    """
+
+    def __init__(self, source, buffer_size=8):
+        self.source = source
+        self.buffer_size = buffer_size
+        self.stages = []
+        self.stats = {"source": 0}
+
+    def stage(self, name, func, workers=1):
+        """Add a stage; `func(item)` returns the next item, or None to drop it"""
+        self.stages.append((name, func, workers))
+        self.stats[name] = 0
+        return self
+
+    @staticmethod
+    def _put(q, item, stop):
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(q, stop):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _feed(self, out_q, stop):
+        try:
+            for item in self.source:
+                self.stats["source"] += 1
+                if not self._put(out_q, item, stop):
+                    return
+        except Exception as e:
+            self._put(out_q, _Failure(e), stop)
+        self._put(out_q, _DONE, stop)
+
+    def _work(self, name, func, in_q, out_q, remaining, lock, stop):
+        while True:
+            item = self._get(in_q, stop)
+            if item is _DONE:
+                # Last worker of this stage passes the end marker on
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                self._put(out_q if last else in_q, _DONE, stop)
+                return
+            if isinstance(item, _Failure):
+                result = item
+            else:
+                try:
+                    result = func(item)
+                except Exception as e:
+                    result = _Failure(e)
+            if result is not None:
+                with lock:
+                    self.stats[name] += 1
+                if not self._put(out_q, result, stop):
+                    return
+
+    def run(self):
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.buffer_size) for _ in range(len(self.stages) + 1)]
+        # Each thread runs in a copy of the caller's context, so profiling
+        # spans opened by the stages attach to the caller's current span
+        threads = [threading.Thread(target=contextvars.copy_context().run,
+                                    args=(self._feed, queues[0], stop), daemon=True)]
+        for i, (name, func, workers) in enumerate(self.stages):
+            remaining, lock = [workers], threading.Lock()
+            for _ in range(workers):
+                threads.append(threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(self._work, name, func, queues[i], queues[i + 1], remaining, lock, stop),
+                    daemon=True,
+                ))
+        for thread in threads:
+            thread.start()
+
+        out_q = queues[-1]
+        try:
+            while True:
+                item = out_q.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            # On error or early exit, unblock every stage so its thread ends
+            stop.set()
+
+
+class JsonArrayWriter:
+    """Write a JSON array one item at a time, flushing after each item.
+
+    Output is the same array format the snapshot readers expect; results are
+    on disk as soon as they are produced instead of at the end of the run.
+    With `lazy`, the file is only created by the first item, so a run that
+    produces nothing leaves no empty snapshot behind.
+    """
+
+    def __init__(self, path, echo=False, lazy=False):
+        self.path = path
+        self.echo = echo
+        self.lazy = lazy
+        self.count = 0
+        self._file = None
+
+    def _open(self):
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[")
+
+    def __enter__(self):
+        if not self.lazy:
+            self._open()
+        return self
+
+    @profiled("json_dump")
+    def write(self, item):
+        if self._file is None:
+            self._open()
+        text = json.dumps(item, ensure_ascii=False, indent=2)
+        self._file.write(("," if self.count else "") + "\n" + "\n".join("  " + line for line in text.splitlines()))
+        self._file.flush()
+        self.count += 1
+        if self.echo:
+            try:
+                print(text)
+            except UnicodeEncodeError as e:
+                print(f"Error encoding JSON for console output: {e}")
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            self._file.write("\n]\n" if self.count else "]\n")
+            self._file.close()
+        return False
@@ -0,0 +1,213 @@
+import io
+import os
+import sys
+import json
+import glob
+import time
+import contextlib
+import functools
+import threading
+import contextvars
+from datetime import datetime
+
+PROFILE_DIR = "profiles"
+
+# Innermost open span of the profile running in this context, if any
+_current_span = contextvars.ContextVar("profile_span", default=None)
+_NOOP = contextlib.nullcontext()
+
+# Profiles running at once share tracemalloc: it is started by the first one
+# (unless something else already traces) and stopped when the last one ends
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+class _Span:
+    def __init__(self, name):
+        self.node = {"name": name, "ms": 0.0, "children": []}
+
+    def __enter__(self):
+        parent = _current_span.get()
+        parent["children"].append(self.node)
+        self._token = _current_span.set(self.node)
+        self._start = time.perf_counter()
+        return self.node
+
+    def __exit__(self, exc_type, exc, tb):
+        self.node["ms"] = round((time.perf_counter() - self._start) * 1000, 3)
+        _current_span.reset(self._token)
+        return False
+
+
+def span(name):
+    """Time a block as a child of the current span.
+
+    Outside a profiled run this returns a shared no-op context, so spans can
+    stay in hot paths permanently. Spans follow the calling context only:
+    work handed to other threads is not attributed.
+    """
+    if _current_span.get() is None:
+        return _NOOP
+    return _Span(name)
+
+
+def profiled(name):
+    """Decorator form of span()"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Profile:
+    """Capture one profiled run: cProfile stats, tracemalloc top-N and a
+    wall-clock span tree, written to PROFILE_DIR on exit.
+
+    tracemalloc is process-wide, so allocations made by other threads while
+    the run is active are included in its top-N, and overlapping runs share
+    one trace.
+    """
+
+    def __init__(self, label, top=25, folder=PROFILE_DIR):
+        self.label = label
+        self.top = top
+        self.folder = folder
+        self.root = {"name": label, "ms": 0.0, "children": []}
+        self.path = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        # Profiler modules load on the first profiled run, not at import
+        import cProfile
+        import tracemalloc
+
+        global _tracing_users, _tracing_started
+        with _tracing_lock:
+            if _tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_started = True
+            _tracing_users += 1
+        self._token = _current_span.set(self.root)
+        self._profiler = cProfile.Profile()
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def stop(self):
+        """Finish the run and write it; returns the JSON path or None"""
+        import tracemalloc
+
+        self._profiler.disable()
+        self.root["ms"] = round((time.perf_counter() - self._start) * 1000, 3)
+        _current_span.reset(self._token)
+        global _tracing_users, _tracing_started
+        with _tracing_lock:
+            # Someone outside the profiles may have stopped tracing meanwhile
+            snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            _tracing_users -= 1
+            if _tracing_users == 0 and _tracing_started:
+                tracemalloc.stop()
+                _tracing_started = False
+        try:
+            self._write(snapshot)
+        except Exception as e:
+            print(f"Error writing profile {self.label}: {e}")
+        return self.path
+
+    def _write(self, snapshot):
+        import pstats
+
+        os.makedirs(self.folder, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.label.strip("/"))
+        base = os.path.join(self.folder, f"{stamp}_{safe_label}")
+
+        # Raw stats for snakeviz / pstats, plus a readable top-N in the JSON
+        self._profiler.dump_stats(base + ".prof")
+        text = io.StringIO()
+        pstats.Stats(self._profiler, stream=text).sort_stats("cumulative").print_stats(self.top)
+
+        allocations = [
+            {"where": str(stat.traceback[0]), "kib": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:self.top]
+        ] if snapshot is not None else []
+        profile = {
+            "label": self.label,
+            "recorded_at": datetime.now().isoformat(),
+            "wall_ms": self.root["ms"],
+            "spans": self.root,
+            "allocations": allocations,
+            "cprofile": text.getvalue(),
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+        self.path = base + ".json"
+
+
+def cli_flag(argv=None):
+    """Strip --profile from argv; True if it was present"""
+    argv = sys.argv if argv is None else argv
+    if "--profile" in argv:
+        argv.remove("--profile")
+        return True
+    return False
+
+
+def print_spans(node, depth=0, min_ms=0.0):
+    print(f"{'  ' * depth}{node['name']}: {node['ms']:.1f} ms")
+    for child in node["children"]:
+        if child["ms"] >= min_ms:
+            print_spans(child, depth + 1, min_ms)
+
+
+def list_profiles(folder=PROFILE_DIR):
+    for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        print(f"{os.path.basename(path)}  {profile['label']}  {profile['wall_ms']:.1f} ms")
+
+
+def show_profile(path, min_ms=0.0, stats=False):
+    with open(path, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    print(f"{profile['label']} ({profile['recorded_at']}): {profile['wall_ms']:.1f} ms")
+    print("\nSpans:")
+    print_spans(profile["spans"], 1, min_ms)
+    print("\nTop allocations:")
+    for item in profile["allocations"][:10]:
+        print(f"  {item['kib']:>10.1f} KiB  {item['count']:>7}  {item['where']}")
+    if stats:
+        print("\ncProfile:")
+        print(profile["cprofile"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="List or summarize recorded profiles")
+    parser.add_argument("profile", nargs="?", help="profile JSON to show; lists all profiles when omitted")
+    parser.add_argument("--folder", default=PROFILE_DIR)
+    parser.add_argument("--min-ms", type=float, default=0.0, help="hide spans shorter than this")
+    parser.add_argument("--stats", action="store_true", help="also print the cProfile top functions")
+    args = parser.parse_args()
+
+    if args.profile:
+        path = args.profile if os.path.exists(args.profile) else os.path.join(args.folder, args.profile)
+        show_profile(path, args.min_ms, args.stats)
+    else:
+        list_profiles(args.folder)
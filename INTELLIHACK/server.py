@@ -3,8 +3,9 @@ import json
 from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from openai import OpenAI
 from dotenv import load_dotenv
+from perplexity_client import CircuitOpenError, get_client
+from answer_cache import AnswerCache, normalize_question
 
 # AI Logic
 class AITrackerBot:
@@ -14,27 +15,36 @@ class AITrackerBot:
         if not self.api_key:
             raise ValueError("PERPLEXITY_API_KEY environment variable not set")
 
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai")
+        self.client = get_client(self.api_key)
         self.conversation_log = []
+        self.answer_cache = AnswerCache(ttl=int(os.getenv("CHAT_CACHE_TTL", "300")))
         self.system_prompt = (
             "You are an AI assistant that answers questions by performing real-time web searches. "
             "Provide clear, concise answers with citations from trustworthy sources."
         )
 
-    def ask(self, user_input):
+    def ask(self, user_input, fresh=False):
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": user_input}
         ]
-        try:
-            response = self.client.chat.completions.create(
-                model="sonar-pro",
+
+        def call_upstream():
+            response = self.client.complete(
+                task="chat",
                 messages=messages,
                 temperature=0.7
             )
-            answer = response.choices[0].message.content
+            return response.choices[0].message.content
+
+        try:
+            # Identical questions share one upstream call and a short-lived answer
+            answer = self.answer_cache.get_or_compute(normalize_question(user_input), call_upstream, bypass=fresh)
             self.log_interaction(user_input, answer)
             return answer
+        except CircuitOpenError as e:
+            self.log_interaction(user_input, str(e))
+            return str(e)
         except Exception as e:
             error_msg = f"Error communicating with Perplexity API: {e}"
             self.log_interaction(user_input, error_msg)
@@ -66,8 +76,18 @@ def chat():
     if not message:
         return jsonify({"error": "No message provided"}), 400
 
-    response = bot.ask(message)
+    fresh = bool(data.get("fresh")) or "no-cache" in request.headers.get("Cache-Control", "")
+    response = bot.ask(message, fresh=fresh)
     return jsonify({"response": response})
 
+@app.route('/api/health', methods=['GET'])
+def health():
+    upstream = bot.client.health()
+    return jsonify({"status": "ok" if upstream["healthy"] else "degraded", "perplexity": upstream})
+
+@app.route('/api/chat/cache-stats', methods=['GET'])
+def chat_cache_stats():
+    return jsonify(bot.answer_cache.snapshot())
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
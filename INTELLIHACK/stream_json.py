@@ -0,0 +1,180 @@
+import re
+import json
+
+OPENERS = {"[": "]", "{": "}"}
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _loads_lenient(text):
+    """json.loads, retrying once with trailing commas removed"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(TRAILING_COMMA.sub(r"\1", text))
+
+
+class StreamingJsonParser:
+    """Incremental, tolerant parser for JSON embedded in LLM output.
+
+    In "array" mode each element of the first well-formed top-level array of
+    objects is returned from feed() as soon as its closing bracket arrives;
+    arrays of scalars, such as a "[1]" citation, are skipped. In "object"
+    mode the first well-formed object is returned. Prose, markdown fences
+    and stray brackets before the JSON are skipped: a candidate that turns
+    out not to be JSON is abandoned and scanning resumes after it. `done` becomes
+    True once the structure closes, so the caller can stop generation, and
+    finish() repairs a structure cut off by truncation.
+    """
+
+    def __init__(self, mode="array"):
+        self.mode = mode
+        self.opener = "[" if mode == "array" else "{"
+        self.buf = ""
+        self.pos = 0
+        self.done = False
+        self._reset()
+
+    def _reset(self):
+        self.start = None       # index of the candidate's opening bracket
+        self.stack = []         # open brackets inside the candidate
+        self.in_str = False
+        self.esc = False
+        self.elem_start = None  # array mode: start of the current element
+        self.emitted = 0
+
+    def _abandon(self):
+        """Candidate was not JSON: rescan from just after its opening bracket"""
+        self.pos = self.start + 1
+        self._reset()
+
+    def _emit(self, text, out):
+        try:
+            item = _loads_lenient(text)
+        except json.JSONDecodeError:
+            if not self.emitted:
+                return False
+            return True  # skip one bad element of an otherwise valid array
+        if self.mode == "array" and not isinstance(item, dict):
+            # Citations and other scalar lists are not the answer
+            return bool(self.emitted)
+        self.emitted += 1
+        out.append(item)
+        return True
+
+    def feed(self, chunk):
+        """Consume more text; return the items completed by it"""
+        self.buf += chunk
+        out = []
+        while not self.done and self.pos < len(self.buf):
+            if self.start is None:
+                i = self.buf.find(self.opener, self.pos)
+                if i < 0:
+                    self.pos = len(self.buf)
+                    break
+                self.start, self.stack, self.pos = i, [self.opener], i + 1
+                continue
+            if not self._step(out):
+                self._abandon()
+        return out
+
+    def _step(self, out):
+        i = self.pos
+        c = self.buf[i]
+        self.pos += 1
+        if self.in_str:
+            if self.esc:
+                self.esc = False
+            elif c == "\\":
+                self.esc = True
+            elif c == '"':
+                self.in_str = False
+            return True
+
+        top_level = self.mode == "array" and len(self.stack) == 1
+        if c == '"':
+            self.in_str = True
+            if top_level and self.elem_start is None:
+                self.elem_start = i
+        elif c in OPENERS:
+            if top_level and self.elem_start is None:
+                self.elem_start = i
+            self.stack.append(c)
+        elif c in "]}":
+            if OPENERS[self.stack[-1]] != c:
+                return False
+            self.stack.pop()
+            if not self.stack:
+                if self.mode == "object":
+                    if not self._emit(self.buf[self.start:i + 1], out):
+                        return False
+                elif self.elem_start is not None:
+                    if not self._emit(self.buf[self.elem_start:i], out):
+                        return False
+                self.done = True
+            elif self.mode == "array" and len(self.stack) == 1 and self.elem_start is not None:
+                ok = self._emit(self.buf[self.elem_start:i + 1], out)
+                self.elem_start = None
+                if not ok:
+                    return False
+        elif c == "," and top_level:
+            if self.elem_start is not None:
+                ok = self._emit(self.buf[self.elem_start:i], out)
+                self.elem_start = None
+                if not ok:
+                    return False
+        elif top_level and self.elem_start is None and not c.isspace():
+            if not (c.isdigit() or c in "-tfn"):
+                return False  # prose such as "[see below]", not a JSON array
+            self.elem_start = i
+        return True
+
+    def finish(self):
+        """Best-effort repair of a structure truncated mid-generation"""
+        if self.done or self.start is None:
+            return []
+        begin = self.elem_start if self.mode == "array" else self.start
+        if begin is None:
+            return []
+        closers = "".join(OPENERS[b] for b in reversed(self.stack[1:] if self.mode == "array" else self.stack))
+        text = self.buf[begin:] + ('"' if self.in_str else "")
+        candidates = [text]
+        cut = text.rfind(",")
+        if cut > 0:
+            candidates.append(text[:cut])  # drop a half-written trailing field
+        for candidate in candidates:
+            candidate = candidate.rstrip().rstrip(",")
+            if candidate.endswith(":"):
+                candidate += " null"
+            try:
+                item = _loads_lenient(candidate + closers)
+            except json.JSONDecodeError:
+                continue
+            if self.mode == "array" and not isinstance(item, dict):
+                continue
+            self.done = True
+            return [item]
+        return []
+
+
+def iter_stream_json(stream, mode="array"):
+    """Yield JSON items from a streamed chat completion as they complete,
+    closing the stream (ending generation) once the structure is closed."""
+    parser = StreamingJsonParser(mode)
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            yield from parser.feed(delta)
+            if parser.done:
+                break
+    finally:
+        stream.close()
+    yield from parser.finish()
+
+
+def parse_json_text(text, mode="array"):
+    """Parse a complete response with the same tolerant rules"""
+    parser = StreamingJsonParser(mode)
+    items = parser.feed(text)
+    return items + parser.finish()
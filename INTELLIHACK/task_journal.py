@@ -0,0 +1,102 @@
+import copy
+import time
+import bisect
+import threading
+from datetime import datetime
+
+
+class TaskJournal:
+    """Monotonic journal of task creates, updates and deletes.
+
+    Every change gets a cursor; clients pass the last cursor they applied
+    and receive only later changes. Cursors start from the wall clock in
+    milliseconds, so a cursor handed out before a restart falls below the
+    journal's floor and the client is told to reset (re-fetch /api/tasks)
+    instead of silently missing changes.
+
+    The journal compacts itself: once it grows past `max_entries`, the older
+    half keeps only the latest entry per task (later entries supersede
+    earlier ones for any cursor), and delete tombstones older than
+    `tombstone_ttl` seconds are dropped, raising the floor past them.
+    """
+
+    def __init__(self, max_entries=10000, tombstone_ttl=86400):
+        self.max_entries = max_entries
+        self.tombstone_ttl = tombstone_ttl
+        self.cursor = self.floor = int(time.time() * 1000)
+        self.entries = []
+        self._cursors = []
+        self._next_compaction = max_entries
+        self.compactions = 0
+        self._cond = threading.Condition()
+
+    def record(self, op, task_id, task=None):
+        """Append a change ("create", "update" or "delete") and wake waiters"""
+        with self._cond:
+            self.cursor += 1
+            self.entries.append({
+                "cursor": self.cursor,
+                "op": op,
+                "id": task_id,
+                "task": copy.deepcopy(task) if task is not None else None,
+                "at": datetime.now().isoformat(),
+                "_ts": time.time(),
+            })
+            self._cursors.append(self.cursor)
+            if len(self.entries) > self._next_compaction:
+                self._compact()
+            self._cond.notify_all()
+            return self.cursor
+
+    def _compact(self):
+        cut = len(self.entries) - self.max_entries // 2
+        old, recent = self.entries[:cut], self.entries[cut:]
+        recent_ids = {entry["id"] for entry in recent}
+        expire_before = time.time() - self.tombstone_ttl
+
+        latest = {}
+        for entry in old:
+            if entry["id"] not in recent_ids:
+                latest[entry["id"]] = entry
+        kept = []
+        for entry in sorted(latest.values(), key=lambda e: e["cursor"]):
+            if entry["op"] == "delete" and entry["_ts"] < expire_before:
+                self.floor = max(self.floor, entry["cursor"])
+                continue
+            kept.append(entry)
+
+        self.entries = kept + recent
+        self._cursors = [entry["cursor"] for entry in self.entries]
+        self._next_compaction = max(self.max_entries, 2 * len(self.entries))
+        self.compactions += 1
+
+    def changes(self, since, limit=500):
+        """Changes after cursor `since`, oldest first.
+
+        `reset` is True when the cursor predates the journal (compacted
+        tombstones or a restart); the client should reload the full task
+        list and continue from the returned cursor.
+        """
+        with self._cond:
+            if since is None or since < self.floor or since > self.cursor:
+                return {"cursor": self.cursor, "reset": True, "changes": [], "has_more": False}
+            start = bisect.bisect_right(self._cursors, since)
+            batch = self.entries[start:start + limit]
+            has_more = start + limit < len(self.entries)
+            cursor = batch[-1]["cursor"] if has_more else self.cursor
+            changes = [{k: v for k, v in entry.items() if k != "_ts"} for entry in batch]
+            return {"cursor": cursor, "reset": False, "changes": changes, "has_more": has_more}
+
+    def wait(self, since, timeout=None):
+        """Block until there is a change after `since`; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.cursor > since, timeout)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "cursor": self.cursor,
+                "floor": self.floor,
+                "entries": len(self.entries),
+                "compactions": self.compactions,
+            }
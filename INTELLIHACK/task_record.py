@@ -0,0 +1,253 @@
+import sys
+import json
+import threading
+from datetime import datetime, timedelta
+
+# Stored timestamps are microseconds of naive wall-clock time since this
+# epoch: exact for datetime.now().isoformat() strings, with no timezone math
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Marks a field the task never had, so to_dict() reproduces its keys
+MISSING = type("Missing", (), {"__repr__": lambda self: "MISSING", "__slots__": ()})()
+
+
+class CodeTable:
+    """Small-int codes for a low-cardinality field; unseen values get the
+    next code, so tasks with custom statuses or sources still round-trip"""
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        self._lock = threading.Lock()
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(value)
+                if code is None:
+                    code = self.codes[value] = len(self.values)
+                    self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+
+STATUS = CodeTable(("pending", "in_progress", "completed"))
+PRIORITY = CodeTable(("high", "medium", "low"))
+SOURCE = CodeTable(("email", "manual"))
+CODED = {"status": STATUS, "priority": PRIORITY, "source": SOURCE}
+TIMES = ("created_at", "updated_at")
+
+FIELDS = ("id", "description", "status", "progress", "created_at", "updated_at", "deadline",
+          "priority", "source", "sender", "email_id", "notes")
+_FIELD_SET = frozenset(FIELDS)
+
+# Derived when a task is stored and never part of its JSON form; files saved
+# while it was still persisted carry it, so from_dict drops it
+DERIVED = ("deadline_ts",)
+
+
+def encode_time(value):
+    """ISO timestamp -> int microseconds. Values that would not decode back
+    to the same string (aware, date-only, unparseable) are kept as-is"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        return value
+    encoded = (parsed - _EPOCH) // _MICROSECOND
+    return encoded if decode_time(encoded) == value else value
+
+
+def decode_time(value):
+    if isinstance(value, int):
+        return (_EPOCH + value * _MICROSECOND).isoformat()
+    return value
+
+
+def encode_notes(notes):
+    """Notes as a tuple of (text, timestamp) pairs, or MISSING.
+
+    Tuples pass through unchanged, so a loader can encode one note list and
+    share it between every task it builds (e.g. all entries of a snapshot).
+    """
+    if isinstance(notes, tuple) or notes is MISSING:
+        return notes
+    encoded = []
+    for note in notes or ():
+        if isinstance(note, dict) and set(note) == {"text", "timestamp"} and isinstance(note["text"], str):
+            encoded.append((sys.intern(note["text"]), encode_time(note["timestamp"])))
+        else:
+            encoded.append(note)
+    return tuple(encoded)
+
+
+def decode_notes(notes):
+    return [{"text": note[0], "timestamp": decode_time(note[1])} if isinstance(note, tuple) else note
+            for note in notes]
+
+
+class TaskRecord:
+    """One task of the in-memory store, without a per-task dict.
+
+    Status, priority and source are small-int codes, created/updated times
+    integers, senders and deadlines interned strings, and notes a shared
+    immutable tuple that is only turned into dicts when read. Fields outside
+    the known schema go to `extra`. Item access (task["status"], get, in)
+    speaks the same JSON-level values as the task dicts it replaces;
+    attributes hold the encoded values. to_dict() is the JSON form; the
+    derived deadline_ts attribute is not part of it.
+    """
+
+    __slots__ = FIELDS + DERIVED + ("extra",)
+
+    def __init__(self):
+        for field in FIELDS:
+            setattr(self, field, MISSING)
+        self.deadline_ts = None
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls()
+        for key, value in data.items():
+            if key not in DERIVED:
+                record[key] = value
+        return record
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        if key in CODED:
+            value = CODED[key].encode(value)
+        elif key in TIMES:
+            value = encode_time(value)
+        elif key == "notes":
+            value = encode_notes(value)
+        elif key in ("sender", "deadline") and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            if key in CODED:
+                return CODED[key].decode(value)
+            if key in TIMES:
+                return decode_time(value)
+            if key == "notes":
+                return decode_notes(value)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key) is not MISSING
+        return bool(self.extra) and key in self.extra
+
+    def keys(self):
+        present = [field for field in FIELDS if getattr(self, field) is not MISSING]
+        return present + list(self.extra or ())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def add_note(self, text, timestamp):
+        notes = self.notes if self.notes is not MISSING else ()
+        self.notes = notes + ((text, encode_time(timestamp)),)
+
+    def _state(self):
+        return tuple(getattr(self, field) for field in FIELDS) + (self.extra,)
+
+    def __eq__(self, other):
+        if not isinstance(other, TaskRecord):
+            return NotImplemented
+        return self._state() == other._state()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"TaskRecord({self.to_dict()!r})"
+
+
+def _sample_tasks(count):
+    """JSON text of `count` tasks shaped like the ones main.py stores"""
+    import random
+
+    now = datetime.now()
+    tasks = []
+    for i in range(count):
+        created = (now - timedelta(days=random.randint(0, 30), seconds=random.randint(0, 86400))).isoformat()
+        tasks.append({
+            "id": f"{i:08x}",
+            "description": f"Follow up on item {i} from the weekly review",
+            "status": random.choice(["pending", "pending", "in_progress", "completed"]),
+            "progress": random.randint(0, 100),
+            "created_at": created,
+            "updated_at": created,
+            "deadline": (now + timedelta(days=random.randint(-5, 20))).strftime("%Y-%m-%d"),
+            "priority": random.choice(["high", "medium", "low"]),
+            "source": "email",
+            "sender": f"user{i % 50}@example.com",
+            "email_id": str(10000 + i),
+            "notes": [{"text": "Task created from email", "timestamp": created}],
+        })
+    return json.dumps(tasks)
+
+
+def measure(build, text):
+    """Bytes held by the store `build` makes from freshly parsed task JSON"""
+    import tracemalloc
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    store = build(json.loads(text))
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return held, store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Memory per task: plain dicts vs TaskRecord")
+    parser.add_argument("--tasks", type=int, default=50000)
+    args = parser.parse_args()
+
+    text = _sample_tasks(args.tasks)
+    as_dicts, dict_store = measure(lambda tasks: {task["id"]: task for task in tasks}, text)
+    as_records, record_store = measure(lambda tasks: {task["id"]: TaskRecord.from_dict(task) for task in tasks}, text)
+    assert all(record_store[task_id].to_dict() == task for task_id, task in dict_store.items())
+
+    print(f"{args.tasks} tasks")
+    print(f"  dicts:       {as_dicts / args.tasks:8.0f} bytes/task  ({as_dicts / 1e6:.1f} MB)")
+    print(f"  TaskRecord:  {as_records / args.tasks:8.0f} bytes/task  ({as_records / 1e6:.1f} MB)")
+    print(f"  saved:       {1 - as_records / as_dicts:8.1%}")
@@ -0,0 +1,94 @@
+import os
+import json
+import threading
+from datetime import date, datetime
+
+ROLLUP_PATH = os.path.join("stats_data", "daily_rollups.json")
+
+
+class TaskStats:
+    """Aggregate task counters kept current on every store/drop.
+
+    Each task's last contribution is remembered so an update subtracts the
+    old values and adds the new ones; reads never touch the task dicts.
+    """
+
+    DIMENSIONS = ("status", "priority", "source", "sender")
+
+    def __init__(self):
+        self.total = 0
+        self.progress_sum = 0
+        self.counts = {dim: {} for dim in self.DIMENSIONS}
+        self._contrib = {}
+        self._lock = threading.Lock()
+
+    def _apply(self, contrib, sign):
+        self.total += sign
+        self.progress_sum += sign * contrib[-1]
+        for dim, value in zip(self.DIMENSIONS, contrib):
+            bucket = self.counts[dim]
+            bucket[value] = bucket.get(value, 0) + sign
+            if not bucket[value]:
+                del bucket[value]
+
+    def add(self, task_id, task):
+        contrib = (
+            task.get("status") or "unknown",
+            task.get("priority") or "medium",
+            task.get("source") or "manual",
+            task.get("sender") or "unknown",
+            task.get("progress") or 0,
+        )
+        with self._lock:
+            old = self._contrib.get(task_id)
+            if old == contrib:
+                return
+            if old is not None:
+                self._apply(old, -1)
+            self._apply(contrib, 1)
+            self._contrib[task_id] = contrib
+
+    def remove(self, task_id):
+        with self._lock:
+            old = self._contrib.pop(task_id, None)
+            if old is not None:
+                self._apply(old, -1)
+
+    def snapshot(self, overdue=0):
+        """Current aggregates; `overdue` comes from the deadline index"""
+        with self._lock:
+            return {
+                "total": self.total,
+                "by_status": dict(self.counts["status"]),
+                "by_priority": dict(self.counts["priority"]),
+                "by_source": dict(self.counts["source"]),
+                "by_sender": dict(self.counts["sender"]),
+                "average_progress": round(self.progress_sum / self.total, 1) if self.total else 0,
+                "overdue": overdue,
+            }
+
+    def record_rollup(self, overdue=0, path=ROLLUP_PATH, day=None):
+        """Write today's aggregates into the daily rollup file (one entry per day)"""
+        day = (day or date.today()).isoformat()
+        rollups = load_rollups(path)
+        snapshot = self.snapshot(overdue)
+        rollups[day] = {
+            "recorded_at": datetime.now().isoformat(),
+            "total": snapshot["total"],
+            "by_status": snapshot["by_status"],
+            "average_progress": snapshot["average_progress"],
+            "overdue": overdue,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(rollups, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+        return rollups[day]
+
+
+def load_rollups(path=ROLLUP_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,140 @@
+import os
+import time
+import glob
+import fnmatch
+import threading
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # not on Linux, or the package is not installed
+    INotify = None
+
+
+class TaskFolderWatcher:
+    """Detect added, modified and deleted JSON files in a task folder.
+
+    Uses inotify when `inotify_simple` is available and falls back to a cheap
+    mtime/size scan of the folder otherwise. Each call to `poll()` returns only
+    the files that changed since the previous call. The inotify wait happens
+    outside the snapshot lock, so note_written() never blocks on a poll.
+    """
+
+    def __init__(self, folder="task_data", patterns=("*.json",), use_inotify=True):
+        self.folder = folder
+        self.patterns = patterns
+        self.snapshot = {}  # path -> (mtime_ns, size)
+        self._lock = threading.Lock()
+        self.metrics = {
+            "mode": "scan",
+            "polls": 0,
+            "changes_applied": 0,
+            "last_reload_lag": None,
+            "max_reload_lag": 0.0,
+            "last_poll_at": None,
+        }
+
+        self._inotify = None
+        if use_inotify and INotify is not None:
+            try:
+                self._inotify = INotify()
+                mask = flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+                self._inotify.add_watch(folder, mask)
+                self.metrics["mode"] = "inotify"
+            except OSError as e:
+                print(f"inotify unavailable for {folder}, using mtime scan: {e}")
+                self._inotify = None
+
+        self.snapshot = self._scan()
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _scan(self):
+        snapshot = {}
+        for pattern in self.patterns:
+            for path in glob.glob(os.path.join(self.folder, pattern)):
+                stat = self._stat(path)
+                if stat is not None:
+                    snapshot[path] = stat
+        return snapshot
+
+    def _changed_paths(self, timeout):
+        """Return the set of paths to re-stat, or None for a full scan."""
+        if self._inotify is None:
+            return None
+        events = self._inotify.read(timeout=int(timeout * 1000))
+        if any(e.mask & flags.Q_OVERFLOW for e in events):
+            return None
+        return {
+            os.path.join(self.folder, e.name)
+            for e in events
+            if e.name and any(fnmatch.fnmatch(e.name, p) for p in self.patterns)
+        }
+
+    def poll(self, timeout=0):
+        """Return (added, modified, deleted) path lists since the last poll.
+
+        With inotify, waits up to `timeout` seconds for events; the scan
+        fallback returns immediately.
+        """
+        paths = self._changed_paths(timeout)
+        with self._lock:
+            if paths is None:
+                current = self._scan()
+                paths = set(current) | set(self.snapshot)
+            else:
+                current = {p: s for p in paths if (s := self._stat(p)) is not None}
+
+            added, modified, deleted = [], [], []
+            for path in paths:
+                old, new = self.snapshot.get(path), current.get(path)
+                if old is None and new is not None:
+                    added.append(path)
+                elif old is not None and new is None:
+                    deleted.append(path)
+                elif old != new:
+                    modified.append(path)
+                if new is None:
+                    self.snapshot.pop(path, None)
+                else:
+                    self.snapshot[path] = new
+
+            self.metrics["polls"] += 1
+            self.metrics["last_poll_at"] = time.time()
+        return sorted(added), sorted(modified), sorted(deleted)
+
+    def note_written(self, path):
+        """Record a write made by this process so it is not reloaded."""
+        stat = self._stat(path)
+        with self._lock:
+            if stat is None:
+                self.snapshot.pop(path, None)
+            else:
+                self.snapshot[path] = stat
+
+    def record_applied(self, paths):
+        """Update reload-lag metrics for changes that were just applied.
+
+        Lag is measured from the file's modification time to now, so it covers
+        both detection delay and the time spent parsing the file. Deleted files
+        have no modification time and only count as applied changes.
+        """
+        now = time.time()
+        with self._lock:
+            for path in paths:
+                self.metrics["changes_applied"] += 1
+                stat = self.snapshot.get(path)
+                if stat is None:
+                    continue
+                lag = now - stat[0] / 1e9
+                self.metrics["last_reload_lag"] = round(lag, 4)
+                self.metrics["max_reload_lag"] = round(max(self.metrics["max_reload_lag"], lag), 4)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
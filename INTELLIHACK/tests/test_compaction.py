@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from compaction import iter_json_array
+
+ITEMS = [2.5, True, None, "tr", 1e5, -12, {"title": "A", "progress": 40}, [1, 2], "x, ]"]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_items_split_at_any_chunk_boundary(tmp_path, chunk_size):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(ITEMS, indent=1), encoding="utf-8")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ITEMS
+
+
+def test_truncated_array_is_rejected(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text("[1, 2.5", encoding="utf-8")
+    with pytest.raises(ValueError, match="ends inside"):
+        list(iter_json_array(path, chunk_size=2))
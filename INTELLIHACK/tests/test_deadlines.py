@@ -0,0 +1,33 @@
+from datetime import datetime, time
+
+import pytest
+
+from deadlines import parse_deadline
+
+END_OF_DAY = time.max
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-06-10", datetime.combine(datetime(2025, 6, 10), END_OF_DAY)),
+    ("2025-06-10T14:30:00", datetime(2025, 6, 10, 14, 30)),
+    ("06/10/2025", datetime.combine(datetime(2025, 6, 10), END_OF_DAY)),
+    ("25/06/2025", datetime.combine(datetime(2025, 6, 25), END_OF_DAY)),
+    ("June 10th, 2025", datetime.combine(datetime(2025, 6, 10), END_OF_DAY)),
+    ("Sept 3 2025", datetime.combine(datetime(2025, 9, 3), END_OF_DAY)),
+    ("10 June 2025", datetime.combine(datetime(2025, 6, 10), END_OF_DAY)),
+    ("June 10, 2025 at 5:00 pm", datetime(2025, 6, 10, 17, 0)),
+    ("10 June 2025 12:15 am", datetime(2025, 6, 10, 0, 15)),
+])
+def test_parses_supported_formats(value, expected):
+    assert parse_deadline(value) == expected
+
+
+def test_offset_is_converted_to_naive_local_time():
+    parsed = parse_deadline("2025-06-10T14:30:00+00:00")
+    assert parsed.tzinfo is None
+    assert parsed == datetime.fromisoformat("2025-06-10T14:30:00+00:00").astimezone().replace(tzinfo=None)
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "31/31/2025", "Smarch 3 2025", "February 30, 2025", 20250610])
+def test_unparseable_values_return_none(value):
+    assert parse_deadline(value) is None
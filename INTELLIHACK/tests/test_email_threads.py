@@ -0,0 +1,112 @@
+import pytest
+
+from email_threads import ThreadIndex
+
+
+def make_email(uid, body, subject="Quarterly report", message_id=None, in_reply_to=""):
+    return {
+        "uid": uid,
+        "from": [("Bob", "bob@example.com")],
+        "subject": subject,
+        "body": body,
+        "date": f"Mon, 1 Jan 2024 10:{uid:02d}:00 +0000",
+        "message_id": message_id or f"<{uid}@example.com>",
+        "in_reply_to": in_reply_to,
+        "references": [in_reply_to] if in_reply_to else [],
+    }
+
+
+@pytest.fixture
+def folder(tmp_path):
+    return str(tmp_path)
+
+
+def test_reply_joins_thread_and_quotes_are_dropped(folder):
+    index = ThreadIndex("tasks", folder=folder)
+    first = make_email(1, "Please send the report by Friday.")
+    reply = make_email(2, "Sure, will do.\n\nOn Mon, Bob wrote:\n> Please send the report by Friday.",
+                       subject="Re: Quarterly report", in_reply_to="<1@example.com>")
+    groups = index.group([first, reply])
+    assert len(groups) == 1
+    assert groups[0].emails == [first, reply]
+    assert groups[0].new_content == "Please send the report by Friday.\n\nSure, will do."
+
+
+def test_aborted_run_extracts_groups_again(folder):
+    index = ThreadIndex("tasks", folder=folder)
+    email = make_email(1, "Please send the report by Friday.")
+    assert len(index.group([email])) == 1
+    # The pipeline stops before extraction; the save must not record the content
+    index.save()
+
+    assert len(ThreadIndex("tasks", folder=folder).group([email])) == 1
+
+
+def test_done_groups_are_not_extracted_again(folder):
+    index = ThreadIndex("tasks", folder=folder)
+    email = make_email(1, "Please send the report by Friday.")
+    [group] = index.group([email])
+    index.mark_done(group)
+    index.save()
+
+    assert ThreadIndex("tasks", folder=folder).group([email]) == []
+
+
+def test_pending_content_is_not_grouped_twice(folder):
+    index = ThreadIndex("tasks", folder=folder)
+    notice = "Your build failed."
+    assert len(index.group([make_email(1, notice, subject="CI")])) == 1
+    assert index.group([make_email(2, notice, subject="CI")]) == []
+
+
+def test_forgotten_group_is_grouped_again(folder):
+    index = ThreadIndex("tasks", folder=folder)
+    email = make_email(1, "Please send the report by Friday.")
+    [group] = index.group([email])
+    index.forget(group)
+    assert len(index.group([email])) == 1
+
+
+def test_meeting_invites_with_same_subject_stay_separate(folder, tmp_path):
+    # UIDs 19937-19940 of meeting_data/: four "Happening now" invites from the
+    # Meet no-reply address, same subject, each with its own link
+    from meeting_index import MeetingIndex
+
+    links = ["jvc-ytxv-rmn", "yry-dbug-nom", "mmz-qbqx-jvh", "cje-bach-jxz"]
+    invites = []
+    for uid, code in zip(range(19937, 19941), links):
+        invites.append({
+            "uid": uid,
+            "from": [("akultyagi2304@gmail.com (via Google Meet)", "meetings-noreply@google.com")],
+            "subject": "Happening now: akultyagi2304@gmail.com is inviting you to a video call",
+            "body": f"akultyagi2304@gmail.com is inviting you to a video call\nJoin: https://meet.google.com/{code}",
+            "date": "Thu, 24 Apr 2025 06:34:00 +0530",
+            "message_id": f"<{uid}@google.com>",
+            "in_reply_to": "",
+            "references": [],
+        })
+
+    groups = ThreadIndex("meetings", folder=folder).group(invites)
+    assert [[e["uid"] for e in g.emails] for g in groups] == [[uid] for uid in range(19937, 19941)]
+
+    index = MeetingIndex(path=str(tmp_path / "calendar_index.json"))
+    for uid, code in zip(range(19937, 19941), links):
+        meeting = {"date": "2025-04-24", "time": "06:34", "link": f"https://meet.google.com/{code}"}
+        item, duplicates, _ = index.add_meeting(meeting, uid, "meetings-noreply@google.com")
+        assert item is not None and not duplicates
+
+
+def test_task_notifications_with_same_subject_share_a_thread(folder):
+    index = ThreadIndex("tasks", folder=folder)
+    groups = index.group([make_email(1, "Build 41 failed.", subject="CI"),
+                          make_email(2, "Build 42 failed.", subject="CI")])
+    assert [len(g.emails) for g in groups] == [2]
+
+
+def test_task_ids_are_scoped(folder):
+    extracted = [{"title": "Send the report", "due_date": None}]
+    one = ThreadIndex("tasks", folder=folder, scope="work")
+    two = ThreadIndex("tasks", folder=folder, scope="home")
+    for index in (one, two):
+        index.threads["uid:7"] = {"last_seen": 0, "content": [], "tasks": []}
+    assert one.merge_tasks("uid:7", extracted)[0]["task_id"] != two.merge_tasks("uid:7", extracted)[0]["task_id"]
@@ -0,0 +1,48 @@
+import pytest
+
+from meeting_index import MeetingIndex
+
+HOUR = 3600
+LINK = "https://meet.google.com/abc-defg-hij"
+
+
+@pytest.fixture
+def index(tmp_path):
+    return MeetingIndex(path=str(tmp_path / "calendar_index.json"))
+
+
+def test_same_link_overlapping_is_duplicate(index):
+    existing = index.add(10 * HOUR, 11 * HOUR, link=LINK)
+    duplicates, conflicts = index.check(10 * HOUR + 600, 11 * HOUR + 600, link=LINK)
+    assert duplicates == [existing]
+    assert conflicts == []
+
+
+def test_same_link_back_to_back_is_duplicate(index):
+    existing = index.add(10 * HOUR, 11 * HOUR, link=LINK)
+    assert index.check(11 * HOUR, 12 * HOUR, link=LINK) == ([existing], [])
+
+
+def test_other_link_overlapping_is_conflict(index):
+    existing = index.add(10 * HOUR, 11 * HOUR, link=LINK)
+    assert index.check(10 * HOUR + 1800, 11 * HOUR + 1800, link="https://zoom.us/j/1") == ([], [existing])
+
+
+def test_other_link_back_to_back_is_free(index):
+    index.add(10 * HOUR, 11 * HOUR, link=LINK)
+    assert index.check(11 * HOUR, 12 * HOUR, link="https://zoom.us/j/1") == ([], [])
+
+
+def test_same_sender_without_shared_link_is_not_duplicate(index):
+    sender = "meetings-noreply@google.com"
+    first = {"date": "2025-05-01", "time": "10:00", "link": "https://meet.google.com/aaa-bbbb-ccc"}
+    second = {"date": "2025-05-01", "time": "11:00", "link": "https://meet.google.com/ddd-eeee-fff"}
+    item, duplicates, _ = index.add_meeting(first, email_uid=1, sender=sender)
+    assert item is not None and not duplicates
+    item, duplicates, conflicts = index.add_meeting(second, email_uid=2, sender=sender)
+    assert item is not None and not duplicates and not conflicts
+
+
+def test_no_link_is_never_duplicate(index):
+    existing = index.add(10 * HOUR, 11 * HOUR, link=None)
+    assert index.check(10 * HOUR, 11 * HOUR) == ([], [existing])
@@ -0,0 +1,40 @@
+from stream_json import StreamingJsonParser, parse_json_text
+
+
+def test_array_after_prose_and_fence():
+    text = 'Here are the tasks:\n```json\n[{"title": "A"}, {"title": "B"}]\n```\nLet me know!'
+    assert parse_json_text(text) == [{"title": "A"}, {"title": "B"}]
+
+
+def test_citation_before_array_is_skipped():
+    assert parse_json_text('See [1] for details. [{"title":"A"}]') == [{"title": "A"}]
+    assert parse_json_text('Sources [1][2], [see below]: [{"title":"A"}]') == [{"title": "A"}]
+
+
+def test_trailing_comma_is_tolerated():
+    assert parse_json_text('[{"title": "A",}, {"title": "B"},]') == [{"title": "A"}, {"title": "B"}]
+
+
+def test_truncated_element_is_repaired():
+    assert parse_json_text('[{"title": "A"}, {"title": "B", "due_date": "2025-') == \
+        [{"title": "A"}, {"title": "B", "due_date": "2025-"}]
+    assert parse_json_text('[{"title": "A"}, {"title": "B", "due_date":') == \
+        [{"title": "A"}, {"title": "B", "due_date": None}]
+
+
+def test_truncated_scalar_array_yields_nothing():
+    assert parse_json_text("As noted in [1, 2") == []
+
+
+def test_object_mode():
+    text = 'Meeting found {see below}: {"title": "Sync", "link": "https://meet.google.com/x"} done'
+    assert parse_json_text(text, mode="object") == [{"title": "Sync", "link": "https://meet.google.com/x"}]
+
+
+def test_streaming_emits_elements_as_they_close():
+    parser = StreamingJsonParser()
+    seen = []
+    for chunk in ['Per [3], tasks: [{"ti', 'tle": "X"}', ', {"title": "Y"}', '] trailing']:
+        seen.append(parser.feed(chunk))
+    assert seen == [[], [{"title": "X"}], [{"title": "Y"}], []]
+    assert parser.done
@@ -0,0 +1,70 @@
+import pytest
+
+from task_record import MISSING, TaskRecord, decode_time, encode_time
+
+TASK = {
+    "id": "a1b2c3d4",
+    "description": "Send the quarterly report",
+    "status": "in_progress",
+    "progress": 40,
+    "created_at": "2025-04-20T09:15:02.123456",
+    "updated_at": "2025-04-21T17:00:00",
+    "deadline": "2025-04-24",
+    "priority": "high",
+    "source": "email",
+    "sender": "bob@example.com",
+    "email_id": "1042",
+    "notes": [{"text": "Task created from email", "timestamp": "2025-04-20T09:15:02.123456"}],
+}
+
+
+def test_round_trip_keeps_keys_order_and_values():
+    record = TaskRecord.from_dict(TASK)
+    assert record.to_dict() == TASK
+    assert list(record.to_dict()) == list(TASK)
+
+
+def test_round_trip_with_unknown_fields_and_custom_codes():
+    task = {**TASK, "status": "blocked", "source": "slack", "labels": ["finance"]}
+    assert TaskRecord.from_dict(task).to_dict() == task
+
+
+def test_deadline_ts_is_never_serialized():
+    record = TaskRecord.from_dict({**TASK, "deadline_ts": 1745519399})
+    assert record.deadline_ts is None
+    record.deadline_ts = 1745519399
+    assert record.to_dict() == TASK
+    assert "deadline_ts" not in record
+
+
+def test_missing_fields_stay_missing():
+    record = TaskRecord.from_dict({"id": "x", "description": "No extras"})
+    assert record.to_dict() == {"id": "x", "description": "No extras"}
+    assert "notes" not in record
+    assert record.notes is MISSING
+    with pytest.raises(KeyError):
+        record["status"]
+
+
+def test_add_note_appends_decoded_note():
+    record = TaskRecord.from_dict(TASK)
+    record.add_note("Halfway there", "2025-04-22T08:00:00")
+    assert record["notes"][-1] == {"text": "Halfway there", "timestamp": "2025-04-22T08:00:00"}
+
+
+@pytest.mark.parametrize("value", [
+    "2025-04-24T10:00:00",
+    "2025-04-24T10:00:00.123456",
+    "2025-04-24",
+    "2025-04-24 10:00:00",
+    "2025-04-24T10:00:00.000000",
+    "2025-04-24T10:00:00+02:00",
+    "not a date",
+])
+def test_encode_time_round_trips(value):
+    assert decode_time(encode_time(value)) == value
+
+
+def test_encode_time_compacts_isoformat_output():
+    assert isinstance(encode_time("2025-04-24T10:00:00.123456"), int)
+    assert encode_time("2025-04-24") == "2025-04-24"
@@ -0,0 +1,53 @@
+import os
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PERPLEXITY_API_KEY", "test")
+    from main import AITaskTrackerBot
+    bot = AITaskTrackerBot()
+    yield bot
+    bot.watcher.close()
+
+
+def write_task(path, **fields):
+    task = {"id": "t1", "description": "Send the report", "status": "pending", "progress": 0,
+            "deadline": "2025-06-10", "priority": "high", **fields}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(task, f)
+
+
+def test_create_update_delete_reach_store_and_journal(bot):
+    path = "task_data/task_t1.json"
+    cursor = bot.journal.cursor
+
+    write_task(path)
+    assert bot.refresh_tasks() == (1, 0, 0)
+    assert bot.tasks["t1"]["status"] == "pending"
+
+    write_task(path, status="in_progress", progress=50)
+    assert bot.refresh_tasks() == (0, 1, 0)
+    assert bot.tasks["t1"]["progress"] == 50
+
+    os.remove(path)
+    assert bot.refresh_tasks() == (0, 0, 1)
+    assert "t1" not in bot.tasks
+
+    page = bot.journal.changes(cursor)
+    assert [(c["op"], c["id"]) for c in page["changes"]] == [("create", "t1"), ("update", "t1"), ("delete", "t1")]
+    assert page["changes"][1]["task"]["status"] == "in_progress"
+    assert bot.refresh_tasks() == (0, 0, 0)
+
+
+def test_own_writes_are_not_reloaded(bot):
+    write_task("task_data/task_t1.json")
+    bot.refresh_tasks()
+    bot.update_task("t1", progress=30)
+    assert bot.refresh_tasks() == (0, 0, 0)
+    assert bot.tasks["t1"]["progress"] == 30
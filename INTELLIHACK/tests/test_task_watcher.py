@@ -0,0 +1,23 @@
+import os
+
+from task_watcher import TaskFolderWatcher
+
+
+def test_deletions_do_not_count_as_reload_lag(tmp_path):
+    path = tmp_path / "task_t1.json"
+    watcher = TaskFolderWatcher(str(tmp_path), use_inotify=False)
+
+    path.write_text("{}", encoding="utf-8")
+    # Backdate the write so the reload lag is clearly non-zero
+    os.utime(path, ns=(0, path.stat().st_mtime_ns - 5_000_000_000))
+    added, _, _ = watcher.poll()
+    watcher.record_applied(added)
+    lag = watcher.metrics["last_reload_lag"]
+    assert lag >= 5
+
+    path.unlink()
+    _, _, deleted = watcher.poll()
+    watcher.record_applied(deleted)
+    assert deleted == [str(path)]
+    assert watcher.metrics["last_reload_lag"] == lag
+    assert watcher.metrics["changes_applied"] == 2